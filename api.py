@@ -0,0 +1,420 @@
+import argparse
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import traceback
+import uuid
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+import pandas as pd
+from database import GHUDatabase, MemoryReplica, PRAGMA_PROFILES
+from reports import GHUReports, ReportCache, REPORT_TYPES
+
+# Локальный HTTP API над базой и отчетами (JSON и потоковый CSV). Маршруты:
+#   GET    /api/tables                         таблицы и их поля
+#   GET    /api/<таблица>?поле=...&sort=...    страница записей (ключевая пагинация)
+#   GET    /api/<таблица>?format=csv           вся выборка в CSV потоком
+#   GET    /api/<таблица>/search?field=&value= поиск по полю
+#   GET    /api/<таблица>/<id>                 запись
+#   POST   /api/<таблица>                      новая запись (JSON)
+#   PATCH  /api/<таблица>/<id>                 изменение записи (JSON); PUT - то же
+#   DELETE /api/<таблица>/<id>                 удаление записи
+#   GET    /api/reports/<отчет>?фильтр=...     отчет; details=0 - только группировка и итоги
+#   GET    /api/stats                          статистика запросов и кэша отчетов
+# Ответы на GET содержат ETag по версии данных базы и экземпляру сервера; запрос с
+# If-None-Match той же версии получает 304 без обращения к таблицам.
+
+API_TABLES = ['districts', 'buildings', 'apartments', 'residents', 'services', 'payments']
+
+# Размер страницы по умолчанию и наибольший допустимый
+PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Наибольший размер тела запроса на запись, байт
+MAX_BODY_SIZE = 1 << 20
+
+# Параметры запроса, которые не являются фильтрами по полям
+RESERVED_PARAMETERS = {'limit', 'sort', 'order', 'after_id', 'after_value', 'format', 'count', 'details'}
+
+
+class ApiError(Exception):
+    """Ошибка запроса с кодом ответа HTTP"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def json_default(value: Any) -> Any:
+    """Значения numpy и даты в JSON"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Значение {type(value).__name__} не сериализуется в JSON")
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict]:
+    """Строки DataFrame для JSON (пропуски - null)"""
+    if df.empty:
+        return []
+    return json.loads(df.to_json(orient='records', force_ascii=False, date_format='iso'))
+
+
+class GHUApiServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер API. Каждый запрос обрабатывается в своем потоке на соединении из
+    пула базы; записи выполняются по одной под write_lock, отчеты используют общий кэш.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, db: GHUDatabase, quiet: bool = False, replica: MemoryReplica = None):
+        super().__init__(address, GHUApiHandler)
+        self.db = db
+        self.quiet = quiet
+        self.write_lock = threading.Lock()
+        self.report_cache = ReportCache()
+        # Копия базы в памяти для отчетов (None - отчеты читают рабочий файл)
+        self.replica = replica
+        # Метка запуска: версия данных считается заново после перезапуска сервера,
+        # поэтому ETag прежнего процесса не должен совпасть с ETag нового
+        self.instance = uuid.uuid4().hex[:12]
+
+        # Поля таблиц: имена таблиц и полей из запроса подставляются в SQL только после проверки по ним
+        conn = db.connect()
+        try:
+            self.columns = {
+                table: [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+                for table in API_TABLES
+            }
+        finally:
+            db.release_connection()
+
+    def etag(self, version: tuple = None) -> str:
+        """ETag версии данных (по умолчанию - текущей версии базы) в этом запуске сервера"""
+        data_version, writes = version or self.db.change_version()
+        return f'"{self.instance}-{data_version}-{writes}"'
+
+
+class GHUApiHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов API"""
+
+    server_version = "GHUApi/1.0"
+
+    def handle(self):
+        try:
+            super().handle()
+        finally:
+            # Соединение потока возвращается в пул после каждого запроса
+            self.server.db.release_connection()
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._write)
+
+    def do_PUT(self):
+        self._dispatch(self._write)
+
+    def do_PATCH(self):
+        self._dispatch(self._write)
+
+    def do_DELETE(self):
+        self._dispatch(self._write)
+
+    # === Разбор запроса ===
+
+    def _dispatch(self, handler: Callable):
+        self._streaming = False
+        # http.server декодирует строку запроса как latin-1; неэкранированный UTF-8 восстанавливается
+        try:
+            path = self.path.encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            path = self.path
+        url = urlsplit(path)
+        route = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+
+        try:
+            if not route or route[0] != 'api':
+                raise ApiError(404, "Не найдено")
+            handler(route[1:], query)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент закрыл соединение, не дочитав ответ
+            self.close_connection = True
+        except ApiError as e:
+            self._send_error(e.status, str(e))
+        except sqlite3.IntegrityError as e:
+            self._send_error(409, f"Нарушение ограничений базы: {e}")
+        except ValueError as e:
+            self._send_error(400, str(e))
+        except Exception as e:
+            traceback.print_exc()
+            self._send_error(500, f"Внутренняя ошибка: {e}")
+
+    def _table(self, name: str) -> str:
+        if name not in self.server.columns:
+            raise ApiError(404, f"Неизвестная таблица: {name}")
+        return name
+
+    def _field(self, table: str, field: Optional[str]) -> Optional[str]:
+        if field and field not in self.server.columns[table]:
+            raise ApiError(400, f"Неизвестное поле {table}.{field}")
+        return field or None
+
+    def _record_id(self, value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(404, f"Неверный идентификатор записи: {value}")
+
+    @staticmethod
+    def _ascending(query: Dict) -> bool:
+        order = query.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ApiError(400, "order: ожидается asc или desc")
+        return order == 'asc'
+
+    def _conditions(self, table: str, query: Dict) -> Dict:
+        """Фильтр по полям (как в filter_records) из параметров запроса"""
+        return {
+            self._field(table, field): value
+            for field, value in query.items() if field not in RESERVED_PARAMETERS
+        }
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            raise ApiError(413, "Слишком большое тело запроса")
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            raise ApiError(400, f"Неверный JSON: {e}")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Ожидается объект JSON")
+        return data
+
+    # === Чтение ===
+
+    def _get(self, route: List[str], query: Dict):
+        # Версия берется до чтения: запись во время запроса даст клиенту устаревший ETag, а не наоборот
+        etag = self.server.etag()
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        if route == ['tables']:
+            return self._send_json(200, {'tables': self.server.columns}, etag)
+        if route == ['stats']:
+            return self._send_json(200, {
+                'queries': self.server.db.query_stats(),
+                'report_cache': self.server.report_cache.stats()
+            }, etag)
+        if len(route) == 2 and route[0] == 'reports':
+            return self._report(route[1], query, etag)
+
+        if len(route) == 1:
+            return self._page(self._table(route[0]), query, etag)
+        if len(route) == 2 and route[1] == 'search':
+            table = self._table(route[0])
+            field = self._field(table, query.get('field'))
+            if not field:
+                raise ApiError(400, "Не указано поле поиска (field)")
+            rows = self.server.db.search(table, field, query.get('value', ''))
+            return self._send_json(200, {'table': table, 'rows': rows}, etag)
+        if len(route) == 2:
+            table = self._table(route[0])
+            record = self.server.db.get_by_id(table, self._record_id(route[1]))
+            if record is None:
+                raise ApiError(404, "Запись не найдена")
+            return self._send_json(200, record, etag)
+        raise ApiError(404, "Не найдено")
+
+    def _page(self, table: str, query: Dict, etag: str):
+        """Страница записей или вся выборка в CSV"""
+        db = self.server.db
+        sort_field = self._field(table, query.get('sort'))
+        ascending = self._ascending(query)
+        conditions = self._conditions(table, query)
+
+        if query.get('format') == 'csv':
+            return self._send_csv(etag, table, lambda target: db.export_table_csv(
+                target, table, conditions, sort_field, ascending
+            ))
+
+        limit = min(max(int(query.get('limit', PAGE_LIMIT)), 1), MAX_PAGE_LIMIT)
+        after = None
+        if 'after_id' in query:
+            after = {'id': int(query['after_id'])}
+            if sort_field:
+                # Значение приводится к типу поля сравнением в SQLite (числовое сродство столбца)
+                after[sort_field] = query.get('after_value') or None
+
+        rows = db.get_page(table, after, limit, conditions, sort_field, ascending)
+        next_page = None
+        if len(rows) == limit:
+            next_page = {'after_id': rows[-1]['id']}
+            if sort_field:
+                next_page['after_value'] = rows[-1][sort_field]
+
+        payload = {'table': table, 'rows': rows, 'next': next_page}
+        if query.get('count') in ('1', 'true'):
+            payload['total'] = db.count_records(table, conditions)
+        self._send_json(200, payload, etag)
+
+    def _report(self, report_type: str, query: Dict, etag: str):
+        """Отчет в JSON (строки, группировка, итоги) или детальные строки в CSV"""
+        if report_type not in REPORT_TYPES:
+            raise ApiError(404, f"Неизвестный тип отчета: {report_type}")
+        reports = GHUReports(self.server.db, cache=self.server.report_cache, replica=self.server.replica)
+        if self.server.replica is not None:
+            # Отчет по копии помечается ее версией: копия может отставать от базы
+            etag = self.server.etag(reports.data_version())
+        filters = {key: value for key, value in query.items() if key not in RESERVED_PARAMETERS}
+        sort_by = query.get('sort') or None
+        # Без order - порядок по умолчанию отчета (долги - по убыванию суммы)
+        ascending = self._ascending(query) if 'order' in query else None
+
+        if query.get('format') == 'csv':
+            return self._send_csv(etag, report_type, lambda target: reports.export_report_csv(
+                report_type, target, filters, sort_by, ascending
+            ))
+
+        details = query.get('details', '1') not in ('0', 'false')
+        df, grouped, totals = reports.generate(report_type, filters, sort_by, ascending, details=details)
+        self._send_json(200, {
+            'report': report_type,
+            'filters': filters,
+            'totals': totals,
+            'grouped': frame_records(grouped.reset_index()),
+            'rows': frame_records(df) if details else None
+        }, etag)
+
+    # === Запись ===
+
+    def _write(self, route: List[str], query: Dict):
+        method = self.command
+        if not route or len(route) > 2 or (len(route) == 1) != (method == 'POST'):
+            raise ApiError(405 if route and route[0] in self.server.columns else 404, "Метод не поддерживается")
+        table = self._table(route[0])
+        db = self.server.db
+
+        if method == 'DELETE':
+            with self.server.write_lock:
+                deleted = db.delete(table, self._record_id(route[1]))
+            if not deleted:
+                raise ApiError(404, "Запись не найдена")
+            return self._send_empty(204)
+
+        data = self._body()
+        for field in data:
+            self._field(table, field)
+        data.pop('id', None)
+        if not data:
+            raise ApiError(400, "Нет полей для записи")
+
+        # Записи выполняются по одной: SQLite допускает одного пишущего
+        with self.server.write_lock:
+            if method == 'POST':
+                record_id = db.insert(table, data)
+            else:
+                record_id = self._record_id(route[1])
+                if not db.update(table, record_id, data):
+                    raise ApiError(404, "Запись не найдена")
+        record = db.get_by_id(table, record_id)
+        self._send_json(201 if method == 'POST' else 200, record, self.server.etag(),
+                        {'Location': f"/api/{table}/{record_id}"} if method == 'POST' else None)
+
+    # === Ответы ===
+
+    def _send_json(self, status: int, payload: Any, etag: str = None, headers: Dict = None):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_csv(self, etag: str, name: str, write: Callable):
+        """Потоковый ответ CSV: строки пишутся в сокет по мере чтения из курсора"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Disposition', f'attachment; filename="{name}.csv"')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self._streaming = True
+
+        target = io.TextIOWrapper(self.wfile, encoding='utf-8', newline='')
+        try:
+            write(target)
+            target.flush()
+        finally:
+            target.detach()
+
+    def _send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header('ETag', self.server.etag())
+        self.end_headers()
+
+    def _send_error(self, status: int, message: str):
+        if self._streaming:
+            # Заголовки уже отправлены: ответ обрывается, клиент получит неполный CSV
+            self.close_connection = True
+            return
+        self._send_json(status, {'error': message})
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP API базы и отчетов службы заказчика ГЖУ")
+    parser.add_argument('--db', default="ghu_database.db", help="файл базы данных")
+    parser.add_argument('--host', default="127.0.0.1", help="адрес сервера")
+    parser.add_argument('--port', type=int, default=8080, help="порт сервера")
+    parser.add_argument('--profile', default="default", choices=sorted(PRAGMA_PROFILES),
+                        help="профиль настроек соединений")
+    parser.add_argument('--slow-query-log', help="журнал медленных запросов")
+    parser.add_argument('--quiet', action='store_true', help="не выводить журнал запросов")
+    parser.add_argument('--replica', type=float, nargs='?', const=0.0, metavar="СЕКУНДЫ",
+                        help="отчеты по копии базы в памяти, обновляемой не чаще раза в СЕКУНДЫ")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Ошибка: база данных не найдена: {args.db}", file=sys.stderr)
+        return 3
+
+    db = GHUDatabase(args.db, profile=args.profile, slow_query_log=args.slow_query_log)
+    replica = MemoryReplica(db, args.replica) if args.replica is not None else None
+    server = GHUApiServer((args.host, args.port), db, args.quiet, replica)
+    print(f"API доступен по адресу http://{args.host}:{server.server_port}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if replica is not None:
+            replica.close()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
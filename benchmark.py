@@ -0,0 +1,788 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, date, timedelta
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlencode
+import numpy as np
+import pandas as pd
+from api import GHUApiServer
+from database import GHUDatabase, MemoryReplica, PRAGMA_PROFILES
+from generator import HousingStockGenerator
+from reports import GHUReports
+
+# Замеры производительности:
+#   columns - прежняя построчная реализация вычисляемых полей отчетов (apply на каждую
+#             строку) против векторизованной реализации GHUReports;
+#   suite   - время методов GHUDatabase и отчетов на сгенерированном жилом фонде разного
+#             объема с записью результатов в JSON;
+#   compare - сравнение двух файлов результатов suite (например, до и после коммита);
+#   api     - нагрузочный тест HTTP API на локальном экземпляре сервера;
+#   writes  - запись по одной строке (commit на каждый вызов) против transaction()
+#             и пакетных insert_many/update_many/delete_many;
+#   load    - потоковая загрузка реестра платежей из CSV (load_payments_csv).
+
+
+def legacy_payments_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Построчная реализация вычисляемых полей отчета по платежам"""
+    df['Сумма_с_НДС'] = df['Сумма'] * 1.2
+    df['Площадь_на_человека'] = df.apply(
+        lambda row: f"{row['Площадь']:.1f} м²", axis=1
+    )
+    return df
+
+
+def legacy_debts_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Построчная реализация вычисляемых полей отчета по задолженностям"""
+    df['Долг_за_м2'] = df['Общая_задолженность'] / df['Площадь']
+    df['Стаж_задолженности'] = df['Месяцев_задолженности'].apply(
+        lambda x: f"{x} мес." if x < 12 else f"{x//12} г. {x%12} мес."
+    )
+    return df
+
+
+def legacy_electoral_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Построчная реализация вычисляемых полей избирательных списков"""
+    def calculate_age(birth_date_str):
+        try:
+            birth_date = datetime.strptime(birth_date_str, '%Y-%m-%d').date()
+            today = date.today()
+            return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+        except:
+            return 0
+
+    df['Возраст_лет'] = df['Дата_рождения'].apply(calculate_age)
+
+    def get_age_group(age):
+        if age < 30:
+            return "18-29 лет"
+        elif age < 45:
+            return "30-44 года"
+        elif age < 60:
+            return "45-59 лет"
+        else:
+            return "60+ лет"
+
+    df['Возрастная_группа'] = df['Возраст_лет'].apply(get_age_group)
+    return df
+
+
+def make_frames(rows: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Синтетические детальные строки трех отчетов"""
+    rng = np.random.default_rng(seed)
+
+    payments = pd.DataFrame({
+        'Площадь': rng.uniform(20, 150, rows).round(1),
+        'Сумма': rng.uniform(100, 10000, rows).round(2)
+    })
+
+    debts = pd.DataFrame({
+        'Общая_задолженность': rng.uniform(100, 100000, rows).round(2),
+        'Площадь': rng.uniform(20, 150, rows).round(1),
+        'Месяцев_задолженности': rng.integers(1, 60, rows)
+    })
+
+    # Даты рождения от 18 до 100 лет назад, включая сегодняшний день рождения
+    # и несколько нераспознаваемых значений
+    today = date.today()
+    offsets = rng.integers(18 * 365, 100 * 365, rows)
+    birth_dates = [(today - timedelta(days=int(days))).isoformat() for days in offsets]
+    if rows >= 3:
+        birth_dates[0] = f"{today.year - 30}{today.isoformat()[4:]}"
+        birth_dates[1] = ''
+        birth_dates[2] = 'не указана'
+    electoral = pd.DataFrame({'Дата_рождения': birth_dates})
+
+    return {'payments': payments, 'debts': debts, 'electoral': electoral}
+
+
+# Отчет: (прежняя реализация, текущая реализация)
+IMPLEMENTATIONS: Dict[str, tuple] = {
+    'payments': (legacy_payments_columns, GHUReports._add_payments_columns),
+    'debts': (legacy_debts_columns, GHUReports._add_debts_columns),
+    'electoral': (legacy_electoral_columns, GHUReports._add_electoral_columns)
+}
+
+
+def best_time(function: Callable, frame: pd.DataFrame, repeat: int) -> tuple:
+    """Лучшее время из repeat запусков на копиях кадра и результат последнего запуска"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        data = frame.copy()
+        started = time.perf_counter()
+        result = function(data)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(rows: int, repeat: int) -> List[Dict]:
+    """Замер обеих реализаций с проверкой совпадения результатов"""
+    frames = make_frames(rows)
+    results = []
+
+    for report_type, (legacy, vectorized) in IMPLEMENTATIONS.items():
+        legacy_seconds, expected = best_time(legacy, frames[report_type], repeat)
+        vectorized_seconds, actual = best_time(vectorized, frames[report_type], repeat)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+        results.append({
+            'report': report_type,
+            'rows': rows,
+            'legacy_seconds': legacy_seconds,
+            'vectorized_seconds': vectorized_seconds,
+            'speedup': legacy_seconds / vectorized_seconds if vectorized_seconds else float('inf')
+        })
+
+    return results
+
+
+# Объемы жилого фонда (число начислений) по умолчанию
+SUITE_SIZES = [10000, 100000, 1000000]
+
+# Порог замедления, после которого compare считает замер регрессией
+REGRESSION_THRESHOLD = 1.25
+
+
+def _report(name: str, details: bool) -> Callable:
+    """Замер отчета без кэша: каждый повтор выполняет запросы"""
+    return lambda db, reports, ctx: reports.generate(name, details=details)
+
+
+def _replica_report(name: str, details: bool) -> Callable:
+    """Замер отчета без кэша по копии базы в памяти (копия снимается при первом вызове)"""
+    def call(db, reports, ctx):
+        replica_reports = GHUReports(db, replica=ctx['replica'])
+        replica_reports.cache = None
+        return replica_reports.generate(name, details=details)
+    return call
+
+
+# Замеряемые операции: (название, вызов). ctx - идентификаторы и значения из
+# сгенерированных данных; insert/update/delete работают с одними и теми же строками
+SUITE_CASES: List[tuple] = [
+    ("get_all buildings", lambda db, reports, ctx: db.get_all('buildings')),
+    ("get_all payments", lambda db, reports, ctx: db.get_all('payments')),
+    ("get_all payments (tuple)", lambda db, reports, ctx: db.get_all('payments', 'tuple')),
+    ("get_all payments (columns)", lambda db, reports, ctx: db.get_all('payments', 'columns')),
+    ("iter_records payments", lambda db, reports, ctx: sum(1 for _ in db.iter_records('payments', shape='tuple'))),
+    ("iter_records payments (первая строка)",
+     lambda db, reports, ctx: next(db.iter_records('payments', sort_field='period'), None)),
+    ("get_by_id payments", lambda db, reports, ctx: db.get_by_id('payments', ctx['payment_id'])),
+    ("insert payments", lambda db, reports, ctx: ctx['inserted'].append(db.insert('payments', {
+        'apartment_id': ctx['apartment_id'], 'service_id': ctx['service_id'],
+        'period': '2099-01-01', 'amount': 100.0, 'is_paid': 0
+    }))),
+    ("update payments", lambda db, reports, ctx: db.update('payments', ctx['inserted'][-1], {'is_paid': 1})),
+    ("delete payments", lambda db, reports, ctx: db.delete('payments', ctx['inserted'].pop())),
+    ("search residents (FTS)", lambda db, reports, ctx: db.search('residents', 'full_name', ctx['surname'])),
+    ("search buildings (FTS)", lambda db, reports, ctx: db.search('buildings', 'address', ctx['street'])),
+    ("search payments (LIKE)", lambda db, reports, ctx: db.search('payments', 'period', ctx['period'])),
+    ("filter_records residents",
+     lambda db, reports, ctx: db.filter_records('residents', {'full_name': ctx['surname'], 'is_owner': 1})),
+    ("filter_records payments",
+     lambda db, reports, ctx: db.filter_records('payments', {'period': ctx['period'], 'is_paid': 0})),
+    ("count_records payments",
+     lambda db, reports, ctx: db.count_records('payments', {'period': ctx['period'], 'is_paid': 0})),
+    ("sort_records buildings", lambda db, reports, ctx: db.sort_records('buildings', 'address')),
+    ("sort_records payments", lambda db, reports, ctx: db.sort_records('payments', 'amount', False)),
+    ("get_page payments", lambda db, reports, ctx: db.get_page('payments', sort_field='amount', ascending=False)),
+    ("get_page payments (продолжение)",
+     lambda db, reports, ctx: db.get_page('payments', after=ctx['page_after'], sort_field='amount', ascending=False)),
+    ("get_apartments_by_building", lambda db, reports, ctx: db.get_apartments_by_building(ctx['building_id'])),
+    ("get_residents_by_apartment", lambda db, reports, ctx: db.get_residents_by_apartment(ctx['apartment_id'])),
+    ("get_payments_by_apartment", lambda db, reports, ctx: db.get_payments_by_apartment(ctx['apartment_id'])),
+    ("calculate_payment",
+     lambda db, reports, ctx: db.calculate_payment(ctx['apartment_id'], ctx['service_id'], ctx['period'])),
+    ("report payments", _report('payments', True)),
+    ("report payments (итоги)", _report('payments', False)),
+    ("report debts", _report('debts', True)),
+    ("report debts (итоги)", _report('debts', False)),
+    ("report electoral", _report('electoral', True)),
+    ("report electoral (итоги)", _report('electoral', False)),
+    ("report payments (порциями)", lambda db, reports, ctx: reports.generate_chunked('payments')),
+    ("report payments (порциями, в файл)",
+     lambda db, reports, ctx: reports.generate_chunked('payments', spill_path=os.devnull)),
+    ("replica refresh", lambda db, reports, ctx: ctx['replica'].refresh(force=True)),
+    ("report payments (копия в памяти)", _replica_report('payments', True)),
+    ("report debts (копия в памяти)", _replica_report('debts', True)),
+    ("report electoral (копия в памяти)", _replica_report('electoral', True)),
+]
+
+
+def suite_context(db: GHUDatabase) -> Dict[str, Any]:
+    """Значения для замеров, выбранные детерминированно из середины данных"""
+    conn = db.connect()
+    payment = conn.execute(
+        "SELECT * FROM payments WHERE id >= (SELECT MAX(id) / 2 FROM payments) ORDER BY id LIMIT 1"
+    ).fetchone()
+    apartment = conn.execute("SELECT * FROM apartments WHERE id = ?", (payment['apartment_id'],)).fetchone()
+    building = conn.execute("SELECT * FROM buildings WHERE id = ?", (apartment['building_id'],)).fetchone()
+    resident = conn.execute(
+        "SELECT full_name FROM residents WHERE apartment_id = ? ORDER BY id LIMIT 1", (apartment['id'],)
+    ).fetchone()
+
+    return {
+        'payment_id': payment['id'],
+        'apartment_id': apartment['id'],
+        'building_id': building['id'],
+        'service_id': payment['service_id'],
+        'period': payment['period'],
+        'surname': resident['full_name'].split()[0],
+        'street': building['address'].split(',')[0].split()[-1],
+        'page_after': db.get_page('payments', limit=100, sort_field='amount', ascending=False)[-1],
+        'inserted': [],
+        'replica': MemoryReplica(db)
+    }
+
+
+def result_rows(result: Any) -> Any:
+    """Размер результата операции: число строк (для отчета - детальных или сгруппированных)"""
+    if isinstance(result, tuple) and len(result) == 3:
+        df, grouped, _ = result
+        return len(df) if not df.empty else len(grouped)
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+def run_case(db: GHUDatabase, reports: GHUReports, ctx: Dict, call: Callable, repeat: int) -> Dict:
+    """Время repeat вызовов операции"""
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call(db, reports, ctx)
+        timings.append(time.perf_counter() - started)
+        rows = result_rows(result)
+
+    return {
+        'seconds_min': min(timings),
+        'seconds_median': statistics.median(timings),
+        'seconds_max': max(timings),
+        'rows': rows
+    }
+
+
+def prepare_dataset(workdir: str, size: int, seed: int) -> tuple:
+    """
+    База с жилым фондом заданного объема в workdir: создается генератором или
+    переиспользуется с прошлого запуска. Возвращает (путь, статистика генерации или None).
+    """
+    path = os.path.join(workdir, f"benchmark_{size}_{seed}.db")
+    generation = None
+    if not os.path.exists(path):
+        db = GHUDatabase(path, profile="bulk")
+        try:
+            generation = HousingStockGenerator(seed).populate(db, size)
+        finally:
+            db.close()
+        print(f"[{size}] данные сгенерированы за {generation['seconds']:.1f} с")
+    return path, generation
+
+
+def run_suite(sizes: List[int], repeat: int, seed: int, workdir: str = None) -> Dict:
+    """
+    Замеры на жилом фонде каждого объема. Базы создаются в workdir и переиспользуются
+    при повторном запуске с тем же seed; без workdir - во временном каталоге.
+    """
+    temporary = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="ghu_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+    datasets, results = [], []
+
+    try:
+        for size in sizes:
+            path, generation = prepare_dataset(workdir, size, seed)
+            datasets.append({'payments': size, 'path': path, 'generation': generation})
+
+            db = GHUDatabase(path)
+            ctx = None
+            try:
+                reports = GHUReports(db)
+                reports.cache = None
+                ctx = suite_context(db)
+                for name, call in SUITE_CASES:
+                    result = run_case(db, reports, ctx, call, repeat)
+                    results.append({'payments': size, 'case': name, **result})
+                    print(f"[{size}] {name:<34}{result['seconds_median']:>10.4f} с  строк: {result['rows']}")
+            finally:
+                # Копия в памяти (общая база :memory: и ее соединения) живет до закрытия
+                if ctx is not None:
+                    ctx['replica'].close()
+                db.close()
+    finally:
+        if temporary:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': seed,
+        'repeat': repeat,
+        'datasets': datasets,
+        'results': results
+    }
+
+
+def git_commit() -> Any:
+    """Текущий коммит рабочего каталога или None вне git"""
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def api_workload(ctx: Dict) -> List[tuple]:
+    """
+    Смесь запросов нагрузочного теста: (название, вес, метод, путь).
+    Метод WRITE - создание начисления и его удаление (два запроса на запись).
+    """
+    after = ctx['page_after']
+    page = {'limit': 100, 'sort': 'amount', 'order': 'desc'}
+    return [
+        ("GET payments (страница)", 20, 'GET', f"/api/payments?{urlencode(page)}"),
+        ("GET payments (продолжение)", 10, 'GET',
+         f"/api/payments?{urlencode({**page, 'after_id': after['id'], 'after_value': after['amount']})}"),
+        ("GET payments/<id>", 20, 'GET', f"/api/payments/{ctx['payment_id']}"),
+        ("GET payments (фильтр)", 10, 'GET',
+         f"/api/payments?{urlencode({'period': ctx['period'], 'is_paid': 0, 'limit': 100})}"),
+        ("GET residents/search", 10, 'GET',
+         f"/api/residents/search?{urlencode({'field': 'full_name', 'value': ctx['surname']})}"),
+        ("GET reports/debts (итоги)", 5, 'GET', "/api/reports/debts?details=0"),
+        ("GET reports/electoral (итоги)", 5, 'GET', "/api/reports/electoral?details=0"),
+        ("POST+DELETE payments", 5, 'WRITE', "/api/payments"),
+    ]
+
+
+def api_request(base_url: str, method: str, path: str, body: Dict = None, etag: str = None) -> tuple:
+    """Запрос к API: (код ответа, ETag, тело)"""
+    request = urllib.request.Request(
+        base_url + path, method=method,
+        data=json.dumps(body).encode('utf-8') if body is not None else None,
+        headers={'If-None-Match': etag} if etag else {}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            return response.status, response.headers.get('ETag'), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get('ETag'), e.read()
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_api_load(base_url: str, ctx: Dict, clients: int, requests: int, seed: int,
+                 conditional: bool = True) -> Dict:
+    """
+    clients параллельных клиентов выполняют по requests запросов из api_workload.
+    При conditional клиент повторяет GET с If-None-Match последнего ETag этого адреса.
+    """
+    workload = api_workload(ctx)
+    weights = [weight for _, weight, _, _ in workload]
+    payment = {'apartment_id': ctx['apartment_id'], 'service_id': ctx['service_id'],
+               'period': '2099-01-01', 'amount': 100.0, 'is_paid': 0}
+    samples = []
+    lock = threading.Lock()
+
+    def timed(name: str, local: List, *args) -> tuple:
+        started = time.perf_counter()
+        status, etag, body = api_request(base_url, *args)
+        local.append((name, status, time.perf_counter() - started))
+        return status, etag, body
+
+    def client(index: int):
+        rng = random.Random(seed * 1000 + index)
+        etags, local = {}, []
+        for _ in range(requests):
+            name, _, method, path = rng.choices(workload, weights)[0]
+            if method == 'WRITE':
+                status, _, body = timed("POST payments", local, 'POST', path, payment)
+                if status == 201:
+                    timed("DELETE payments", local, 'DELETE', f"{path}/{json.loads(body)['id']}")
+                continue
+            status, etag, _ = timed(name, local, 'GET', path, None, etags.get(path) if conditional else None)
+            if status == 200 and etag:
+                etags[path] = etag
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    endpoints = []
+    for name in dict.fromkeys(name for name, _, _ in samples):
+        timings = [elapsed for sample, _, elapsed in samples if sample == name]
+        statuses = [status for sample, status, _ in samples if sample == name]
+        endpoints.append({
+            'endpoint': name,
+            'requests': len(timings),
+            'errors': sum(status >= 400 for status in statuses),
+            'not_modified': statuses.count(304),
+            'ms_p50': percentile(timings, 0.5) * 1000,
+            'ms_p95': percentile(timings, 0.95) * 1000,
+            'ms_max': max(timings) * 1000
+        })
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'clients': clients,
+        'requests_per_client': requests,
+        'conditional': conditional,
+        'seconds': seconds,
+        'requests': len(samples),
+        'requests_per_second': len(samples) / seconds if seconds else 0.0,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints),
+        'endpoints': endpoints
+    }
+
+
+def run_api_benchmark(size: int, seed: int, workdir: str, clients: int, requests: int,
+                      conditional: bool) -> Dict:
+    """Нагрузочный тест API: сервер запускается в этом процессе на свободном порту"""
+    temporary = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="ghu_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+
+    try:
+        path, _ = prepare_dataset(workdir, size, seed)
+        db = GHUDatabase(path)
+        server = GHUApiServer(("127.0.0.1", 0), db, quiet=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        ctx = None
+        try:
+            ctx = suite_context(db)
+            db.release_connection()
+            result = run_api_load(f"http://127.0.0.1:{server.server_port}", ctx, clients, requests,
+                                  seed, conditional)
+        finally:
+            server.shutdown()
+            server.server_close()
+            if ctx is not None:
+                ctx['replica'].close()
+            db.close()
+    finally:
+        if temporary:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result['payments'] = size
+    return result
+
+
+# Способы записи: (название, вставка, изменение, удаление)
+WRITE_MODES = [
+    ("по одной",
+     lambda db, records: [db.insert('payments', record) for record in records],
+     lambda db, changes: [db.update('payments', change['id'], {'is_paid': change['is_paid'],
+                                                               'payment_date': change['payment_date']})
+                          for change in changes],
+     lambda db, ids: [db.delete('payments', record_id) for record_id in ids]),
+    ("transaction()",
+     lambda db, records: _in_transaction(db, WRITE_MODES[0][1], records),
+     lambda db, changes: _in_transaction(db, WRITE_MODES[0][2], changes),
+     lambda db, ids: _in_transaction(db, WRITE_MODES[0][3], ids)),
+    ("пакетом",
+     lambda db, records: db.insert_many('payments', records),
+     lambda db, changes: db.update_many('payments', changes),
+     lambda db, ids: db.delete_many('payments', ids)),
+]
+
+
+def _in_transaction(db: GHUDatabase, call: Callable, items: List) -> Any:
+    with db.transaction():
+        return call(db, items)
+
+
+def run_write_benchmark(rows: int, profile: str, seed: int) -> List[Dict]:
+    """
+    Вставка, оплата и удаление rows начислений каждым способом записи на новой
+    базе во временном каталоге. Триггеры сводки задолженностей работают как обычно.
+    """
+    workdir = tempfile.mkdtemp(prefix="ghu_benchmark_")
+    db = GHUDatabase(os.path.join(workdir, "writes.db"), seed=True, profile=profile)
+    rng = random.Random(seed)
+    results = []
+
+    try:
+        conn = db.connect()
+        apartments = [row[0] for row in conn.execute("SELECT id FROM apartments")]
+        services = [row[0] for row in conn.execute("SELECT id FROM services")]
+
+        for mode, insert, update, delete in WRITE_MODES:
+            records = [{
+                'apartment_id': rng.choice(apartments),
+                'service_id': rng.choice(services),
+                'period': f"2030-{rng.randint(1, 12):02d}-01",
+                'amount': round(rng.uniform(100, 5000), 2),
+                'is_paid': 0
+            } for _ in range(rows)]
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM payments").fetchone()[0]
+
+            started = time.perf_counter()
+            insert(db, records)
+            timings = [("insert", time.perf_counter() - started)]
+
+            ids = [row[0] for row in conn.execute("SELECT id FROM payments WHERE id > ? ORDER BY id", (last_id,))]
+            changes = [{'id': record_id, 'is_paid': 1, 'payment_date': "2030-12-31"} for record_id in ids]
+            started = time.perf_counter()
+            update(db, changes)
+            timings.append(("update", time.perf_counter() - started))
+
+            started = time.perf_counter()
+            delete(db, ids)
+            timings.append(("delete", time.perf_counter() - started))
+
+            for operation, seconds in timings:
+                results.append({
+                    'operation': operation,
+                    'mode': mode,
+                    'rows': rows,
+                    'seconds': seconds,
+                    'rows_per_second': rows / seconds if seconds else float('inf')
+                })
+
+        if db.check_debt_summary():
+            raise RuntimeError("Сводка задолженностей расходится с платежами после замера")
+    finally:
+        db.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+# Целевая скорость загрузки реестра платежей, строк в секунду
+LOAD_TARGET = 100000
+
+
+def write_register(path: str, apartments: List[int], services: List[int], rows: int, seed: int,
+                   paid_share: float = 0.7):
+    """CSV-реестр начислений за 2030 год; доля paid_share строк - оплаченные"""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as target:
+        writer = csv.writer(target)
+        writer.writerow(['apartment_id', 'service_id', 'period', 'amount', 'is_paid', 'payment_date'])
+        for _ in range(rows):
+            paid = rng.random() < paid_share
+            writer.writerow([
+                rng.choice(apartments), rng.choice(services), f"2030-{rng.randint(1, 12):02d}-01",
+                f"{rng.uniform(100, 5000):.2f}", int(paid), "2030-12-31" if paid else ""
+            ])
+
+
+def run_load_benchmark(rows: int, payments: int, profile: str, seed: int, workdir: str = None,
+                       chunk_size: int = 50000) -> Dict:
+    """
+    Загрузка реестра из rows строк в копию базы с жилым фондом из payments начислений
+    (индексы и триггеры сводки задолженностей работают как обычно). Отдельно замеряется
+    вставка тех же строк одним executemany - предел скорости самой SQLite на этой схеме.
+    """
+    temporary = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="ghu_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+    path, _ = prepare_dataset(workdir, payments, seed)
+    register = os.path.join(workdir, f"register_{rows}_{seed}.csv")
+    results = {}
+
+    try:
+        for mode in ("load_payments_csv", "executemany"):
+            scratch = os.path.join(workdir, "load.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(scratch + suffix):
+                    os.remove(scratch + suffix)
+            shutil.copyfile(path, scratch)
+
+            db = GHUDatabase(scratch, profile=profile)
+            try:
+                conn = db.connect()
+                if not os.path.exists(register):
+                    write_register(register, [row[0] for row in conn.execute("SELECT id FROM apartments")],
+                                   [row[0] for row in conn.execute("SELECT id FROM services")], rows, seed)
+
+                if mode == "load_payments_csv":
+                    started = time.perf_counter()
+                    loaded = db.load_payments_csv(register, chunk_size=chunk_size)['loaded']
+                    seconds = time.perf_counter() - started
+                else:
+                    with open(register, newline='', encoding='utf-8') as source:
+                        reader = csv.reader(source)
+                        next(reader)
+                        records = [(int(a), int(s), p, float(m), int(i), d or None) for a, s, p, m, i, d in reader]
+                    started = time.perf_counter()
+                    with db.transaction():
+                        loaded = conn.executemany("""
+                            INSERT INTO payments (apartment_id, service_id, period, amount, is_paid, payment_date)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, records).rowcount
+                    seconds = time.perf_counter() - started
+
+                if db.check_debt_summary():
+                    raise RuntimeError("Сводка задолженностей расходится с платежами после загрузки")
+            finally:
+                db.close()
+
+            results[mode] = {'rows': loaded, 'seconds': seconds, 'rows_per_second': loaded / seconds}
+    finally:
+        if temporary:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> List[Dict]:
+    """Сравнение медиан по общим замерам; возвращает строки сравнения с признаком регрессии"""
+    baseline = {(row['payments'], row['case']): row for row in old['results']}
+    rows = []
+    for row in new['results']:
+        before = baseline.get((row['payments'], row['case']))
+        if before is None:
+            continue
+        ratio = row['seconds_median'] / before['seconds_median'] if before['seconds_median'] else float('inf')
+        rows.append({
+            'payments': row['payments'],
+            'case': row['case'],
+            'old': before['seconds_median'],
+            'new': row['seconds_median'],
+            'ratio': ratio,
+            'regression': ratio > threshold
+        })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности базы и отчетов")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    columns = commands.add_parser('columns', help="построчные и векторизованные вычисляемые поля отчетов")
+    columns.add_argument('--rows', type=int, default=500000, help="число строк в каждом отчете")
+    columns.add_argument('--repeat', type=int, default=3, help="число повторов замера")
+
+    suite = commands.add_parser('suite', help="методы базы и отчеты на сгенерированных данных")
+    suite.add_argument('--sizes', type=int, nargs='+', default=SUITE_SIZES, help="объемы (число начислений)")
+    suite.add_argument('--repeat', type=int, default=3, help="число повторов замера")
+    suite.add_argument('--seed', type=int, default=0, help="seed генератора данных")
+    suite.add_argument('--workdir', help="каталог для баз (сохраняются между запусками)")
+    suite.add_argument('--output', default="benchmark_results.json", help="файл результатов JSON")
+
+    comparison = commands.add_parser('compare', help="сравнение двух файлов результатов suite")
+    comparison.add_argument('old', help="результаты до изменения")
+    comparison.add_argument('new', help="результаты после изменения")
+    comparison.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                            help="во сколько раз медиана может вырасти без признака регрессии")
+
+    api = commands.add_parser('api', help="нагрузочный тест HTTP API на локальном сервере")
+    api.add_argument('--payments', type=int, default=100000, help="объем жилого фонда (число начислений)")
+    api.add_argument('--seed', type=int, default=0, help="seed генератора данных и клиентов")
+    api.add_argument('--workdir', help="каталог для баз (сохраняются между запусками)")
+    api.add_argument('--clients', type=int, default=8, help="число параллельных клиентов")
+    api.add_argument('--requests', type=int, default=200, help="число запросов каждого клиента")
+    api.add_argument('--no-conditional', action='store_true', help="не отправлять If-None-Match")
+    api.add_argument('--output', help="файл результатов JSON")
+
+    writes = commands.add_parser('writes', help="запись по одной строке, в transaction() и пакетами")
+    writes.add_argument('--rows', type=int, default=2000, help="число начислений для каждого способа")
+    writes.add_argument('--profile', default="default", choices=sorted(PRAGMA_PROFILES),
+                        help="профиль настроек соединений (safe - fsync на каждый commit)")
+    writes.add_argument('--seed', type=int, default=0, help="seed генератора данных")
+
+    load = commands.add_parser('load', help="загрузка реестра платежей из CSV")
+    load.add_argument('--rows', type=int, default=300000, help="число строк реестра")
+    load.add_argument('--payments', type=int, default=100000, help="объем жилого фонда (число начислений)")
+    load.add_argument('--profile', default="default", choices=sorted(PRAGMA_PROFILES),
+                      help="профиль настроек соединений")
+    load.add_argument('--chunk-size', type=int, default=50000, help="размер порции загрузки")
+    load.add_argument('--seed', type=int, default=0, help="seed генератора данных")
+    load.add_argument('--workdir', help="каталог для баз (сохраняются между запусками)")
+    args = parser.parse_args()
+
+    if args.command == 'columns':
+        print(f"{'Отчет':<12}{'Построчно, с':>16}{'Вектором, с':>16}{'Ускорение':>12}")
+        for result in run(args.rows, args.repeat):
+            print(f"{result['report']:<12}{result['legacy_seconds']:>16.3f}"
+                  f"{result['vectorized_seconds']:>16.3f}{result['speedup']:>11.1f}x")
+        return 0
+
+    if args.command == 'suite':
+        results = run_suite(args.sizes, args.repeat, args.seed, args.workdir)
+        with open(args.output, 'w', encoding='utf-8') as target:
+            json.dump(results, target, ensure_ascii=False, indent=2)
+        print(f"Результаты записаны в {args.output}")
+        return 0
+
+    if args.command == 'api':
+        result = run_api_benchmark(args.payments, args.seed, args.workdir, args.clients, args.requests,
+                                   not args.no_conditional)
+        print(f"{'Запрос':<32}{'Всего':>8}{'Ошибок':>8}{'304':>8}{'p50, мс':>10}{'p95, мс':>10}{'Макс, мс':>10}")
+        for row in result['endpoints']:
+            print(f"{row['endpoint']:<32}{row['requests']:>8}{row['errors']:>8}{row['not_modified']:>8}"
+                  f"{row['ms_p50']:>10.1f}{row['ms_p95']:>10.1f}{row['ms_max']:>10.1f}")
+        print(f"Запросов: {result['requests']} за {result['seconds']:.1f} с, "
+              f"{result['requests_per_second']:.0f} в секунду, ошибок: {result['errors']}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as target:
+                json.dump(result, target, ensure_ascii=False, indent=2)
+        return 1 if result['errors'] else 0
+
+    if args.command == 'writes':
+        results = run_write_benchmark(args.rows, args.profile, args.seed)
+        baseline = {row['operation']: row['seconds'] for row in results if row['mode'] == WRITE_MODES[0][0]}
+        print(f"{'Операция':<10}{'Способ':<16}{'Время, с':>10}{'Строк в с':>12}{'Ускорение':>12}")
+        for row in results:
+            speedup = baseline[row['operation']] / row['seconds'] if row['seconds'] else float('inf')
+            print(f"{row['operation']:<10}{row['mode']:<16}{row['seconds']:>10.3f}"
+                  f"{row['rows_per_second']:>12.0f}{speedup:>11.1f}x")
+        return 0
+
+    if args.command == 'load':
+        results = run_load_benchmark(args.rows, args.payments, args.profile, args.seed, args.workdir,
+                                     args.chunk_size)
+        print(f"{'Способ':<20}{'Строк':>10}{'Время, с':>10}{'Строк в с':>12}{'Цель':>10}")
+        for mode, row in results.items():
+            print(f"{mode:<20}{row['rows']:>10}{row['seconds']:>10.2f}{row['rows_per_second']:>12.0f}"
+                  f"{row['rows_per_second'] / LOAD_TARGET:>9.0%}")
+        return 0
+
+    with open(args.old, encoding='utf-8') as source:
+        old = json.load(source)
+    with open(args.new, encoding='utf-8') as source:
+        new = json.load(source)
+
+    rows = compare(old, new, args.threshold)
+    for row in rows:
+        mark = "  РЕГРЕССИЯ" if row['regression'] else ""
+        print(f"[{row['payments']}] {row['case']:<34}{row['old']:>10.4f} -> {row['new']:>10.4f} с"
+              f"{row['ratio']:>8.2f}x{mark}")
+
+    regressions = sum(row['regression'] for row in rows)
+    print(f"Сравнено замеров: {len(rows)}, регрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from columnar import REPORT_PERIOD_COLUMNS
+from database import GHUDatabase, MemoryReplica, PRAGMA_PROFILES
+from reports import GHUReports, REPORT_TYPES
+
+# Пакетный запуск отчетов и выгрузок без графического интерфейса (для cron и сервера).
+# Модуль не импортирует tkinter.
+
+# Коды завершения
+EXIT_OK = 0
+EXIT_FAILED = 1          # хотя бы один отчет или выгрузка завершились ошибкой
+EXIT_USAGE = 2           # ошибка в аргументах (так же завершается argparse)
+EXIT_DATABASE = 3        # база данных не найдена или не открывается
+
+
+def parse_scoped(values: List[str], reports: List[str], option: str) -> Dict[str, Dict[str, str]]:
+    """
+    Разбор повторяемых аргументов вида [отчет:]ключ=значение.
+    Без префикса значение относится ко всем выбранным отчетам.
+    """
+    scoped = {report: {} for report in reports}
+    for value in values or []:
+        key, separator, item = value.partition('=')
+        target, _, key = key.rpartition(':')
+        if not separator or not key:
+            raise ValueError(f"{option}: ожидается [отчет:]ключ=значение, получено {value!r}")
+        if target and target not in scoped:
+            raise ValueError(f"{option}: отчет {target!r} не выбран")
+        for report in ([target] if target else reports):
+            scoped[report][key] = item
+    return scoped
+
+
+def parse_sort(values: List[str], reports: List[str]) -> Dict[str, tuple]:
+    """Разбор --sort [отчет:]поле[:asc|desc] в {отчет: (поле, по возрастанию)}"""
+    sorting = {}
+    for value in values or []:
+        parts = value.split(':')
+        target = parts.pop(0) if parts[0] in REPORT_TYPES else None
+        if not parts or len(parts) > 2 or (len(parts) == 2 and parts[1] not in ('asc', 'desc')):
+            raise ValueError(f"--sort: ожидается [отчет:]поле[:asc|desc], получено {value!r}")
+        if target and target not in reports:
+            raise ValueError(f"--sort: отчет {target!r} не выбран")
+        ascending = None if len(parts) == 1 else parts[1] == 'asc'
+        for report in ([target] if target else reports):
+            sorting[report] = (parts[0], ascending)
+    return sorting
+
+
+def run_report(db: GHUDatabase, report_type: str, filters: Dict, sort_by: Optional[str],
+               ascending: Optional[bool], output_dir: str, details: bool, file_format: str = 'csv',
+               partition: bool = False, replica: MemoryReplica = None) -> Dict:
+    """
+    Формирование одного отчета в рабочем потоке на собственном соединении из пула.
+    Детальные строки выгружаются в CSV потоково, группировка и итоги считаются в SQL.
+    В формате parquet все части отчета пишутся в каталог <output_dir>/<отчет>.
+    С replica запросы выполняются по копии базы в памяти.
+    """
+    started = time.perf_counter()
+    reports = GHUReports(db, replica=replica)
+    files = []
+    rows = None
+    grouped = None
+    parquet = details and file_format == 'parquet'
+
+    try:
+        if parquet:
+            exported = reports.export_report_parquet(
+                report_type, os.path.join(output_dir, report_type), filters, sort_by, ascending, partition
+            )
+            rows, files = exported['rows'], exported['files']
+        elif details:
+            path = os.path.join(output_dir, f"{report_type}.csv")
+            rows = reports.export_report_csv(report_type, path, filters, sort_by, ascending)
+            files.append(path)
+
+        if not parquet:
+            _, grouped, totals = reports.generate(report_type, filters, sort_by, ascending, details=False)
+
+            path = os.path.join(output_dir, f"{report_type}_grouped.csv")
+            grouped.to_csv(path, encoding='utf-8-sig')
+            files.append(path)
+
+            path = os.path.join(output_dir, f"{report_type}_totals.json")
+            with open(path, 'w', encoding='utf-8') as target:
+                json.dump(totals, target, ensure_ascii=False, indent=2, default=float)
+            files.append(path)
+    finally:
+        db.release_connection()
+
+    return {
+        'report': report_type,
+        'rows': rows,
+        'groups': len(grouped) if grouped is not None else None,
+        'files': files,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def command_report(db: GHUDatabase, args) -> int:
+    reports = REPORT_TYPES if 'all' in args.reports else list(dict.fromkeys(args.reports))
+    try:
+        filters = parse_scoped(args.filter, reports, '--filter')
+        sorting = parse_sort(args.sort, reports)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = max(1, min(args.workers, len(reports)))
+    failed = 0
+
+    replica = None
+    if args.replica:
+        replica = MemoryReplica(db)
+        replica.refresh()
+        print(f"Копия базы в памяти снята за {replica.seconds:.2f} с")
+
+    # Отчеты выполняются параллельно: у каждого рабочего потока свое соединение с базой
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as executor:
+        futures = {
+            report: executor.submit(
+                run_report, db, report, filters[report], *sorting.get(report, (None, None)),
+                args.output_dir, not args.totals_only, args.format,
+                args.partition and report in REPORT_PERIOD_COLUMNS, replica
+            )
+            for report in reports
+        }
+        for report, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{report}] ошибка: {e}", file=sys.stderr)
+                continue
+
+            counts = []
+            if result['rows'] is not None:
+                counts.append(f"{result['rows']} строк")
+            if result['groups'] is not None:
+                counts.append(f"{result['groups']} групп")
+            print(f"[{report}] {', '.join(counts)}, {result['seconds']:.2f} с -> {', '.join(result['files'])}")
+
+    if replica is not None:
+        replica.close()
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def command_export(db: GHUDatabase, args) -> int:
+    try:
+        conditions = parse_scoped(args.filter, [args.table], '--filter')[args.table]
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    started = time.perf_counter()
+    try:
+        if args.format == 'parquet':
+            written = db.export_table_parquet(
+                args.output, args.table, conditions, args.sort, not args.descending, args.partition
+            )['rows']
+        else:
+            written = db.export_table_csv(args.output, args.table, conditions, args.sort, not args.descending)
+    except Exception as e:
+        print(f"[{args.table}] ошибка: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"[{args.table}] {written} строк, {time.perf_counter() - started:.2f} с -> {args.output}")
+    return EXIT_OK
+
+
+def command_archive(db: GHUDatabase, args) -> int:
+    try:
+        result = db.archive_payments(
+            args.before, progress=lambda year, moved: print(f"[{year}] {moved} строк -> {db.archive_path(year)}")
+        )
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except Exception as e:
+        print(f"[archive] ошибка: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"[archive] периоды до {result['before'][:7]}: {result['moved']} строк, {result['seconds']:.2f} с")
+    return EXIT_OK
+
+
+def command_reconcile(db: GHUDatabase, args) -> int:
+    review_path = args.review or f"{os.path.splitext(args.statement)[0]}_review.csv"
+    try:
+        result = db.reconcile_statement(args.statement, review_path)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except Exception as e:
+        print(f"[reconcile] ошибка: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f"[reconcile] строк: {result['lines']}, оплачено: {result['matched']} на {result['matched_amount']:.2f}, "
+          f"не найдено: {result['unmatched']}, неоднозначно: {result['ambiguous']}, ошибок: {result['invalid']}, "
+          f"{result['seconds']:.2f} с -> {review_path}")
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Отчеты и выгрузки службы заказчика ГЖУ без графического интерфейса")
+    parser.add_argument('--db', default="ghu_database.db", help="файл базы данных")
+    parser.add_argument('--profile', default="default", choices=sorted(PRAGMA_PROFILES),
+                        help="профиль настроек соединений")
+    parser.add_argument('--slow-query-log', help="журнал медленных запросов")
+    parser.add_argument('--query-stats', help="файл JSON для статистики запросов по завершении")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', help="формирование отчетов")
+    report.add_argument('reports', nargs='+', choices=REPORT_TYPES + ['all'], help="отчеты")
+    report.add_argument('--filter', action='append', metavar="[ОТЧЕТ:]КЛЮЧ=ЗНАЧЕНИЕ",
+                        help="фильтр отчета, например debts:min_debt=1000 или address=Ленина")
+    report.add_argument('--sort', action='append', metavar="[ОТЧЕТ:]ПОЛЕ[:asc|desc]",
+                        help="сортировка детальных строк, например electoral:age:desc")
+    report.add_argument('--output-dir', default=".", help="каталог для файлов отчетов")
+    report.add_argument('--totals-only', action='store_true',
+                        help="только группировка и итоги (CSV и JSON), без детальных строк")
+    report.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="формат файлов отчета")
+    report.add_argument('--partition', action='store_true',
+                        help="parquet: разбить детальные строки отчетов с периодом по месяцам")
+    report.add_argument('--workers', type=int, default=len(REPORT_TYPES),
+                        help="число отчетов, формируемых одновременно")
+    report.add_argument('--replica', action='store_true',
+                        help="формировать отчеты по копии базы в памяти, не читая рабочий файл")
+
+    export = commands.add_parser('export', help="выгрузка таблицы в CSV или Parquet")
+    export.add_argument('table', help="таблица")
+    export.add_argument('--output', required=True, help="файл (при --partition - каталог)")
+    export.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="формат выгрузки")
+    export.add_argument('--partition', action='store_true', help="parquet: разбить по месяцам period")
+    export.add_argument('--filter', action='append', metavar="ПОЛЕ=ЗНАЧЕНИЕ", help="фильтр по полю")
+    export.add_argument('--sort', help="поле сортировки")
+    export.add_argument('--descending', action='store_true', help="сортировка по убыванию")
+
+    archive = commands.add_parser('archive', help="перенос оплаченных платежей старых периодов в архив по годам")
+    archive.add_argument('--before', required=True, metavar="ГГГГ-ММ",
+                         help="архивировать периоды раньше указанного")
+
+    reconcile = commands.add_parser('reconcile', help="сверка банковской выписки и оплата начислений")
+    reconcile.add_argument('statement', help="выписка CSV: apartment_id, period, amount[, payment_date, service_id]")
+    reconcile.add_argument('--review', help="файл строк для проверки (по умолчанию <выписка>_review.csv)")
+
+    return parser
+
+
+COMMANDS = {
+    'report': command_report,
+    'export': command_export,
+    'archive': command_archive,
+    'reconcile': command_reconcile
+}
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.db != ":memory:" and not os.path.exists(args.db):
+        print(f"Ошибка: база данных не найдена: {args.db}", file=sys.stderr)
+        return EXIT_DATABASE
+
+    started = time.perf_counter()
+    try:
+        db = GHUDatabase(args.db, profile=args.profile, slow_query_log=args.slow_query_log)
+    except Exception as e:
+        print(f"Ошибка открытия базы данных: {e}", file=sys.stderr)
+        return EXIT_DATABASE
+
+    try:
+        code = COMMANDS[args.command](db, args)
+        if args.query_stats:
+            db.dump_query_stats(args.query_stats)
+    finally:
+        db.close()
+
+    print(f"Завершено за {time.perf_counter() - started:.2f} с, код {code}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import glob
+import os
+from typing import Dict, List, Optional
+import pandas as pd
+
+# Колоночный экспорт таблиц и отчетов в Parquet через pyarrow.
+# pyarrow - необязательная зависимость: импортируется при первом экспорте, без него
+# работает все остальное (CSV, отчеты, интерфейс).
+
+# Число строк в группе строк (row group) файла Parquet
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# Сжатие файлов Parquet
+PARQUET_COMPRESSION = 'zstd'
+
+# Денежные суммы: decimal с двумя знаками после запятой
+MONEY_PRECISION = 15
+MONEY_SCALE = 2
+
+# Поля таблиц, которые хранятся в SQLite как TEXT или REAL, но являются датами или деньгами
+DATE_COLUMNS = {'period', 'payment_date', 'birth_date', 'registration_date', 'last_period', 'oldest_period'}
+MONEY_COLUMNS = {'amount', 'price', 'unpaid_sum'}
+
+# Типы полей отчетов по названию; остальные определяются по типу столбца DataFrame
+REPORT_COLUMN_KINDS = {
+    'Период': 'date',
+    'Дата_оплаты': 'date',
+    'Последний_период': 'date',
+    'Дата_рождения': 'date',
+    'Дата_регистрации': 'date',
+    'Тариф': 'money',
+    'Сумма': 'money',
+    'Сумма_с_НДС': 'money',
+    'Общая_задолженность': 'money',
+    'Итого_по_дому': 'money',
+    'Сумма_долга_по_дому': 'money',
+    'Всего_сумма': 'money',
+    'Общий_долг': 'money',
+    'Самый_большой_долг': 'money'
+}
+
+# Поле-дата, по месяцу которого разбивается выгрузка (partition=True)
+TABLE_PERIOD_COLUMNS = {'payments': 'period'}
+REPORT_PERIOD_COLUMNS = {'payments': 'Период', 'debts': 'Последний_период'}
+
+# Каталоги разбиения в стиле Hive: <каталог>/month=ГГГГ-ММ/part-0.parquet
+PARTITION_KEY = 'month'
+PARTITION_NULL = '__HIVE_DEFAULT_PARTITION__'
+
+
+def require_pyarrow():
+    """Модули pyarrow и pyarrow.parquet; понятная ошибка, если пакет не установлен"""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Для экспорта в Parquet нужен пакет pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def arrow_type(kind: str):
+    pa, _, _ = require_pyarrow()
+    return {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'money': pa.decimal128(MONEY_PRECISION, MONEY_SCALE),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'text': pa.string()
+    }[kind]
+
+
+def table_column_kinds(conn, table_name: str) -> Dict[str, str]:
+    """Типы полей таблицы по объявленным типам SQLite и спискам дат и денежных полей"""
+    kinds = {}
+    for row in conn.execute(f"PRAGMA table_info({table_name})"):
+        name, declared = row['name'], (row['type'] or '').upper()
+        if name in DATE_COLUMNS:
+            kinds[name] = 'date'
+        elif name in MONEY_COLUMNS:
+            kinds[name] = 'money'
+        elif 'BOOL' in declared:
+            kinds[name] = 'bool'
+        elif 'INT' in declared:
+            kinds[name] = 'int'
+        elif any(real in declared for real in ('REAL', 'FLOA', 'DOUB')):
+            kinds[name] = 'float'
+        else:
+            kinds[name] = 'text'
+    return kinds
+
+
+def frame_column_kinds(df: pd.DataFrame) -> Dict[str, str]:
+    """Типы полей отчета: по названию, иначе по типу столбца"""
+    kinds = {}
+    for name, dtype in df.dtypes.items():
+        if name in REPORT_COLUMN_KINDS:
+            kinds[name] = REPORT_COLUMN_KINDS[name]
+        elif pd.api.types.is_bool_dtype(dtype):
+            kinds[name] = 'bool'
+        elif pd.api.types.is_integer_dtype(dtype):
+            kinds[name] = 'int'
+        elif pd.api.types.is_float_dtype(dtype):
+            kinds[name] = 'float'
+        else:
+            kinds[name] = 'text'
+    return kinds
+
+
+def to_arrow(values, kind: str):
+    """
+    Столбец значений (последовательность или Series) в массив Arrow нужного типа.
+    Даты - строки ГГГГ-ММ-ДД; значения, которые не разбираются как дата, становятся null.
+    """
+    pa, pc, _ = require_pyarrow()
+    array = pa.array(values, from_pandas=True)
+    if kind == 'date':
+        if pa.types.is_date(array.type):
+            return array.cast(pa.date32())
+        text = pc.utf8_slice_codeunits(array.cast(pa.string()), 0, 10)
+        return pc.strptime(text, format='%Y-%m-%d', unit='s', error_is_null=True).cast(pa.date32())
+    if kind == 'money':
+        return pc.round(array.cast(pa.float64()), MONEY_SCALE).cast(arrow_type('money'))
+    return array.cast(arrow_type(kind))
+
+
+def arrow_schema(kinds: Dict[str, str]):
+    pa, _, _ = require_pyarrow()
+    return pa.schema([(name, arrow_type(kind)) for name, kind in kinds.items()])
+
+
+def rows_to_table(rows: List[tuple], kinds: Dict[str, str]):
+    """Порция строк курсора в таблицу Arrow"""
+    pa, _, _ = require_pyarrow()
+    columns = list(zip(*rows)) if rows else [()] * len(kinds)
+    arrays = [to_arrow(values, kind) for values, kind in zip(columns, kinds.values())]
+    return pa.Table.from_arrays(arrays, schema=arrow_schema(kinds))
+
+
+def frame_to_table(df: pd.DataFrame, kinds: Dict[str, str]):
+    """DataFrame в таблицу Arrow с типами kinds"""
+    pa, _, _ = require_pyarrow()
+    arrays = [to_arrow(df[name], kind) for name, kind in kinds.items()]
+    return pa.Table.from_arrays(arrays, schema=arrow_schema(kinds))
+
+
+class ParquetSink:
+    """
+    Потоковая запись таблиц Arrow в Parquet группами по row_group_size строк.
+    Без partition_by пишется один файл path. С partition_by (поле-дата) path -
+    каталог, строки раскладываются по месяцам в path/month=ГГГГ-ММ/part-0.parquet,
+    чтобы читатели (pyarrow.dataset, DuckDB, Spark) открывали только нужные месяцы.
+    С началом следующего месяца в потоке недописанные строки предыдущего
+    записываются, поэтому в памяти держится не больше группы строк текущего месяца.
+    Поток лучше упорядочить по полю разбиения: иначе месяцы получают мелкие группы строк.
+    peak_buffered - наибольшее число строк, одновременно ожидавших записи.
+    """
+
+    def __init__(self, path: str, schema, partition_by: Optional[str] = None,
+                 row_group_size: int = PARQUET_ROW_GROUP_SIZE):
+        self.pa, self.pc, self.pq = require_pyarrow()
+        self.path = path
+        self.schema = schema
+        self.partition_by = partition_by
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.peak_buffered = 0
+        self.files: List[str] = []
+        self._writers = {}
+        self._buffers = {}
+        self._current = None
+
+        if partition_by is not None:
+            # Файлы прошлой выгрузки в тот же каталог удаляются, чтобы не смешать месяцы
+            for stale in glob.glob(os.path.join(path, f"{PARTITION_KEY}=*", "part-*.parquet")):
+                os.remove(stale)
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, table):
+        self.rows += table.num_rows
+        if self.partition_by is None:
+            self._append(None, table)
+            return
+
+        months = self.pc.strftime(table.column(self.partition_by), format='%Y-%m')
+        # unique сохраняет порядок первого появления, то есть порядок потока
+        for month in self.pc.unique(months).to_pylist():
+            key = month or PARTITION_NULL
+            if key != self._current and self._current in self._buffers:
+                self._flush(self._current, final=True)
+            self._current = key
+            mask = self.pc.is_null(months) if month is None else self.pc.equal(months, month)
+            self._append(key, table.filter(mask))
+
+    def close(self) -> List[str]:
+        """Запись оставшихся строк и закрытие файлов; возвращает список файлов"""
+        for key in list(self._buffers):
+            self._flush(key, final=True)
+        if self.partition_by is None and not self._writers:
+            # Пустой результат: файл со схемой и без строк
+            self._writer(None)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        return self.files
+
+    def abort(self):
+        """Закрытие файлов без записи оставшихся строк (после ошибки)"""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        self._buffers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _append(self, key, table):
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(table)
+        buffered = sum(part.num_rows for parts in self._buffers.values() for part in parts)
+        self.peak_buffered = max(self.peak_buffered, buffered)
+        if sum(part.num_rows for part in buffer) >= self.row_group_size:
+            self._flush(key)
+
+    def _flush(self, key, final: bool = False):
+        """Запись полных групп строк; остаток пишется только при final"""
+        combined = self.pa.concat_tables(self._buffers.pop(key))
+        while combined.num_rows >= self.row_group_size or (final and combined.num_rows):
+            self._writer(key).write_table(combined.slice(0, self.row_group_size),
+                                          row_group_size=self.row_group_size)
+            combined = combined.slice(self.row_group_size)
+        if combined.num_rows:
+            self._buffers[key] = [combined]
+
+    def _writer(self, key):
+        writer = self._writers.get(key)
+        if writer is None:
+            if self.partition_by is None:
+                path = self.path
+            else:
+                path = os.path.join(self.path, f"{PARTITION_KEY}={key}", "part-0.parquet")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = self._writers[key] = self.pq.ParquetWriter(path, self.schema, compression=PARQUET_COMPRESSION)
+            self.files.append(path)
+        return writer
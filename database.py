@@ -1,440 +1,1865 @@
-import sqlite3
-import os
-from datetime import datetime, date
-from typing import List, Dict, Any, Optional
-import pandas as pd
-
-class GHUDatabase:
-    """База данных для службы заказчика ГЖУ"""
-    
-    def __init__(self, db_path: str = "ghu_database.db"):
-        self.db_path = db_path
-        self.conn = None
-        
-        # Удаляем старую базу данных если она существует
-        if os.path.exists(db_path):
-            os.remove(db_path)
-            print(f"Старая база данных {db_path} удалена")
-        
-        self._create_tables()
-        self._insert_sample_data()
-    
-    def connect(self):
-        """Подключение к базе данных"""
-        if not self.conn:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-        return self.conn
-    
-    def close(self):
-        """Закрытие соединения"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-    
-    def _create_tables(self):
-        """Создание всех таблиц"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        print("Создание таблиц...")
-        
-        # Таблица районов
-        cursor.execute("""
-        CREATE TABLE districts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            manager TEXT,
-            phone TEXT
-        )
-        """)
-        
-        # Таблица домов
-        cursor.execute("""
-        CREATE TABLE buildings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            address TEXT NOT NULL,
-            year_built INTEGER,
-            floors INTEGER,
-            total_apartments INTEGER DEFAULT 0
-        )
-        """)
-        
-        # Таблица квартир - правильная структура
-        cursor.execute("""
-        CREATE TABLE apartments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            building_id INTEGER NOT NULL,
-            number TEXT NOT NULL,
-            area REAL NOT NULL CHECK(area > 0),
-            rooms INTEGER,
-            privatized BOOLEAN DEFAULT 0,
-            cold_water BOOLEAN DEFAULT 0,
-            hot_water BOOLEAN DEFAULT 0,
-            garbage_chute BOOLEAN DEFAULT 0,
-            elevator BOOLEAN DEFAULT 0,
-            FOREIGN KEY (building_id) REFERENCES buildings(id) ON DELETE CASCADE
-        )
-        """)
-        
-        # Таблица жильцов
-        cursor.execute("""
-        CREATE TABLE residents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            apartment_id INTEGER NOT NULL,
-            full_name TEXT NOT NULL,
-            birth_date TEXT NOT NULL,
-            passport TEXT,
-            is_owner BOOLEAN DEFAULT 0,
-            phone TEXT,
-            registration_date TEXT DEFAULT CURRENT_DATE,
-            FOREIGN KEY (apartment_id) REFERENCES apartments(id) ON DELETE CASCADE
-        )
-        """)
-        
-        # Таблица услуг
-        cursor.execute("""
-        CREATE TABLE services (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            price REAL NOT NULL CHECK(price > 0),
-            description TEXT
-        )
-        """)
-        
-        # Таблица платежей
-        cursor.execute("""
-        CREATE TABLE payments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            apartment_id INTEGER NOT NULL,
-            service_id INTEGER NOT NULL,
-            period TEXT NOT NULL,
-            amount REAL NOT NULL CHECK(amount >= 0),
-            is_paid BOOLEAN DEFAULT 0,
-            payment_date TEXT,
-            FOREIGN KEY (apartment_id) REFERENCES apartments(id) ON DELETE CASCADE,
-            FOREIGN KEY (service_id) REFERENCES services(id)
-        )
-        """)
-        
-        conn.commit()
-        print("Таблицы созданы успешно!")
-    
-    def _insert_sample_data(self):
-        """Вставка тестовых данных"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        print("Добавление тестовых данных...")
-        
-        # Добавляем районы
-        districts = [
-            ("Центральный район", "Иванов И.И.", "+7-111-222-3333"),
-            ("Северный район", "Петров П.П.", "+7-111-222-4444"),
-            ("Южный район", "Сидоров С.С.", "+7-111-222-5555")
-        ]
-        
-        for name, manager, phone in districts:
-            cursor.execute(
-                "INSERT INTO districts (name, manager, phone) VALUES (?, ?, ?)",
-                (name, manager, phone)
-            )
-        
-        # Добавляем дома
-        buildings = [
-            ("ул. Ленина, 10", 1985, 5),
-            ("ул. Советская, 25", 1990, 9),
-            ("пр. Мира, 15", 2000, 12)
-        ]
-        
-        for address, year, floors in buildings:
-            cursor.execute(
-                "INSERT INTO buildings (address, year_built, floors) VALUES (?, ?, ?)",
-                (address, year, floors)
-            )
-        
-        # Добавляем квартиры
-        apartments = [
-            # building_id, number, area, rooms, privatized, cold_water, hot_water, garbage_chute, elevator
-            (1, "25", 55.5, 2, 1, 1, 1, 1, 1),
-            (1, "26", 42.0, 1, 0, 1, 1, 0, 1),
-            (2, "101", 75.0, 3, 1, 1, 1, 1, 1),
-            (3, "35", 48.0, 2, 0, 1, 0, 1, 0)
-        ]
-        
-        for building_id, number, area, rooms, privatized, cold_water, hot_water, garbage_chute, elevator in apartments:
-            cursor.execute("""
-                INSERT INTO apartments (building_id, number, area, rooms, privatized, 
-                                       cold_water, hot_water, garbage_chute, elevator)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (building_id, number, area, rooms, privatized, 
-                 cold_water, hot_water, garbage_chute, elevator))
-        
-        # Обновляем счетчики квартир в домах
-        for i in range(1, 4):
-            cursor.execute("SELECT COUNT(*) FROM apartments WHERE building_id = ?", (i,))
-            count = cursor.fetchone()[0]
-            cursor.execute("UPDATE buildings SET total_apartments = ? WHERE id = ?", (count, i))
-        
-        # Добавляем жильцов
-        residents = [
-            (1, "Иванов Иван Иванович", "1980-05-15", "1234 567890", 1, "+7-900-111-2233"),
-            (1, "Иванова Мария Петровна", "1985-07-22", "1234 567891", 0, "+7-900-111-2234"),
-            (2, "Петров Петр Петрович", "1975-11-30", "4321 123456", 1, "+7-900-222-3344"),
-            (3, "Сидорова Анна Васильевна", "1950-12-05", "5678 901234", 1, "+7-900-333-4455"),
-            (4, "Козлов Алексей Дмитриевич", "1990-02-14", "3456 789012", 1, "+7-900-444-5566")
-        ]
-        
-        for apartment_id, name, birth, passport, owner, phone in residents:
-            cursor.execute("""
-                INSERT INTO residents (apartment_id, full_name, birth_date, passport, is_owner, phone)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (apartment_id, name, birth, passport, owner, phone))
-        
-        # Добавляем услуги
-        services = [
-            ("Холодное водоснабжение", 25.50, "Водоснабжение холодной водой"),
-            ("Горячее водоснабжение", 45.30, "Водоснабжение горячей водой"),
-            ("Отопление", 35.20, "Отопление помещений"),
-            ("Электроснабжение", 4.80, "Электроэнергия"),
-            ("Вывоз ТБО", 8.90, "Вывоз твердых бытовых отходов")
-        ]
-        
-        for name, price, desc in services:
-            cursor.execute(
-                "INSERT INTO services (name, price, description) VALUES (?, ?, ?)",
-                (name, price, desc)
-            )
-        
-        # Добавляем платежи
-        payments = [
-            (1, 1, "2024-01-01", 1415.25, 1, "2024-01-15"),
-            (1, 2, "2024-01-01", 2511.15, 1, "2024-01-16"),
-            (1, 1, "2024-02-01", 1415.25, 0, None),
-            (2, 1, "2024-01-01", 1071.00, 1, "2024-01-10"),
-            (3, 1, "2024-01-01", 1912.50, 1, "2024-01-20"),
-            (4, 1, "2024-01-01", 1224.00, 0, None)
-        ]
-        
-        for apartment_id, service_id, period, amount, paid, pay_date in payments:
-            cursor.execute("""
-                INSERT INTO payments (apartment_id, service_id, period, amount, is_paid, payment_date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (apartment_id, service_id, period, amount, paid, pay_date))
-        
-        conn.commit()
-        print("Тестовые данные успешно добавлены!")
-    
-    # === CRUD операции ===
-    
-    def get_all(self, table_name: str) -> List[Dict]:
-        """Получить все записи из таблицы"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    
-    def get_by_id(self, table_name: str, record_id: int) -> Optional[Dict]:
-        """Получить запись по ID"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_name} WHERE id = ?", (record_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
-    
-    def insert(self, table_name: str, data: Dict) -> int:
-        """Вставить новую запись"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?' for _ in data])
-        values = tuple(data.values())
-        
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        cursor.execute(query, values)
-        conn.commit()
-        
-        return cursor.lastrowid
-    
-    def update(self, table_name: str, record_id: int, data: Dict) -> bool:
-        """Обновить запись"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        set_clause = ', '.join([f"{key} = ?" for key in data.keys()])
-        values = tuple(data.values()) + (record_id,)
-        
-        query = f"UPDATE {table_name} SET {set_clause} WHERE id = ?"
-        cursor.execute(query, values)
-        conn.commit()
-        
-        return cursor.rowcount > 0
-    
-    def delete(self, table_name: str, record_id: int) -> bool:
-        """Удалить запись"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (record_id,))
-        conn.commit()
-        
-        return cursor.rowcount > 0
-    
-    def search(self, table_name: str, field: str, value: str) -> List[Dict]:
-        """Поиск записей по полю"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        cursor.execute(f"SELECT * FROM {table_name} WHERE {field} LIKE ?", (f'%{value}%',))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    
-    def filter_records(self, table_name: str, conditions: Dict) -> List[Dict]:
-        """Фильтрация записей по нескольким полям"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        if not conditions:
-            return self.get_all(table_name)
-        
-        where_clauses = []
-        values = []
-        
-        for field, value in conditions.items():
-            if value not in ['', None]:
-                where_clauses.append(f"{field} LIKE ?")
-                values.append(f'%{value}%')
-        
-        if not where_clauses:
-            return self.get_all(table_name)
-        
-        query = f"SELECT * FROM {table_name} WHERE {' AND '.join(where_clauses)}"
-        cursor.execute(query, values)
-        rows = cursor.fetchall()
-        
-        return [dict(row) for row in rows] if rows else []
-    
-    def sort_records(self, table_name: str, field: str, ascending: bool = True) -> List[Dict]:
-        """Сортировка записей по полю"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        order = "ASC" if ascending else "DESC"
-        cursor.execute(f"SELECT * FROM {table_name} ORDER BY {field} {order}")
-        rows = cursor.fetchall()
-        
-        return [dict(row) for row in rows] if rows else []
-    
-    # === Специфичные методы ===
-    
-    def get_apartments_by_building(self, building_id: int) -> List[Dict]:
-        """Получить все квартиры в доме"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.*, b.address as building_address 
-            FROM apartments a 
-            JOIN buildings b ON a.building_id = b.id 
-            WHERE a.building_id = ?
-            ORDER BY a.number
-        """, (building_id,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    
-    def get_residents_by_apartment(self, apartment_id: int) -> List[Dict]:
-        """Получить всех жильцов в квартире"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT r.*, a.number as apartment_number, b.address as building_address
-            FROM residents r 
-            JOIN apartments a ON r.apartment_id = a.id 
-            JOIN buildings b ON a.building_id = b.id 
-            WHERE r.apartment_id = ?
-            ORDER BY r.is_owner DESC, r.full_name
-        """, (apartment_id,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    
-    def get_payments_by_apartment(self, apartment_id: int) -> List[Dict]:
-        """Получить все платежи по квартире"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.*, s.name as service_name, a.number as apartment_number
-            FROM payments p 
-            JOIN services s ON p.service_id = s.id 
-            JOIN apartments a ON p.apartment_id = a.id 
-            WHERE p.apartment_id = ?
-            ORDER BY p.period DESC
-        """, (apartment_id,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows] if rows else []
-    
-    def add_apartment_with_residents(self, building_id: int, apartment_data: Dict, residents_data: List[Dict]) -> int:
-        """Добавить квартиру с жильцами (форма 1:М)"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        try:
-            # Добавляем квартиру
-            cursor.execute("""
-                INSERT INTO apartments (building_id, number, area, rooms, privatized, 
-                                       cold_water, hot_water, garbage_chute, elevator)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                building_id,
-                apartment_data['number'],
-                apartment_data['area'],
-                apartment_data.get('rooms'),
-                1 if apartment_data.get('privatized') else 0,
-                1 if apartment_data.get('cold_water', True) else 0,
-                1 if apartment_data.get('hot_water', True) else 0,
-                1 if apartment_data.get('garbage_chute', True) else 0,
-                1 if apartment_data.get('elevator', True) else 0
-            ))
-            
-            apartment_id = cursor.lastrowid
-            
-            # Обновляем счетчик квартир в доме
-            cursor.execute("UPDATE buildings SET total_apartments = total_apartments + 1 WHERE id = ?", (building_id,))
-            
-            # Добавляем жильцов
-            for resident in residents_data:
-                cursor.execute("""
-                    INSERT INTO residents (apartment_id, full_name, birth_date, passport, is_owner, phone)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    apartment_id,
-                    resident['full_name'],
-                    resident['birth_date'],
-                    resident.get('passport'),
-                    1 if resident.get('is_owner') else 0,
-                    resident.get('phone')
-                ))
-            
-            conn.commit()
-            return apartment_id
-            
-        except Exception as e:
-            conn.rollback()
-            raise e
-    
-    def calculate_payment(self, apartment_id: int, service_id: int, period: str) -> float:
-        """Рассчитать сумму платежа"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT a.area, s.price 
-            FROM apartments a, services s 
-            WHERE a.id = ? AND s.id = ?
-        """, (apartment_id, service_id))
-        
-        result = cursor.fetchone()
-        if result:
-            area, price = result
-            return area * price
-        return 0.0
+import sqlite3
+import contextlib
+import csv
+import functools
+import os
+import re
+import threading
+import time
+from datetime import datetime, date
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import List, Dict, Optional, Callable, Iterator
+import pandas as pd
+from columnar import ParquetSink, TABLE_PERIOD_COLUMNS, arrow_schema, rows_to_table, table_column_kinds
+from instrumentation import InstrumentedConnection, QueryStats, SLOW_QUERY_THRESHOLD
+
+# Полный пересчет сводки задолженностей apartment_debt по таблице payments
+DEBT_SUMMARY_REBUILD_SQL = """
+    DELETE FROM apartment_debt;
+    INSERT INTO apartment_debt (apartment_id, unpaid_count, unpaid_sum, last_period, oldest_period)
+    SELECT apartment_id, COUNT(*), SUM(amount), MAX(period), MIN(period)
+    FROM payments
+    WHERE is_paid = 0
+    GROUP BY apartment_id;
+"""
+
+# Миграции схемы. Номер миграции - ее позиция в списке (начиная с 1),
+# примененная версия хранится в PRAGMA user_version. Существующие миграции
+# не изменяются, новые добавляются только в конец списка.
+MIGRATIONS = [
+    ("Начальная схема", """
+        CREATE TABLE IF NOT EXISTS districts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            manager TEXT,
+            phone TEXT
+        );
+        
+        CREATE TABLE IF NOT EXISTS buildings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT NOT NULL,
+            year_built INTEGER,
+            floors INTEGER,
+            total_apartments INTEGER DEFAULT 0
+        );
+        
+        CREATE TABLE IF NOT EXISTS apartments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            building_id INTEGER NOT NULL,
+            number TEXT NOT NULL,
+            area REAL NOT NULL CHECK(area > 0),
+            rooms INTEGER,
+            privatized BOOLEAN DEFAULT 0,
+            cold_water BOOLEAN DEFAULT 0,
+            hot_water BOOLEAN DEFAULT 0,
+            garbage_chute BOOLEAN DEFAULT 0,
+            elevator BOOLEAN DEFAULT 0,
+            FOREIGN KEY (building_id) REFERENCES buildings(id) ON DELETE CASCADE
+        );
+        
+        CREATE TABLE IF NOT EXISTS residents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            apartment_id INTEGER NOT NULL,
+            full_name TEXT NOT NULL,
+            birth_date TEXT NOT NULL,
+            passport TEXT,
+            is_owner BOOLEAN DEFAULT 0,
+            phone TEXT,
+            registration_date TEXT DEFAULT CURRENT_DATE,
+            FOREIGN KEY (apartment_id) REFERENCES apartments(id) ON DELETE CASCADE
+        );
+        
+        CREATE TABLE IF NOT EXISTS services (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL CHECK(price > 0),
+            description TEXT
+        );
+        
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            apartment_id INTEGER NOT NULL,
+            service_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            amount REAL NOT NULL CHECK(amount >= 0),
+            is_paid BOOLEAN DEFAULT 0,
+            payment_date TEXT,
+            FOREIGN KEY (apartment_id) REFERENCES apartments(id) ON DELETE CASCADE,
+            FOREIGN KEY (service_id) REFERENCES services(id)
+        );
+    """),
+    ("Индексы по внешним ключам и полям фильтрации", """
+        CREATE INDEX IF NOT EXISTS idx_apartments_building
+            ON apartments(building_id, number);
+
+        CREATE INDEX IF NOT EXISTS idx_residents_apartment_owner
+            ON residents(apartment_id, is_owner, full_name);
+
+        CREATE INDEX IF NOT EXISTS idx_payments_apartment_period
+            ON payments(apartment_id, period, service_id);
+
+        CREATE INDEX IF NOT EXISTS idx_payments_service
+            ON payments(service_id);
+
+        CREATE INDEX IF NOT EXISTS idx_payments_period
+            ON payments(period);
+
+        -- Покрывающий индекс для задолженностей: все неоплаченные строки
+        -- читаются из индекса без обращения к таблице
+        CREATE INDEX IF NOT EXISTS idx_payments_unpaid
+            ON payments(is_paid, apartment_id, period, amount);
+    """),
+    ("Признак применимости услуги к квартире", """
+        -- Имя флага в таблице apartments, от которого зависит начисление услуги;
+        -- NULL - услуга начисляется всем квартирам
+        ALTER TABLE services ADD COLUMN apartment_flag TEXT
+            CHECK(apartment_flag IN ('cold_water', 'hot_water', 'garbage_chute', 'elevator'));
+
+        UPDATE services SET apartment_flag = 'cold_water' WHERE name = 'Холодное водоснабжение';
+        UPDATE services SET apartment_flag = 'hot_water' WHERE name = 'Горячее водоснабжение';
+        UPDATE services SET apartment_flag = 'garbage_chute' WHERE name = 'Вывоз ТБО';
+    """),
+    ("Полнотекстовый поиск по ФИО, адресам и услугам", """
+        -- Внешнее содержимое (content=) хранится в основных таблицах, FTS5 хранит
+        -- только индекс; синхронизация выполняется триггерами. Токенизатор unicode61
+        -- приводит к нижнему регистру в том числе кириллицу.
+        CREATE VIRTUAL TABLE IF NOT EXISTS residents_fts USING fts5(
+            full_name, content='residents', content_rowid='id', tokenize='unicode61'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS residents_fts_insert AFTER INSERT ON residents BEGIN
+            INSERT INTO residents_fts(rowid, full_name) VALUES (new.id, new.full_name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS residents_fts_delete AFTER DELETE ON residents BEGIN
+            INSERT INTO residents_fts(residents_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS residents_fts_update AFTER UPDATE OF full_name ON residents BEGIN
+            INSERT INTO residents_fts(residents_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name);
+            INSERT INTO residents_fts(rowid, full_name) VALUES (new.id, new.full_name);
+        END;
+
+        INSERT INTO residents_fts(residents_fts) VALUES ('rebuild');
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS buildings_fts USING fts5(
+            address, content='buildings', content_rowid='id', tokenize='unicode61'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS buildings_fts_insert AFTER INSERT ON buildings BEGIN
+            INSERT INTO buildings_fts(rowid, address) VALUES (new.id, new.address);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS buildings_fts_delete AFTER DELETE ON buildings BEGIN
+            INSERT INTO buildings_fts(buildings_fts, rowid, address) VALUES ('delete', old.id, old.address);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS buildings_fts_update AFTER UPDATE OF address ON buildings BEGIN
+            INSERT INTO buildings_fts(buildings_fts, rowid, address) VALUES ('delete', old.id, old.address);
+            INSERT INTO buildings_fts(rowid, address) VALUES (new.id, new.address);
+        END;
+
+        INSERT INTO buildings_fts(buildings_fts) VALUES ('rebuild');
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS services_fts USING fts5(
+            name, content='services', content_rowid='id', tokenize='unicode61'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS services_fts_insert AFTER INSERT ON services BEGIN
+            INSERT INTO services_fts(rowid, name) VALUES (new.id, new.name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS services_fts_delete AFTER DELETE ON services BEGIN
+            INSERT INTO services_fts(services_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS services_fts_update AFTER UPDATE OF name ON services BEGIN
+            INSERT INTO services_fts(services_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO services_fts(rowid, name) VALUES (new.id, new.name);
+        END;
+
+        INSERT INTO services_fts(services_fts) VALUES ('rebuild');
+    """),
+    ("Сводка задолженностей по квартирам", """
+        CREATE TABLE IF NOT EXISTS apartment_debt (
+            apartment_id INTEGER PRIMARY KEY,
+            unpaid_count INTEGER NOT NULL,
+            unpaid_sum REAL NOT NULL,
+            last_period TEXT,
+            oldest_period TEXT,
+            FOREIGN KEY (apartment_id) REFERENCES apartments(id) ON DELETE CASCADE
+        );
+
+        CREATE TRIGGER IF NOT EXISTS payments_debt_insert
+        AFTER INSERT ON payments WHEN new.is_paid = 0
+        BEGIN
+            INSERT INTO apartment_debt (apartment_id, unpaid_count, unpaid_sum, last_period, oldest_period)
+            VALUES (new.apartment_id, 1, new.amount, new.period, new.period)
+            ON CONFLICT(apartment_id) DO UPDATE SET
+                unpaid_count = unpaid_count + 1,
+                unpaid_sum = unpaid_sum + excluded.unpaid_sum,
+                last_period = MAX(last_period, excluded.last_period),
+                oldest_period = MIN(oldest_period, excluded.oldest_period);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS payments_debt_delete
+        AFTER DELETE ON payments WHEN old.is_paid = 0
+        BEGIN
+            UPDATE apartment_debt
+            SET unpaid_count = unpaid_count - 1,
+                unpaid_sum = unpaid_sum - old.amount
+            WHERE apartment_id = old.apartment_id;
+            -- Границы периодов пересчитываются по индексу, только если удалена граничная строка
+            UPDATE apartment_debt
+            SET last_period = (SELECT MAX(period) FROM payments
+                               WHERE is_paid = 0 AND apartment_id = old.apartment_id),
+                oldest_period = (SELECT MIN(period) FROM payments
+                                 WHERE is_paid = 0 AND apartment_id = old.apartment_id)
+            WHERE apartment_id = old.apartment_id AND old.period IN (last_period, oldest_period);
+            DELETE FROM apartment_debt
+            WHERE apartment_id = old.apartment_id AND unpaid_count <= 0;
+        END;
+
+        -- Изменение платежа: старая версия вычитается из сводки, новая добавляется
+        CREATE TRIGGER IF NOT EXISTS payments_debt_update_old
+        AFTER UPDATE OF apartment_id, period, amount, is_paid ON payments WHEN old.is_paid = 0
+        BEGIN
+            UPDATE apartment_debt
+            SET unpaid_count = unpaid_count - 1,
+                unpaid_sum = unpaid_sum - old.amount
+            WHERE apartment_id = old.apartment_id;
+            -- Границы периодов пересчитываются по индексу, только если удалена граничная строка
+            UPDATE apartment_debt
+            SET last_period = (SELECT MAX(period) FROM payments
+                               WHERE is_paid = 0 AND apartment_id = old.apartment_id),
+                oldest_period = (SELECT MIN(period) FROM payments
+                                 WHERE is_paid = 0 AND apartment_id = old.apartment_id)
+            WHERE apartment_id = old.apartment_id AND old.period IN (last_period, oldest_period);
+            DELETE FROM apartment_debt
+            WHERE apartment_id = old.apartment_id AND unpaid_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS payments_debt_update_new
+        AFTER UPDATE OF apartment_id, period, amount, is_paid ON payments WHEN new.is_paid = 0
+        BEGIN
+            INSERT INTO apartment_debt (apartment_id, unpaid_count, unpaid_sum, last_period, oldest_period)
+            VALUES (new.apartment_id, 1, new.amount, new.period, new.period)
+            ON CONFLICT(apartment_id) DO UPDATE SET
+                unpaid_count = unpaid_count + 1,
+                unpaid_sum = unpaid_sum + excluded.unpaid_sum,
+                last_period = MAX(last_period, excluded.last_period),
+                oldest_period = MIN(oldest_period, excluded.oldest_period);
+        END;
+    """ + DEBT_SUMMARY_REBUILD_SQL),
+    ("Индекс по дате рождения жильцов", """
+        CREATE INDEX IF NOT EXISTS idx_residents_birth_date ON residents (birth_date);
+    """),
+    ("Реестр архивных периодов платежей", """
+        -- Периоды, оплаченные начисления которых перенесены в архивные базы по годам
+        CREATE TABLE IF NOT EXISTS payment_archive (
+            period TEXT PRIMARY KEY,
+            year INTEGER NOT NULL,
+            file TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Справочник услуг новой базы: name, price, description, apartment_flag
+DEFAULT_SERVICES = [
+    ("Холодное водоснабжение", 25.50, "Водоснабжение холодной водой", "cold_water"),
+    ("Горячее водоснабжение", 45.30, "Водоснабжение горячей водой", "hot_water"),
+    ("Отопление", 35.20, "Отопление помещений", None),
+    ("Электроснабжение", 4.80, "Электроэнергия", None),
+    ("Вывоз ТБО", 8.90, "Вывоз твердых бытовых отходов", "garbage_chute")
+]
+
+# Поля с полнотекстовым индексом: (таблица, поле) -> таблица FTS5
+FTS_INDEXES = {
+    ('residents', 'full_name'): 'residents_fts',
+    ('buildings', 'address'): 'buildings_fts',
+    ('services', 'name'): 'services_fts'
+}
+
+# Профили настроек соединений, выбираются при создании GHUDatabase.
+# journal_mode хранится в файле базы, остальные параметры действуют на соединение.
+PRAGMA_PROFILES = {
+    # Рабочий режим: WAL (чтение не блокирует запись), fsync только при checkpoint
+    'default': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,          # 64 МБ
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,        # 256 МБ
+        'busy_timeout': 5000
+    },
+    # Максимальная надежность: fsync на каждый commit
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16384,          # 16 МБ
+        'temp_store': 'DEFAULT',
+        'mmap_size': 0,
+        'busy_timeout': 10000
+    },
+    # Массовая загрузка и отчеты по большим объемам; при сбое питания возможна потеря последних транзакций
+    'bulk': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,         # 256 МБ
+        'temp_store': 'MEMORY',
+        'mmap_size': 1073741824,       # 1 ГБ
+        'busy_timeout': 5000
+    }
+}
+
+
+# Архив платежей: файлы <имя базы>_archive_<год>.db рядом с основной базой,
+# подключаются к соединению (ATTACH) как схемы archive_<год>
+ARCHIVE_SCHEMA_PREFIX = 'archive_'
+
+# Таблица и индексы архивной базы; {schema} - имя подключенной схемы
+ARCHIVE_PAYMENTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {schema}.payments (
+        id INTEGER PRIMARY KEY,
+        apartment_id INTEGER NOT NULL,
+        service_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        amount REAL NOT NULL,
+        is_paid BOOLEAN DEFAULT 0,
+        payment_date TEXT
+    );
+    CREATE INDEX IF NOT EXISTS {schema}.idx_payments_period ON payments(period);
+    CREATE INDEX IF NOT EXISTS {schema}.idx_payments_apartment_period ON payments(apartment_id, period, service_id)
+"""
+
+# Поля платежей в порядке таблицы: общий список для основной таблицы и архивов
+PAYMENT_COLUMNS = ['id', 'apartment_id', 'service_id', 'period', 'amount', 'is_paid', 'payment_date']
+
+
+class ConnectionPool:
+    """
+    Пул соединений SQLite: каждый поток работает со своим соединением.
+    Соединение закрепляется за потоком при первом обращении; release() возвращает
+    его в пул свободных, откуда его получит следующий поток.
+    """
+    
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_idle: int = 8):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._connections = set()
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._factory()
+                with self._lock:
+                    self._connections.add(conn)
+            self._local.conn = conn
+        return conn
+    
+    def release(self):
+        """Возврат соединения текущего потока в пул"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        
+        if conn.in_transaction:
+            conn.rollback()
+        
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+            self._connections.discard(conn)
+        conn.close()
+    
+    def close_all(self):
+        """Закрытие всех соединений пула"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._idle.clear()
+        self._local = threading.local()
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+
+class MemoryReplica:
+    """
+    Копия базы в памяти для аналитических отчетов: тяжелые запросы не читают
+    рабочий файл и не конкурируют с записью операторов. Копия снимается через
+    backup API SQLite в общую (shared cache) базу в памяти и обновляется по
+    требованию или при изменении версии данных базы (GHUDatabase.change_version).
+    Каждое обновление создает новое поколение копии; соединения, читающие
+    прежнее поколение, дорабатывают на нем, а память освобождается после
+    закрытия последнего из них. У каждого потока свое соединение только для чтения.
+    min_interval - не обновлять копию чаще раза в указанное число секунд
+    (при непрерывной записи отчеты читают копию не старше этого интервала).
+    """
+    
+    def __init__(self, db: 'GHUDatabase', min_interval: float = 0.0):
+        self.db = db
+        self.min_interval = min_interval
+        self.version = None
+        self.seconds = None
+        self.refreshed = None
+        self._uri = None
+        self._keeper = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Снятие новой копии, если версия данных изменилась (или force); True - копия обновлена"""
+        with self._lock:
+            # Версия берется до копирования: запись во время копирования вызовет повторное обновление
+            version = self.db.change_version()
+            if self._keeper is not None and not force:
+                if version == self.version or time.monotonic() - self.refreshed < self.min_interval:
+                    return False
+            
+            started = time.perf_counter()
+            self._generation += 1
+            uri = f"file:ghu_replica_{id(self)}_{self._generation}?mode=memory&cache=shared"
+            keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            source = self.db.open_connection()
+            try:
+                source.backup(keeper)
+            except Exception:
+                keeper.close()
+                raise
+            finally:
+                source.close()
+            
+            # Прежнее поколение живет, пока его читают соединения других потоков
+            self._keeper, self._uri, self.version = keeper, uri, version
+            self.seconds = time.perf_counter() - started
+            self.refreshed = time.monotonic()
+            return True
+    
+    def connect(self, latest: bool = False) -> sqlite3.Connection:
+        """
+        Соединение текущего потока с копией. latest=True переводит его на последнее
+        поколение копии - вызывается в начале отчета, а не между его запросами.
+        """
+        if self._keeper is None:
+            self.refresh()
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and (not latest or conn.replica_uri == self._uri):
+            return conn
+        if conn is not None:
+            conn.close()
+        
+        with self._lock:
+            uri, version = self._uri, self.version
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=InstrumentedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.stats = self.db.stats
+        conn.transaction_depth = 0
+        conn.replica_uri = uri
+        conn.replica_version = version
+        conn.execute("PRAGMA query_only = ON")
+        self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Освобождение копии (соединения других потоков закрываются вместе с потоками)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local = threading.local()
+        with self._lock:
+            if self._keeper is not None:
+                self._keeper.close()
+            self._keeper, self._uri, self.version = None, None, None
+
+
+class GHUDatabase:
+    """База данных для службы заказчика ГЖУ"""
+    
+    def __init__(self, db_path: str = "ghu_database.db", seed: bool = False, profile: str = "default",
+                 slow_query_threshold: float = SLOW_QUERY_THRESHOLD, slow_query_log: str = None):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Неизвестный профиль настроек: {profile}")
+        
+        self.db_path = db_path
+        self.profile = profile
+        # Статистика запросов всех соединений; медленные запросы с планом пишутся в slow_query_log
+        self.stats = QueryStats(slow_query_threshold, slow_query_log)
+        
+        # База в памяти открывается как общая (shared cache), чтобы ее видели соединения всех потоков
+        if db_path == ":memory:":
+            self._database = f"file:ghu_memdb_{id(self)}?mode=memory&cache=shared"
+        else:
+            self._database = db_path
+        self.pool = ConnectionPool(self.open_connection)
+        
+        # Версия данных: счетчик собственных записей и отдельное соединение для
+        # PRAGMA data_version, которое меняется при фиксации изменений другими соединениями
+        self._version_lock = threading.Lock()
+        self._write_counter = 0
+        self._version_conn = None
+        
+        # Открываем существующий файл и применяем только недостающие миграции
+        self._apply_migrations()
+        
+        # Тестовые данные добавляются только по запросу и только в пустую базу
+        if seed and self._is_empty():
+            self._insert_sample_data()
+    
+    def connect(self):
+        """Подключение к базе данных (собственное соединение текущего потока из пула)"""
+        return self.pool.acquire()
+    
+    def release_connection(self):
+        """Возврат соединения текущего потока в пул (вызывается рабочими потоками по завершении)"""
+        self.pool.release()
+    
+    def open_connection(self) -> sqlite3.Connection:
+        """Новое отдельное соединение с базой с настройками выбранного профиля"""
+        # Соединение может перейти к другому потоку через пул, но используется одним потоком за раз
+        conn = sqlite3.connect(self._database, uri=self._database.startswith("file:"), check_same_thread=False,
+                               factory=InstrumentedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.stats = self.stats
+        # Глубина вложенности transaction() на этом соединении
+        conn.transaction_depth = 0
+        
+        for name, value in PRAGMA_PROFILES[self.profile].items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+    
+    def close(self):
+        """Закрытие всех соединений"""
+        self.pool.close_all()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+    
+    def change_version(self) -> tuple:
+        """
+        Версия данных базы: (PRAGMA data_version, счетчик записей через GHUDatabase).
+        Меняется после каждой зафиксированной записи, в том числе из других процессов.
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self.open_connection()
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, self._write_counter
+    
+    def query_stats(self) -> List[Dict]:
+        """Статистика выполненных запросов по отпечаткам, самые затратные первыми"""
+        return self.stats.snapshot()
+    
+    def dump_query_stats(self, path: str):
+        """Запись статистики запросов и журнала медленных запросов в JSON"""
+        self.stats.dump(path)
+    
+    def _note_write(self):
+        """Учет зафиксированной записи в счетчике версии данных"""
+        with self._version_lock:
+            self._write_counter += 1
+    
+    def _commit(self, conn):
+        """Фиксация транзакции с учетом в версии данных; внутри transaction() - в конце блока"""
+        if conn.transaction_depth:
+            return
+        conn.commit()
+        self._note_write()
+    
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Единица работы на соединении текущего потока: insert, update, delete и другие
+        методы записи внутри блока не фиксируют изменения по отдельности - commit
+        выполняется один раз в конце блока, при исключении все изменения откатываются.
+        Вложенный блок - точка сохранения (SAVEPOINT): его исключение откатывает
+        только изменения этого блока.
+        Если на соединении уже открыта неявная транзакция (запись без commit), блок
+        верхнего уровня присоединяется к ней точкой сохранения: при успехе фиксируется
+        вместе с ранее сделанными изменениями, при исключении откатывает только свои.
+        """
+        conn = self.connect()
+        depth = conn.transaction_depth
+        nested = depth or conn.in_transaction
+        savepoint = f"unit_{depth}"
+        conn.execute(f"SAVEPOINT {savepoint}" if nested else "BEGIN IMMEDIATE")
+        conn.transaction_depth = depth + 1
+        
+        try:
+            yield conn
+            conn.transaction_depth = depth
+            if nested:
+                conn.execute(f"RELEASE {savepoint}")
+            self._commit(conn)
+        except BaseException:
+            conn.transaction_depth = depth
+            if nested:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.rollback()
+            raise
+    
+    def _apply_migrations(self):
+        """Применение недостающих миграций схемы"""
+        conn = self.connect()
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        if current > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Версия схемы базы данных ({current}) новее версии приложения ({SCHEMA_VERSION})"
+            )
+        
+        for version, (description, script) in enumerate(MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            
+            print(f"Применение миграции {version}: {description}")
+            try:
+                conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+            except Exception:
+                conn.rollback()
+                raise
+    
+    def schema_version(self) -> int:
+        """Текущая версия схемы базы данных"""
+        conn = self.connect()
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def _is_empty(self) -> bool:
+        """Проверка, что в базе нет данных справочников"""
+        conn = self.connect()
+        return conn.execute("SELECT COUNT(*) FROM districts").fetchone()[0] == 0
+    
+    def _insert_sample_data(self):
+        """Вставка тестовых данных"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        print("Добавление тестовых данных...")
+        
+        # Добавляем районы
+        districts = [
+            ("Центральный район", "Иванов И.И.", "+7-111-222-3333"),
+            ("Северный район", "Петров П.П.", "+7-111-222-4444"),
+            ("Южный район", "Сидоров С.С.", "+7-111-222-5555")
+        ]
+        
+        for name, manager, phone in districts:
+            cursor.execute(
+                "INSERT INTO districts (name, manager, phone) VALUES (?, ?, ?)",
+                (name, manager, phone)
+            )
+        
+        # Добавляем дома
+        buildings = [
+            ("ул. Ленина, 10", 1985, 5),
+            ("ул. Советская, 25", 1990, 9),
+            ("пр. Мира, 15", 2000, 12)
+        ]
+        
+        for address, year, floors in buildings:
+            cursor.execute(
+                "INSERT INTO buildings (address, year_built, floors) VALUES (?, ?, ?)",
+                (address, year, floors)
+            )
+        
+        # Добавляем квартиры
+        apartments = [
+            # building_id, number, area, rooms, privatized, cold_water, hot_water, garbage_chute, elevator
+            (1, "25", 55.5, 2, 1, 1, 1, 1, 1),
+            (1, "26", 42.0, 1, 0, 1, 1, 0, 1),
+            (2, "101", 75.0, 3, 1, 1, 1, 1, 1),
+            (3, "35", 48.0, 2, 0, 1, 0, 1, 0)
+        ]
+        
+        for building_id, number, area, rooms, privatized, cold_water, hot_water, garbage_chute, elevator in apartments:
+            cursor.execute("""
+                INSERT INTO apartments (building_id, number, area, rooms, privatized, 
+                                       cold_water, hot_water, garbage_chute, elevator)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (building_id, number, area, rooms, privatized, 
+                 cold_water, hot_water, garbage_chute, elevator))
+        
+        # Обновляем счетчики квартир в домах
+        for i in range(1, 4):
+            cursor.execute("SELECT COUNT(*) FROM apartments WHERE building_id = ?", (i,))
+            count = cursor.fetchone()[0]
+            cursor.execute("UPDATE buildings SET total_apartments = ? WHERE id = ?", (count, i))
+        
+        # Добавляем жильцов
+        residents = [
+            (1, "Иванов Иван Иванович", "1980-05-15", "1234 567890", 1, "+7-900-111-2233"),
+            (1, "Иванова Мария Петровна", "1985-07-22", "1234 567891", 0, "+7-900-111-2234"),
+            (2, "Петров Петр Петрович", "1975-11-30", "4321 123456", 1, "+7-900-222-3344"),
+            (3, "Сидорова Анна Васильевна", "1950-12-05", "5678 901234", 1, "+7-900-333-4455"),
+            (4, "Козлов Алексей Дмитриевич", "1990-02-14", "3456 789012", 1, "+7-900-444-5566")
+        ]
+        
+        for apartment_id, name, birth, passport, owner, phone in residents:
+            cursor.execute("""
+                INSERT INTO residents (apartment_id, full_name, birth_date, passport, is_owner, phone)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (apartment_id, name, birth, passport, owner, phone))
+        
+        # Добавляем услуги
+        for name, price, desc, flag in DEFAULT_SERVICES:
+            cursor.execute(
+                "INSERT INTO services (name, price, description, apartment_flag) VALUES (?, ?, ?, ?)",
+                (name, price, desc, flag)
+            )
+        
+        # Добавляем платежи
+        payments = [
+            (1, 1, "2024-01-01", 1415.25, 1, "2024-01-15"),
+            (1, 2, "2024-01-01", 2511.15, 1, "2024-01-16"),
+            (1, 1, "2024-02-01", 1415.25, 0, None),
+            (2, 1, "2024-01-01", 1071.00, 1, "2024-01-10"),
+            (3, 1, "2024-01-01", 1912.50, 1, "2024-01-20"),
+            (4, 1, "2024-01-01", 1224.00, 0, None)
+        ]
+        
+        for apartment_id, service_id, period, amount, paid, pay_date in payments:
+            cursor.execute("""
+                INSERT INTO payments (apartment_id, service_id, period, amount, is_paid, payment_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (apartment_id, service_id, period, amount, paid, pay_date))
+        
+        self._commit(conn)
+        print("Тестовые данные успешно добавлены!")
+    
+    # === CRUD операции ===
+    
+    def get_all(self, table_name: str, shape: str = 'dict') -> List:
+        """Получить все записи из таблицы (shape - форма строк, см. ROW_SHAPES)"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM {table_name}")
+        return fetch_rows(cursor, shape)
+    
+    def get_by_id(self, table_name: str, record_id: int) -> Optional[Dict]:
+        """Получить запись по ID"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM {table_name} WHERE id = ?", (record_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def insert(self, table_name: str, data: Dict) -> int:
+        """Вставить новую запись"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        columns = ', '.join(data.keys())
+        placeholders = ', '.join(['?' for _ in data])
+        values = tuple(data.values())
+        
+        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        cursor.execute(query, values)
+        self._commit(conn)
+        
+        return cursor.lastrowid
+    
+    def update(self, table_name: str, record_id: int, data: Dict) -> bool:
+        """Обновить запись"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        set_clause = ', '.join([f"{key} = ?" for key in data.keys()])
+        values = tuple(data.values()) + (record_id,)
+        
+        query = f"UPDATE {table_name} SET {set_clause} WHERE id = ?"
+        cursor.execute(query, values)
+        self._commit(conn)
+        
+        return cursor.rowcount > 0
+    
+    def delete(self, table_name: str, record_id: int) -> bool:
+        """Удалить запись"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (record_id,))
+        self._commit(conn)
+        
+        return cursor.rowcount > 0
+    
+    def insert_many(self, table_name: str, records: List[Dict]) -> int:
+        """
+        Вставка записей одной транзакцией через executemany. Подряд идущие записи
+        с одинаковым набором полей вставляются одним запросом.
+        Возвращает количество вставленных записей.
+        """
+        inserted = 0
+        with self.transaction() as conn:
+            for columns, group in groupby(records, key=tuple):
+                placeholders = ', '.join(['?' for _ in columns])
+                query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+                inserted += conn.executemany(query, (tuple(record.values()) for record in group)).rowcount
+        return inserted
+    
+    def update_many(self, table_name: str, records: List[Dict]) -> int:
+        """
+        Обновление записей одной транзакцией через executemany; каждая запись
+        содержит id и изменяемые поля. Возвращает количество измененных записей.
+        """
+        updated = 0
+        with self.transaction() as conn:
+            for fields, group in groupby(records, key=lambda record: tuple(key for key in record if key != 'id')):
+                set_clause = ', '.join([f"{key} = ?" for key in fields])
+                values = (tuple(record[key] for key in fields) + (record['id'],) for record in group)
+                updated += conn.executemany(f"UPDATE {table_name} SET {set_clause} WHERE id = ?", values).rowcount
+        return updated
+    
+    def delete_many(self, table_name: str, record_ids: List[int]) -> int:
+        """Удаление записей по списку id одной транзакцией; возвращает количество удаленных"""
+        with self.transaction() as conn:
+            cursor = conn.executemany(f"DELETE FROM {table_name} WHERE id = ?",
+                                      ((record_id,) for record_id in record_ids))
+        return cursor.rowcount
+    
+    def search(self, table_name: str, field: str, value: str, shape: str = 'dict') -> List:
+        """Поиск записей по полю (по полям с полнотекстовым индексом - с ранжированием)"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(*self._search_query(table_name, field, value))
+        return fetch_rows(cursor, shape)
+    
+    def _search_query(self, table_name: str, field: str, value: str) -> tuple:
+        """Запрос поиска по полю: FTS5 с ранжированием или LIKE по подстроке"""
+        fts_table = FTS_INDEXES.get((table_name, field))
+        match = fts_match_query(value) if fts_table else ''
+        
+        if match:
+            return f"""
+                SELECT t.* FROM {fts_table}
+                JOIN {table_name} t ON t.id = {fts_table}.rowid
+                WHERE {fts_table} MATCH ?
+                ORDER BY {fts_table}.rank
+            """, (match,)
+        return f"SELECT * FROM {table_name} WHERE {field} LIKE ?", (f'%{value}%',)
+    
+    def filter_records(self, table_name: str, conditions: Dict, shape: str = 'dict') -> List:
+        """Фильтрация записей по нескольким полям"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        where_sql, values = self._where_clause(table_name, conditions)
+        if not where_sql:
+            return self.get_all(table_name, shape)
+        
+        query = f"SELECT * FROM {table_name} WHERE {where_sql}"
+        cursor.execute(query, values)
+        
+        return fetch_rows(cursor, shape)
+    
+    def _where_clause(self, table_name: str, conditions: Optional[Dict]) -> tuple:
+        """Условие WHERE для фильтра по нескольким полям"""
+        where_clauses = []
+        values = []
+        
+        for field, value in (conditions or {}).items():
+            if value not in ['', None]:
+                clause, params = self.text_condition(table_name, field, str(value))
+                where_clauses.append(clause)
+                values.extend(params)
+        
+        return ' AND '.join(where_clauses), values
+    
+    def text_condition(self, table_name: str, field: str, value: str, alias: str = None) -> tuple:
+        """
+        Условие текстового поиска по полю. Для полей с полнотекстовым индексом -
+        поиск слов по префиксу без учета регистра через FTS5, для остальных - LIKE
+        по подстроке. alias - псевдоним таблицы в запросе, в котором используется условие.
+        """
+        prefix = f"{alias}." if alias else ""
+        fts_table = FTS_INDEXES.get((table_name, field))
+        match = fts_match_query(value) if fts_table else ''
+        
+        if match:
+            return f"{prefix}id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)", [match]
+        return f"{prefix}{field} LIKE ?", [f'%{value}%']
+    
+    def sort_records(self, table_name: str, field: str, ascending: bool = True, shape: str = 'dict') -> List:
+        """Сортировка записей по полю"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        order = "ASC" if ascending else "DESC"
+        cursor.execute(f"SELECT * FROM {table_name} ORDER BY {field} {order}")
+        
+        return fetch_rows(cursor, shape)
+    
+    # === Потоковое чтение ===
+    
+    def iter_records(self, table_name: str, conditions: Dict = None, sort_field: str = None,
+                     ascending: bool = True, shape: str = 'dict', batch_size: int = None) -> 'RowStream':
+        """
+        Потоковое чтение записей с фильтром (как в filter_records) и сортировкой:
+        строки читаются из курсора порциями по batch_size через fetchmany, первая
+        порция доступна сразу, в памяти держится только текущая порция.
+        """
+        query, values = self._export_query(table_name, conditions, sort_field, ascending)
+        return RowStream(self.connect().execute(query, values), shape, batch_size or EXPORT_BATCH_SIZE)
+    
+    def iter_search(self, table_name: str, field: str, value: str, shape: str = 'dict',
+                    batch_size: int = None) -> 'RowStream':
+        """Потоковый вариант search"""
+        return RowStream(self.connect().execute(*self._search_query(table_name, field, value)),
+                         shape, batch_size or EXPORT_BATCH_SIZE)
+    
+    # === Постраничное чтение ===
+    
+    def get_page(self, table_name: str, after: Optional[Dict] = None, limit: int = 100,
+                 conditions: Dict = None, sort_field: str = None, ascending: bool = True) -> List[Dict]:
+        """
+        Страница записей с ключевой (keyset) пагинацией.
+        after - последняя запись предыдущей страницы; следующая страница начинается
+        сразу после нее в порядке (sort_field, id), поэтому стоимость чтения не
+        зависит от номера страницы. conditions - фильтр как в filter_records.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        where_sql, values = self._where_clause(table_name, conditions)
+        where_clauses = [where_sql] if where_sql else []
+        
+        if after is not None:
+            keyset_sql, keyset_values = self._keyset_clause(sort_field, ascending, after)
+            where_clauses.append(keyset_sql)
+            values.extend(keyset_values)
+        
+        order = "ASC" if ascending else "DESC"
+        if sort_field and sort_field != 'id':
+            order_by = f"{sort_field} {order}, id {order}"
+        else:
+            order_by = f"id {order}"
+        
+        query = f"SELECT * FROM {table_name}"
+        if where_clauses:
+            query += f" WHERE {' AND '.join(where_clauses)}"
+        query += f" ORDER BY {order_by} LIMIT ?"
+        values.append(limit)
+        
+        cursor.execute(query, values)
+        rows = cursor.fetchall()
+        return [dict(row) for row in rows] if rows else []
+    
+    def _keyset_clause(self, sort_field: Optional[str], ascending: bool, after: Dict) -> tuple:
+        """Условие продолжения после записи after в порядке (sort_field, id)"""
+        last_id = after['id']
+        
+        if not sort_field or sort_field == 'id':
+            return ("id > ?" if ascending else "id < ?"), [last_id]
+        
+        # NULL в SQLite меньше любого значения: идет первым по возрастанию и последним по убыванию
+        value = after.get(sort_field)
+        if ascending:
+            if value is None:
+                return f"({sort_field} IS NOT NULL OR id > ?)", [last_id]
+            return f"({sort_field} > ? OR ({sort_field} = ? AND id > ?))", [value, value, last_id]
+        
+        if value is None:
+            return f"({sort_field} IS NULL AND id < ?)", [last_id]
+        return (f"({sort_field} < ? OR ({sort_field} = ? AND id < ?) OR {sort_field} IS NULL)",
+                [value, value, last_id])
+    
+    def count_records(self, table_name: str, conditions: Dict = None) -> int:
+        """Количество записей, удовлетворяющих фильтру"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        where_sql, values = self._where_clause(table_name, conditions)
+        query = f"SELECT COUNT(*) FROM {table_name}"
+        if where_sql:
+            query += f" WHERE {where_sql}"
+        
+        cursor.execute(query, values)
+        return cursor.fetchone()[0]
+    
+    # === Специфичные методы ===
+    
+    def get_apartments_by_building(self, building_id: int, shape: str = 'dict') -> List:
+        """Получить все квартиры в доме"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT a.*, b.address as building_address 
+            FROM apartments a 
+            JOIN buildings b ON a.building_id = b.id 
+            WHERE a.building_id = ?
+            ORDER BY a.number
+        """, (building_id,))
+        return fetch_rows(cursor, shape)
+    
+    def get_residents_by_apartment(self, apartment_id: int, shape: str = 'dict') -> List:
+        """Получить всех жильцов в квартире"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.*, a.number as apartment_number, b.address as building_address
+            FROM residents r 
+            JOIN apartments a ON r.apartment_id = a.id 
+            JOIN buildings b ON a.building_id = b.id 
+            WHERE r.apartment_id = ?
+            ORDER BY r.is_owner DESC, r.full_name
+        """, (apartment_id,))
+        return fetch_rows(cursor, shape)
+    
+    def get_payments_by_apartment(self, apartment_id: int, shape: str = 'dict') -> List:
+        """Получить все платежи по квартире"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.*, s.name as service_name, a.number as apartment_number
+            FROM payments p 
+            JOIN services s ON p.service_id = s.id 
+            JOIN apartments a ON p.apartment_id = a.id 
+            WHERE p.apartment_id = ?
+            ORDER BY p.period DESC
+        """, (apartment_id,))
+        return fetch_rows(cursor, shape)
+    
+    def add_apartment_with_residents(self, building_id: int, apartment_data: Dict, residents_data: List[Dict]) -> int:
+        """Добавить квартиру с жильцами (форма 1:М)"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        with self.transaction():
+            # Добавляем квартиру
+            cursor.execute("""
+                INSERT INTO apartments (building_id, number, area, rooms, privatized, 
+                                       cold_water, hot_water, garbage_chute, elevator)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                building_id,
+                apartment_data['number'],
+                apartment_data['area'],
+                apartment_data.get('rooms'),
+                1 if apartment_data.get('privatized') else 0,
+                1 if apartment_data.get('cold_water', True) else 0,
+                1 if apartment_data.get('hot_water', True) else 0,
+                1 if apartment_data.get('garbage_chute', True) else 0,
+                1 if apartment_data.get('elevator', True) else 0
+            ))
+            
+            apartment_id = cursor.lastrowid
+            
+            # Обновляем счетчик квартир в доме
+            cursor.execute("UPDATE buildings SET total_apartments = total_apartments + 1 WHERE id = ?", (building_id,))
+            
+            # Добавляем жильцов
+            for resident in residents_data:
+                cursor.execute("""
+                    INSERT INTO residents (apartment_id, full_name, birth_date, passport, is_owner, phone)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    apartment_id,
+                    resident['full_name'],
+                    resident['birth_date'],
+                    resident.get('passport'),
+                    1 if resident.get('is_owner') else 0,
+                    resident.get('phone')
+                ))
+            
+            return apartment_id
+    
+    def calculate_payment(self, apartment_id: int, service_id: int, period: str) -> float:
+        """Рассчитать сумму платежа"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT a.area, s.price 
+            FROM apartments a, services s 
+            WHERE a.id = ? AND s.id = ?
+        """, (apartment_id, service_id))
+        
+        result = cursor.fetchone()
+        if result:
+            area, price = result
+            return area * price
+        return 0.0
+    
+    def run_billing(self, period: str) -> Dict:
+        """
+        Начисление платежей за период одним запросом INSERT ... SELECT по всем
+        парам квартира x услуга. Услуга начисляется квартире, если у нее установлен
+        флаг services.apartment_flag (или флаг не задан). Повторный запуск за тот же
+        период добавляет только недостающие начисления.
+        """
+        try:
+            period = datetime.strptime(period[:7], '%Y-%m').strftime('%Y-%m-01')
+        except ValueError:
+            raise ValueError(f"Неверный период: {period} (ожидается ГГГГ-ММ)")
+        
+        conn = self.connect()
+        started = time.perf_counter()
+        
+        with self.transaction():
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM payments").fetchone()[0]
+            
+            conn.execute("""
+                INSERT INTO payments (apartment_id, service_id, period, amount, is_paid)
+                SELECT a.id, s.id, :period, ROUND(a.area * s.price, 2), 0
+                FROM apartments a
+                CROSS JOIN services s
+                WHERE CASE s.apartment_flag
+                        WHEN 'cold_water' THEN a.cold_water
+                        WHEN 'hot_water' THEN a.hot_water
+                        WHEN 'garbage_chute' THEN a.garbage_chute
+                        WHEN 'elevator' THEN a.elevator
+                        ELSE 1
+                      END
+                  AND NOT EXISTS (
+                        SELECT 1 FROM payments p
+                        WHERE p.apartment_id = a.id AND p.period = :period AND p.service_id = s.id
+                  )
+            """, {'period': period})
+            
+            created, total_amount = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM payments WHERE id > ?", (last_id,)
+            ).fetchone()
+        
+        return {
+            'period': period,
+            'created': created,
+            'total_amount': round(total_amount, 2),
+            'seconds': time.perf_counter() - started
+        }
+    
+    # === Сводка задолженностей ===
+    
+    def rebuild_debt_summary(self) -> int:
+        """Полный пересчет сводки задолженностей по таблице платежей"""
+        with self.transaction() as conn:
+            for statement in DEBT_SUMMARY_REBUILD_SQL.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            count = conn.execute("SELECT COUNT(*) FROM apartment_debt").fetchone()[0]
+        return count
+    
+    def check_debt_summary(self) -> List[Dict]:
+        """
+        Проверка согласованности сводки задолженностей с таблицей платежей.
+        Возвращает расхождения: квартира, значения в сводке и фактические значения.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            WITH actual AS (
+                SELECT apartment_id, COUNT(*) AS unpaid_count, SUM(amount) AS unpaid_sum,
+                       MAX(period) AS last_period, MIN(period) AS oldest_period
+                FROM payments
+                WHERE is_paid = 0
+                GROUP BY apartment_id
+            )
+            SELECT a.apartment_id,
+                   d.unpaid_count, d.unpaid_sum, d.last_period, d.oldest_period,
+                   a.unpaid_count AS actual_count, a.unpaid_sum AS actual_sum,
+                   a.last_period AS actual_last_period, a.oldest_period AS actual_oldest_period
+            FROM actual a
+            LEFT JOIN apartment_debt d ON d.apartment_id = a.apartment_id
+            WHERE d.apartment_id IS NULL
+               OR d.unpaid_count != a.unpaid_count
+               OR ROUND(d.unpaid_sum, 2) != ROUND(a.unpaid_sum, 2)
+               OR d.last_period != a.last_period
+               OR d.oldest_period != a.oldest_period
+            UNION ALL
+            SELECT d.apartment_id,
+                   d.unpaid_count, d.unpaid_sum, d.last_period, d.oldest_period,
+                   0, 0, NULL, NULL
+            FROM apartment_debt d
+            WHERE d.apartment_id NOT IN (SELECT apartment_id FROM actual)
+        """)
+        rows = cursor.fetchall()
+        return [dict(row) for row in rows] if rows else []
+    
+    # === Архив платежей ===
+    
+    def archive_path(self, year: int) -> str:
+        """Файл архивной базы платежей за год (рядом с основной базой)"""
+        if self.db_path == ":memory:":
+            raise ValueError("База в памяти не поддерживает архив платежей")
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), f"{stem}_archive_{year}.db")
+    
+    def archive_payments(self, before: str, progress: Callable[[int, int], None] = None) -> Dict:
+        """
+        Перенос оплаченных начислений закрытых периодов (раньше before, ГГГГ-ММ) в
+        архивные базы по годам. Неоплаченные начисления остаются в основной таблице:
+        по ним считаются задолженности; после оплаты их перенесет следующий запуск.
+        Каждый год переносится двумя транзакциями: копия фиксируется в архиве до
+        удаления из основной таблицы, поэтому прерванный перенос безопасно повторить.
+        Внутри transaction() перенос фиксируется или откатывается вместе с внешним блоком.
+        progress(год, перенесено строк) вызывается после каждого года.
+        Возвращает {'before': ..., 'moved': ..., 'years': {год: строк}, 'seconds': ...}.
+        """
+        try:
+            cutoff = datetime.strptime(before[:7], '%Y-%m').strftime('%Y-%m-01')
+        except ValueError:
+            raise ValueError(f"Неверный период: {before} (ожидается ГГГГ-ММ)")
+        
+        conn = self.connect()
+        started = time.perf_counter()
+        years = [row[0] for row in conn.execute("""
+            SELECT DISTINCT CAST(substr(period, 1, 4) AS INTEGER) FROM payments
+            WHERE period < ? AND is_paid = 1
+            ORDER BY 1
+        """, (cutoff,))]
+        
+        columns = ', '.join(PAYMENT_COLUMNS)
+        moved = {}
+        for year in years:
+            schema = self.attach_archives(conn, [year], create=True)[0]
+            bounds = (f"{year:04d}-01-01", min(cutoff, f"{year + 1:04d}-01-01"))
+            # Копия фиксируется в архиве до удаления из основной таблицы
+            # (внутри внешнего transaction() обе части - точки сохранения)
+            with self.transaction():
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO {schema}.payments ({columns})
+                    SELECT {columns} FROM main.payments
+                    WHERE period >= ? AND period < ? AND is_paid = 1
+                """, bounds)
+            
+            with self.transaction():
+                deleted = conn.execute("""
+                    DELETE FROM main.payments
+                    WHERE period >= ? AND period < ? AND is_paid = 1
+                """, bounds).rowcount
+                conn.execute(f"""
+                    INSERT INTO payment_archive (period, year, file, rows)
+                    SELECT period, ?, ?, COUNT(*) FROM {schema}.payments
+                    WHERE period >= ? AND period < ?
+                    GROUP BY period
+                    ON CONFLICT(period) DO UPDATE SET rows = excluded.rows, archived_at = CURRENT_TIMESTAMP
+                """, (year, os.path.basename(self.archive_path(year))) + bounds)
+            
+            moved[year] = deleted
+            if progress:
+                progress(year, deleted)
+        
+        return {
+            'before': cutoff,
+            'moved': sum(moved.values()),
+            'years': moved,
+            'seconds': time.perf_counter() - started
+        }
+    
+    def archived_periods(self) -> List[Dict]:
+        """Реестр архивных периодов платежей"""
+        conn = self.connect()
+        rows = conn.execute("SELECT * FROM payment_archive ORDER BY period").fetchall()
+        return [dict(row) for row in rows]
+    
+    def attach_archives(self, conn, years: List[int], create: bool = False) -> List[str]:
+        """
+        Подключение архивных баз за годы years к соединению conn. Прочие архивы
+        отключаются: число баз, подключенных к соединению, ограничено (по умолчанию 10).
+        create=True создает недостающие файлы и таблицы архива. Возвращает имена схем.
+        """
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        wanted = {f"{ARCHIVE_SCHEMA_PREFIX}{year}": year for year in years}
+        
+        # Внутри транзакции база, к которой уже обращались, не отключается (database is locked):
+        # прочие архивы остаются подключенными до ее завершения
+        for schema in attached - set(wanted):
+            if schema.startswith(ARCHIVE_SCHEMA_PREFIX) and not conn.in_transaction:
+                conn.execute(f"DETACH DATABASE {schema}")
+        
+        for schema, year in wanted.items():
+            if schema in attached:
+                continue
+            path = self.archive_path(year)
+            if not create and not os.path.exists(path):
+                raise FileNotFoundError(f"Архив платежей за {year} год не найден: {path}")
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            if create:
+                for statement in ARCHIVE_PAYMENTS_SQL.format(schema=schema).split(';'):
+                    conn.execute(statement)
+        
+        return list(wanted)
+    
+    def payments_source(self, conn, period: str = None) -> str:
+        """
+        Источник строк платежей для запросов отчетов (подставляется во FROM).
+        Архивы лет, периоды которых совпадают с фильтром (подстрока периода, как
+        в LIKE), подключаются к conn и объединяются с основной таблицей через
+        UNION ALL; без фильтра - все архивы, и отчет включает всю историю платежей.
+        Если архивы фильтр не затрагивает - только основная таблица.
+        """
+        years = [row[0] for row in conn.execute(
+            "SELECT DISTINCT year FROM payment_archive WHERE period LIKE ? ORDER BY year", (f'%{period or ""}%',)
+        )]
+        if not years:
+            return "payments"
+        
+        columns = ', '.join(PAYMENT_COLUMNS)
+        parts = [f"SELECT {columns} FROM main.payments"]
+        parts += [f"SELECT {columns} FROM {schema}.payments" for schema in self.attach_archives(conn, years)]
+        return "(" + " UNION ALL ".join(parts) + ")"
+    
+    # === Экспорт ===
+    
+    def export_table_csv(self, path, table_name: str, conditions: Dict = None,
+                         sort_field: str = None, ascending: bool = True,
+                         progress: Callable[[int], None] = None) -> int:
+        """
+        Потоковый экспорт таблицы в CSV прямо из курсора.
+        Учитывает фильтр (как в filter_records) и сортировку; память не зависит
+        от размера таблицы. path - имя файла или открытый текстовый поток.
+        Возвращает количество выгруженных строк.
+        """
+        query, values = self._export_query(table_name, conditions, sort_field, ascending)
+        cursor = self.connect().execute(query, values)
+        return write_cursor_csv(cursor, path, progress)
+    
+    def export_table_parquet(self, path: str, table_name: str, conditions: Dict = None,
+                             sort_field: str = None, ascending: bool = True, partition: bool = False,
+                             progress: Callable[[int], None] = None) -> Dict:
+        """
+        Потоковый экспорт таблицы в Parquet (нужен pyarrow) с сохранением типов:
+        целые, логические, даты, денежные суммы (decimal). Строки читаются из курсора
+        порциями и пишутся группами строк. partition=True - разбиение по месяцам
+        поля period: path становится каталогом month=ГГГГ-ММ/part-0.parquet.
+        Возвращает {'rows': ..., 'files': [...]}.
+        """
+        conn = self.connect()
+        kinds = table_column_kinds(conn, table_name)
+        partition_by = None
+        if partition:
+            partition_by = TABLE_PERIOD_COLUMNS.get(table_name)
+            if partition_by is None:
+                raise ValueError(f"Таблица {table_name} не разбивается по периодам")
+            # Без явной сортировки - по полю разбиения: в памяти держится только текущий месяц
+            if not sort_field:
+                sort_field, ascending = partition_by, True
+        
+        query, values = self._export_query(table_name, conditions, sort_field, ascending)
+        cursor = conn.execute(query, values)
+        
+        with ParquetSink(path, arrow_schema(kinds), partition_by) as sink:
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                sink.write(rows_to_table(rows, kinds))
+                if progress:
+                    progress(sink.rows)
+        
+        return {'rows': sink.rows, 'files': sink.files}
+    
+    def _export_query(self, table_name: str, conditions: Optional[Dict], sort_field: Optional[str],
+                      ascending: bool) -> tuple:
+        """Запрос выгрузки таблицы с фильтром и сортировкой"""
+        where_sql, values = self._where_clause(table_name, conditions)
+        query = f"SELECT * FROM {table_name}"
+        if where_sql:
+            query += f" WHERE {where_sql}"
+        if sort_field:
+            order = "ASC" if ascending else "DESC"
+            query += f" ORDER BY {sort_field} {order}, id {order}"
+        return query, values
+    
+    # === Массовая загрузка ===
+    
+    def load_payments_csv(self, path: str, chunk_size: int = 50000, rejected_path: str = None,
+                          progress: Callable[[int, int], None] = None) -> Dict:
+        """
+        Потоковая загрузка реестра платежей из CSV.
+        Файл читается порциями по chunk_size строк, каждая порция проверяется
+        на ограничения таблицы payments и внешние ключи и записывается одной
+        транзакцией через executemany. Отклоненные строки не прерывают загрузку:
+        они пишутся в rejected_path (если указан) вместе с причиной.
+        """
+        conn = self.connect()
+        started = time.perf_counter()
+        
+        # Допустимые значения внешних ключей загружаются один раз
+        apartment_ids = {row[0] for row in conn.execute("SELECT id FROM apartments")}
+        service_ids = {row[0] for row in conn.execute("SELECT id FROM services")}
+        
+        loaded = 0
+        rejected = 0
+        errors = []
+        
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            reader = csv.reader(source)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"Файл {path} пуст")
+            
+            header = [name.strip() for name in header]
+            parse_row = _payment_row_parser(header)
+            
+            rejected_file = open(rejected_path, 'w', newline='', encoding='utf-8-sig') if rejected_path else None
+            rejected_writer = csv.writer(rejected_file) if rejected_file else None
+            if rejected_writer:
+                rejected_writer.writerow(['line', 'reason'] + header)
+            
+            def reject(line_no, reason, raw):
+                nonlocal rejected
+                rejected += 1
+                if len(errors) < 100:
+                    errors.append((line_no, reason))
+                if rejected_writer:
+                    rejected_writer.writerow([line_no, reason] + raw)
+            
+            try:
+                line_no = 1
+                while True:
+                    chunk = list(islice(reader, chunk_size))
+                    if not chunk:
+                        break
+                    
+                    valid = []
+                    for raw in chunk:
+                        line_no += 1
+                        try:
+                            record = parse_row(raw)
+                        except ValueError as e:
+                            reject(line_no, str(e), raw)
+                            continue
+                        
+                        if record[0] not in apartment_ids:
+                            reject(line_no, f"Квартира {record[0]} не найдена", raw)
+                        elif record[1] not in service_ids:
+                            reject(line_no, f"Услуга {record[1]} не найдена", raw)
+                        else:
+                            valid.append((line_no, raw, record))
+                    
+                    # Упорядочивание порции по ключу индекса делает вставки в индексы локальными
+                    valid.sort(key=lambda item: item[2][:3])
+                    loaded += self._insert_payment_chunk(conn, valid, reject)
+                    
+                    if progress:
+                        progress(loaded, rejected)
+            finally:
+                if rejected_file:
+                    rejected_file.close()
+        
+        seconds = time.perf_counter() - started
+        return {
+            'loaded': loaded,
+            'rejected': rejected,
+            'errors': errors,
+            'seconds': seconds,
+            'rows_per_second': (loaded + rejected) / seconds if seconds else 0.0
+        }
+    
+    def _insert_payment_chunk(self, conn, rows: List[tuple], reject: Callable) -> int:
+        """Запись проверенной порции платежей одной транзакцией (внутри transaction() - точкой сохранения)"""
+        if not rows:
+            return 0
+        
+        query = """
+            INSERT INTO payments (apartment_id, service_id, period, amount, is_paid, payment_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        try:
+            with self.transaction():
+                conn.executemany(query, [record for _, _, record in rows])
+            return len(rows)
+        except sqlite3.IntegrityError:
+            pass
+        
+        # Порция отклонена базой целиком - повторяем построчно, чтобы найти виновные строки
+        inserted = 0
+        with self.transaction():
+            for line_no, raw, record in rows:
+                try:
+                    conn.execute(query, record)
+                    inserted += 1
+                except sqlite3.IntegrityError as e:
+                    reject(line_no, str(e), raw)
+        return inserted
+    
+    # === Сверка с банковской выпиской ===
+    
+    def reconcile_statement(self, path: str, review_path: str = None) -> Dict:
+        """
+        Сверка банковской выписки (CSV) с неоплаченными начислениями и их оплата.
+        Строка выписки сопоставляется с начислением по квартире, периоду и сумме
+        (и услуге, если в выписке есть service_id) соединением по хешу: строки
+        выписки группируются по ключу в словаре, из базы по индексу читаются только
+        неоплаченные начисления квартир и периодов выписки. Ключ сопоставлен, если
+        строк выписки столько же, сколько начислений; иначе строки неоднозначны.
+        Все сопоставленные начисления оплачиваются одной транзакцией. Ошибочные,
+        несопоставленные и неоднозначные строки пишутся в review_path (если указан).
+        """
+        started = time.perf_counter()
+        
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            reader = csv.reader(source)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"Файл {path} пуст")
+            
+            header = [name.strip() for name in header]
+            parse_row = _statement_row_parser(header)
+            
+            # Строки выписки по ключу сопоставления: сторона построения хеш-соединения
+            lines = {}
+            review = []
+            for line_no, raw in enumerate(reader, start=2):
+                try:
+                    key, payment_date = parse_row(raw)
+                except ValueError as e:
+                    review.append((line_no, STATEMENT_INVALID, str(e), raw))
+                    continue
+                lines.setdefault(key, []).append((line_no, raw, payment_date))
+        
+        with_service = 'service_id' in header
+        today = date.today().isoformat()
+        changes = []
+        matched_amount = 0
+        
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS statement_keys (
+                    apartment_id INTEGER, period TEXT, PRIMARY KEY (apartment_id, period)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("DELETE FROM temp.statement_keys")
+            conn.executemany("INSERT OR IGNORE INTO temp.statement_keys VALUES (?, ?)",
+                             ((key[0], key[-2]) for key in lines))
+            
+            # Неоплаченные начисления тех же квартир и периодов: сторона проверки.
+            # Начисление доступно и по ключу без услуги - для строк с пустым service_id
+            candidates = {}
+            for payment_id, apartment_id, service_id, period, amount in conn.execute("""
+                SELECT p.id, p.apartment_id, p.service_id, p.period, p.amount
+                FROM temp.statement_keys k
+                JOIN payments p ON p.is_paid = 0 AND p.apartment_id = k.apartment_id AND p.period = k.period
+            """):
+                cents = round(amount * 100)
+                if with_service:
+                    candidates.setdefault((apartment_id, service_id, period, cents), []).append(payment_id)
+                candidates.setdefault((apartment_id, period, cents), []).append(payment_id)
+            conn.execute("DROP TABLE temp.statement_keys")
+            
+            # Строки выписки сопоставляются с начислениями поиском по ключу в словаре;
+            # строки с услугой - первыми, строкам без нее остаются еще не оплаченные начисления
+            paid = set()
+            for key, statement_lines in sorted(lines.items(), key=lambda item: -len(item[0])):
+                payment_ids = sorted(set(candidates.get(key, [])) - paid)
+                if not payment_ids:
+                    for line_no, raw, _ in statement_lines:
+                        review.append((line_no, STATEMENT_UNMATCHED, "Нет неоплаченного начисления", raw))
+                elif len(payment_ids) != len(statement_lines):
+                    reason = f"Начислений: {len(payment_ids)}, строк выписки: {len(statement_lines)}"
+                    for line_no, raw, _ in statement_lines:
+                        review.append((line_no, STATEMENT_AMBIGUOUS, reason, raw))
+                else:
+                    for payment_id, (_, _, payment_date) in zip(payment_ids, statement_lines):
+                        changes.append((payment_date or today, payment_id))
+                    paid.update(payment_ids)
+                    matched_amount += key[-1] * len(payment_ids)
+            
+            # Запись в той же транзакции без вложенной точки сохранения (update_many):
+            # с temp_store = MEMORY журнал точки сохранения при срабатывании триггеров
+            # сводки задолженностей делает оплату квадратичной по числу строк
+            changes.sort(key=itemgetter(1))
+            conn.executemany("UPDATE payments SET is_paid = 1, payment_date = ? WHERE id = ?", changes)
+        
+        if review_path:
+            with open(review_path, 'w', newline='', encoding='utf-8-sig') as target:
+                writer = csv.writer(target)
+                writer.writerow(['line', 'status', 'reason'] + header)
+                for line_no, status, reason, raw in sorted(review, key=itemgetter(0)):
+                    writer.writerow([line_no, status, reason] + raw)
+        
+        statuses = [status for _, status, _, _ in review]
+        seconds = time.perf_counter() - started
+        total = len(changes) + len(review)
+        return {
+            'lines': total,
+            'matched': len(changes),
+            'matched_amount': matched_amount / 100,
+            'unmatched': statuses.count(STATEMENT_UNMATCHED),
+            'ambiguous': statuses.count(STATEMENT_AMBIGUOUS),
+            'invalid': statuses.count(STATEMENT_INVALID),
+            'seconds': seconds,
+            'lines_per_second': total / seconds if seconds else 0.0
+        }
+
+
+def fts_match_query(value: str) -> str:
+    """Выражение MATCH для FTS5: каждое слово запроса ищется как префикс"""
+    return ' '.join(f'"{token}"*' for token in re.findall(r'\w+', value))
+
+
+# Размер порции строк, читаемых из курсора при экспорте
+EXPORT_BATCH_SIZE = 5000
+
+# Размер буфера файла экспорта
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# Формы строк результата чтения:
+#   dict    - словарь на каждую строку (по умолчанию);
+#   tuple   - кортежи, названия полей один раз в атрибуте columns списка;
+#   record  - именованные кортежи (доступ row.field и row[i], без словаря в каждой строке);
+#   columns - словарь {поле: список значений} по столбцам
+ROW_SHAPES = ('dict', 'tuple', 'record', 'columns')
+
+
+class TupleRows(list):
+    """Список строк-кортежей с общим заголовком columns"""
+    
+    def __init__(self, columns: List[str], rows=()):
+        super().__init__(rows)
+        self.columns = columns
+
+
+@functools.lru_cache(maxsize=256)
+def record_type(columns: tuple):
+    """Класс именованного кортежа для набора полей (повторяющиеся и недопустимые имена переименовываются)"""
+    return namedtuple('Record', columns, rename=True)
+
+
+def check_shape(shape: str):
+    if shape not in ROW_SHAPES:
+        raise ValueError(f"Неизвестная форма строк: {shape!r} (допустимо: {', '.join(ROW_SHAPES)})")
+
+
+def shape_rows(columns: List[str], rows: List[tuple], shape: str = 'dict'):
+    """Строки-кортежи курсора в форме shape"""
+    if shape == 'dict':
+        return [dict(zip(columns, row)) for row in rows]
+    if shape == 'tuple':
+        return TupleRows(columns, rows)
+    if shape == 'record':
+        make = record_type(tuple(columns))._make
+        return [make(row) for row in rows]
+    if shape == 'columns':
+        values = zip(*rows) if rows else [()] * len(columns)
+        return {name: list(column) for name, column in zip(columns, values)}
+    check_shape(shape)
+
+
+def fetch_rows(cursor, shape: str = 'dict'):
+    """
+    Все строки выполненного запроса в форме shape. Строки читаются как кортежи,
+    без промежуточных sqlite3.Row, и сразу приводятся к нужной форме.
+    """
+    check_shape(shape)
+    cursor.row_factory = None
+    return shape_rows([column[0] for column in cursor.description], cursor.fetchall(), shape)
+
+
+class RowStream:
+    """
+    Потоковое чтение результата запроса порциями через fetchmany.
+    Итерация выдает строки по одной в форме shape ('dict', 'tuple', 'record'),
+    batches() - порции строк (для 'columns' - словари столбцов каждой порции).
+    Названия полей доступны в columns до чтения первой строки. Курсор закрывается,
+    когда строки закончились, при close() или при выходе из with.
+    """
+    
+    def __init__(self, cursor, shape: str = 'dict', batch_size: int = EXPORT_BATCH_SIZE):
+        check_shape(shape)
+        cursor.row_factory = None
+        self.cursor = cursor
+        self.shape = shape
+        self.batch_size = batch_size
+        self.columns = [column[0] for column in cursor.description]
+        self.rows = 0
+        self._iterator = None
+    
+    def batches(self) -> Iterator:
+        # Как у файла: повторная итерация продолжает чтение с места остановки
+        while True:
+            rows = self.cursor.fetchmany(self.batch_size)
+            if not rows:
+                self.close()
+                return
+            self.rows += len(rows)
+            yield shape_rows(self.columns, rows, self.shape)
+    
+    def __iter__(self) -> Iterator:
+        return self
+    
+    def __next__(self):
+        if self._iterator is None:
+            if self.shape == 'columns':
+                raise ValueError("Форма 'columns' читается порциями: используйте batches()")
+            self._iterator = (row for batch in self.batches() for row in batch)
+        return next(self._iterator)
+    
+    def close(self):
+        self.cursor.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextlib.contextmanager
+def open_export(path):
+    """Файл экспорта по пути или уже открытый текстовый поток (например, тело ответа HTTP)"""
+    if not isinstance(path, (str, os.PathLike)):
+        yield path
+        return
+    with open(path, 'w', newline='', encoding='utf-8-sig', buffering=EXPORT_BUFFER_SIZE) as target:
+        yield target
+
+
+def write_cursor_csv(cursor, path, progress: Callable[[int], None] = None,
+                     batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Запись результата курсора в CSV (файл или открытый поток) порциями через fetchmany"""
+    written = 0
+    with open_export(path) as target:
+        writer = csv.writer(target)
+        writer.writerow([column[0] for column in cursor.description])
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+            if progress:
+                progress(written)
+    
+    return written
+
+
+# Колонки CSV-реестра платежей; первые четыре обязательны
+PAYMENT_CSV_COLUMNS = ['apartment_id', 'service_id', 'period', 'amount', 'is_paid', 'payment_date']
+
+
+def _payment_row_parser(header: List[str]) -> Callable[[List[str]], tuple]:
+    """
+    Построение функции разбора строки реестра под заголовок файла.
+    Функция проверяет ограничения таблицы payments и возвращает кортеж
+    значений в порядке PAYMENT_CSV_COLUMNS.
+    """
+    missing = [name for name in PAYMENT_CSV_COLUMNS[:4] if name not in header]
+    if missing:
+        raise ValueError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+    
+    required = itemgetter(*[header.index(name) for name in PAYMENT_CSV_COLUMNS[:4]])
+    is_paid_pos = header.index('is_paid') if 'is_paid' in header else None
+    payment_date_pos = header.index('payment_date') if 'payment_date' in header else None
+    
+    def parse(raw: List[str]) -> tuple:
+        try:
+            apartment_id, service_id, period, amount = required(raw)
+            is_paid = raw[is_paid_pos].strip().lower() if is_paid_pos is not None else ''
+            payment_date = raw[payment_date_pos].strip() if payment_date_pos is not None else ''
+        except IndexError:
+            raise ValueError("Неполная строка")
+        
+        period = period.strip()
+        if not apartment_id or not service_id or not period or not amount:
+            raise ValueError("Не заполнено обязательное поле")
+        
+        try:
+            apartment_id = int(apartment_id)
+            service_id = int(service_id)
+        except ValueError:
+            raise ValueError("Неверный формат идентификатора")
+        
+        try:
+            amount = float(amount.replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"Неверная сумма: {amount}")
+        if amount < 0:
+            raise ValueError(f"Отрицательная сумма: {amount}")
+        
+        if is_paid in ('', '0', 'false', 'нет'):
+            is_paid = 0
+        elif is_paid in ('1', 'true', 'да'):
+            is_paid = 1
+        else:
+            raise ValueError(f"Неверный признак оплаты: {is_paid}")
+        
+        return apartment_id, service_id, period, amount, is_paid, payment_date or None
+    
+    return parse
+
+
+# Колонки банковской выписки; первые три обязательны, service_id уточняет сопоставление
+STATEMENT_CSV_COLUMNS = ['apartment_id', 'period', 'amount', 'payment_date', 'service_id']
+
+# Состояния строк выписки в файле проверки
+STATEMENT_INVALID = 'invalid'          # строка не разобрана
+STATEMENT_UNMATCHED = 'unmatched'      # нет неоплаченного начисления
+STATEMENT_AMBIGUOUS = 'ambiguous'      # число начислений и строк выписки по ключу не совпадает
+
+
+def _statement_row_parser(header: List[str]) -> Callable[[List[str]], tuple]:
+    """
+    Построение функции разбора строки выписки под заголовок файла.
+    Функция возвращает (ключ сопоставления, дата оплаты или None); ключ -
+    (квартира, [услуга,] период ГГГГ-ММ-01, сумма в копейках).
+    """
+    missing = [name for name in STATEMENT_CSV_COLUMNS[:3] if name not in header]
+    if missing:
+        raise ValueError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+    
+    required = itemgetter(*[header.index(name) for name in STATEMENT_CSV_COLUMNS[:3]])
+    payment_date_pos = header.index('payment_date') if 'payment_date' in header else None
+    service_pos = header.index('service_id') if 'service_id' in header else None
+    
+    def parse(raw: List[str]) -> tuple:
+        try:
+            apartment_id, period, amount = required(raw)
+            payment_date = raw[payment_date_pos].strip() if payment_date_pos is not None else ''
+            # Пустая ячейка service_id - как выписка без этой колонки: сопоставление без услуги
+            service_id = (raw[service_pos].strip() or None) if service_pos is not None else None
+        except IndexError:
+            raise ValueError("Неполная строка")
+        
+        try:
+            apartment_id = int(apartment_id)
+            service_id = int(service_id) if service_id is not None else None
+        except ValueError:
+            raise ValueError("Неверный формат идентификатора")
+        
+        try:
+            period = datetime.strptime(period.strip()[:7], '%Y-%m').strftime('%Y-%m-01')
+        except ValueError:
+            raise ValueError(f"Неверный период: {period}")
+        
+        try:
+            cents = round(float(amount.replace(',', '.')) * 100)
+        except ValueError:
+            raise ValueError(f"Неверная сумма: {amount}")
+        if cents <= 0:
+            raise ValueError(f"Сумма должна быть положительной: {amount}")
+        
+        if payment_date:
+            try:
+                payment_date = date.fromisoformat(payment_date[:10]).isoformat()
+            except ValueError:
+                raise ValueError(f"Неверная дата оплаты: {payment_date}")
+        
+        if service_id is None:
+            return (apartment_id, period, cents), payment_date or None
+        return (apartment_id, service_id, period, cents), payment_date or None
+    
+    return parse
@@ -0,0 +1,323 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+from database import GHUDatabase, DEFAULT_SERVICES
+
+# Детерминированный генератор жилого фонда для нагрузочных проверок: дома, квартиры,
+# жильцы и многолетние начисления. Одинаковые seed и объем дают одинаковые данные.
+
+STREETS = [
+    "ул. Ленина", "ул. Советская", "пр. Мира", "ул. Гагарина", "ул. Пушкина",
+    "ул. Садовая", "ул. Молодежная", "ул. Школьная", "ул. Лесная", "ул. Заводская",
+    "ул. Центральная", "ул. Набережная", "пр. Победы", "ул. Комсомольская", "ул. Строителей",
+    "ул. Октябрьская", "ул. Чехова", "ул. Горького", "пер. Почтовый", "б-р Космонавтов"
+]
+
+# Мужские имена и основа отчества (основа + "ич" / "на")
+MALE_NAMES = [
+    ("Александр", "Александров"), ("Алексей", "Алексеев"), ("Андрей", "Андреев"),
+    ("Антон", "Антонов"), ("Борис", "Борисов"), ("Василий", "Васильев"),
+    ("Виктор", "Викторов"), ("Владимир", "Владимиров"), ("Геннадий", "Геннадьев"),
+    ("Дмитрий", "Дмитриев"), ("Евгений", "Евгеньев"), ("Иван", "Иванов"),
+    ("Игорь", "Игорев"), ("Кирилл", "Кириллов"), ("Константин", "Константинов"),
+    ("Максим", "Максимов"), ("Михаил", "Михайлов"), ("Николай", "Николаев"),
+    ("Олег", "Олегов"), ("Павел", "Павлов"), ("Петр", "Петров"), ("Роман", "Романов"),
+    ("Сергей", "Сергеев"), ("Степан", "Степанов"), ("Юрий", "Юрьев")
+]
+
+FEMALE_NAMES = [
+    "Анна", "Елена", "Ольга", "Татьяна", "Наталья", "Ирина", "Светлана", "Мария",
+    "Екатерина", "Юлия", "Марина", "Галина", "Людмила", "Валентина", "Надежда",
+    "Вера", "Любовь", "Дарья", "Анастасия", "Ксения", "Полина", "Виктория", "Нина"
+]
+
+# Фамилии в мужской форме; женская образуется функцией female_surname
+SURNAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+    "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров",
+    "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин",
+    "Захаров", "Зайцев", "Соловьев", "Борисов", "Яковлев", "Григорьев", "Романов", "Воробьев",
+    "Сергеев", "Кузьмин", "Фролов", "Александров", "Дмитриев", "Королев", "Гусев", "Киселев",
+    "Ильин", "Максимов", "Поляков", "Сорокин", "Виноградов", "Ковалев", "Белов", "Медведев",
+    "Антонов", "Тарасов", "Жуков", "Баранов", "Филиппов", "Комаров", "Давыдов", "Беляев",
+    "Герасимов", "Богданов", "Осипов", "Сидоров", "Матвеев", "Титов", "Марков", "Миронов",
+    "Крылов", "Куликов", "Карпов", "Власов", "Мельников", "Денисов", "Гаврилов", "Тихонов",
+    "Казаков", "Афанасьев", "Данилов", "Савельев", "Тимофеев", "Фомин", "Чернов", "Абрамов",
+    "Мартынов", "Ефимов", "Федотов", "Щербаков", "Назаров", "Калинин", "Исаев", "Чернышев",
+    "Быков", "Маслов", "Родионов", "Коновалов", "Лазарев", "Воронин", "Климов", "Филатов",
+    "Пономарев", "Голубев", "Кудрявцев", "Прохоров", "Наумов", "Потапов", "Журавлев", "Овчинников",
+    "Трофимов", "Леонов", "Соболев", "Ермаков", "Колесников", "Гончаров", "Емельянов", "Никифоров",
+    "Грачев", "Котов", "Гришин", "Ефремов", "Архипов", "Громов", "Кириллов", "Малышев",
+    "Панов", "Моисеев", "Румянцев", "Акимов", "Кондратьев", "Бирюков", "Горбунов", "Анисимов",
+    "Еремин", "Тихомиров", "Галкин", "Лукьянов", "Михеев", "Скворцов", "Юдин", "Белоусов",
+    "Нестеров", "Симонов", "Прокофьев", "Харитонов", "Князев", "Цветков", "Левин", "Митрофанов",
+    "Воронов", "Аксенов", "Софронов", "Мальцев", "Логинов", "Горшков", "Савин", "Краснов",
+    "Майоров", "Демидов", "Елисеев", "Рыбаков", "Сафонов", "Плотников", "Демин", "Хохлов",
+    "Жданов", "Муравьев", "Зуев", "Островский", "Вишневский", "Ковальский", "Покровский"
+]
+
+# Этажность домов (с повторами как весами) и квартир на этаже в подъезде
+FLOORS = [5, 5, 5, 9, 9, 9, 9, 10, 12, 14, 16, 17]
+APARTMENTS_PER_FLOOR = 4
+
+# Число комнат и его вес
+ROOMS = [1, 2, 3, 4]
+ROOM_WEIGHTS = [30, 40, 25, 5]
+
+# Порция строк для executemany
+INSERT_BATCH_SIZE = 50000
+
+
+def female_surname(surname: str) -> str:
+    """Женская форма фамилии: Иванов - Иванова, Островский - Островская"""
+    if surname.endswith("ий"):
+        return surname[:-2] + "ая"
+    return surname + "а"
+
+
+def add_months(period: date, months: int) -> date:
+    """Первое число месяца, отстоящего от period на months месяцев"""
+    index = period.year * 12 + period.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class HousingStockGenerator:
+    """
+    Генератор жилого фонда заданного объема.
+    Объем задается числом начислений: дома и квартиры добавляются, пока
+    ежемесячные начисления за years лет не покроют нужное количество.
+    """
+
+    def __init__(self, seed: int = 0, start_period: str = "2021-01", years: int = 3,
+                 unpaid_ratio: float = 0.06, recent_unpaid_ratio: float = 0.35,
+                 debtor_ratio: float = 0.03):
+        self.seed = seed
+        self.start_period = date.fromisoformat(f"{start_period}-01")
+        self.years = years
+        # Доля неоплаченных начислений в закрытых периодах и в двух последних месяцах
+        self.unpaid_ratio = unpaid_ratio
+        self.recent_unpaid_ratio = recent_unpaid_ratio
+        # Доля квартир-должников, которые перестают платить с какого-то месяца
+        self.debtor_ratio = debtor_ratio
+
+    def populate(self, db: GHUDatabase, payments: int) -> Dict:
+        """
+        Добавление жилого фонда с payments начислениями в базу.
+        Возвращает количество добавленных строк по таблицам и время генерации.
+        """
+        started = time.perf_counter()
+        rng = random.Random(self.seed)
+        conn = db.connect()
+
+        services = self._services(conn)
+        next_ids = {
+            table: conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+            for table in ('buildings', 'apartments', 'residents', 'payments')
+        }
+
+        # Квартиры набираются, пока их начисления за years лет не покроют нужный объем
+        months = max(self.years * 12, 1)
+        per_period_target = -(-payments // months)
+        end_date = add_months(self.start_period, months)
+
+        buildings, apartments, residents = [], [], []
+        charges = []
+        per_period = 0
+        street_numbers = {}
+
+        while per_period < per_period_target:
+            building_id = next_ids['buildings'] + len(buildings)
+            floors = rng.choice(FLOORS)
+            entrances = rng.randint(1, 6) if floors <= 9 else rng.randint(1, 3)
+            year_built = rng.randint(1958, 2020) if floors <= 9 else rng.randint(1975, 2020)
+
+            street = rng.choice(STREETS)
+            street_numbers[street] = street_numbers.get(street, 0) + rng.randint(1, 4)
+            address = f"{street}, {street_numbers[street]}"
+            if rng.random() < 0.15:
+                address += f" к{rng.randint(1, 3)}"
+
+            count = floors * entrances * APARTMENTS_PER_FLOOR
+            buildings.append((building_id, address, year_built, floors, count))
+
+            for number in range(1, count + 1):
+                apartment_id = next_ids['apartments'] + len(apartments)
+                rooms = rng.choices(ROOMS, ROOM_WEIGHTS)[0]
+                flags = {
+                    'cold_water': 1 if rng.random() < 0.99 else 0,
+                    'hot_water': 1 if rng.random() < (0.9 if year_built >= 1970 else 0.7) else 0,
+                    'garbage_chute': 1 if floors >= 9 and rng.random() < 0.9 else 0,
+                    'elevator': 1 if floors >= 6 else 0
+                }
+                area = round(rooms * rng.uniform(14.0, 19.0) + rng.uniform(6.0, 14.0), 1)
+                privatized = 1 if rng.random() < 0.75 else 0
+                apartments.append((
+                    apartment_id, building_id, str(number), area, rooms, privatized,
+                    flags['cold_water'], flags['hot_water'], flags['garbage_chute'], flags['elevator']
+                ))
+
+                residents.extend(self._household(rng, apartment_id, rooms, privatized, year_built, end_date))
+
+                # Начисления квартиры: (услуга, сумма); должник перестает платить с debt_start
+                apartment_charges = [
+                    (service_id, round(area * price, 2))
+                    for service_id, price, flag in services
+                    if flag is None or flags.get(flag)
+                ]
+                debt_start = rng.randrange(months) if rng.random() < self.debtor_ratio else None
+                charges.append((apartment_id, apartment_charges, debt_start))
+                per_period += len(apartment_charges)
+
+        for index, row in enumerate(residents):
+            residents[index] = (next_ids['residents'] + index,) + row
+
+        conn.executemany("""
+            INSERT INTO buildings (id, address, year_built, floors, total_apartments)
+            VALUES (?, ?, ?, ?, ?)
+        """, buildings)
+        conn.executemany("""
+            INSERT INTO apartments (id, building_id, number, area, rooms, privatized,
+                                    cold_water, hot_water, garbage_chute, elevator)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, apartments)
+        conn.executemany("""
+            INSERT INTO residents (id, apartment_id, full_name, birth_date, passport, is_owner,
+                                   phone, registration_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, residents)
+
+        written = 0
+        for batch in self._payment_batches(rng, charges, payments, next_ids['payments']):
+            conn.executemany("""
+                INSERT INTO payments (id, apartment_id, service_id, period, amount, is_paid, payment_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            written += len(batch)
+
+        db._commit(conn)
+
+        return {
+            'buildings': len(buildings),
+            'apartments': len(apartments),
+            'residents': len(residents),
+            'payments': written,
+            'periods': -(-written // per_period) if per_period else 0,
+            'seconds': time.perf_counter() - started
+        }
+
+    def _services(self, conn) -> List[tuple]:
+        """Услуги базы (id, тариф, флаг применимости); пустой справочник заполняется стандартным"""
+        rows = conn.execute("SELECT id, price, apartment_flag FROM services ORDER BY id").fetchall()
+        if not rows:
+            conn.executemany(
+                "INSERT INTO services (name, price, description, apartment_flag) VALUES (?, ?, ?, ?)",
+                DEFAULT_SERVICES
+            )
+            rows = conn.execute("SELECT id, price, apartment_flag FROM services ORDER BY id").fetchall()
+        return [tuple(row) for row in rows]
+
+    def _household(self, rng: random.Random, apartment_id: int, rooms: int, privatized: int,
+                   year_built: int, end_date: date) -> List[tuple]:
+        """Жильцы квартиры: семья с общей фамилией; в приватизированной квартире бывает несколько собственников"""
+        surname = rng.choice(SURNAMES)
+        size = max(1, min(6, rooms + rng.choice([-1, 0, 0, 1])))
+        owners = 1
+        if privatized and size > 1:
+            owners = rng.choices([1, 2, 3], [60, 33, 7])[0]
+
+        # Глава семьи и супруг разного пола - взрослые, остальные - дети
+        # (с отчеством по имени отца) и пожилые родственники
+        _, father_stem = rng.choice(MALE_NAMES)
+        household = []
+        for position in range(size):
+            male = not household[0][1] if position == 1 else rng.random() < 0.5
+            child = position >= 2 and rng.random() < 0.8
+            if position < 2:
+                age = rng.randint(22, 85)
+            elif child:
+                age = rng.randint(0, 30)
+            else:
+                age = rng.randint(60, 95)
+
+            stem = father_stem if child else rng.choice(MALE_NAMES)[1]
+            if male:
+                full_name = f"{surname} {rng.choice(MALE_NAMES)[0]} {stem}ич"
+            else:
+                full_name = f"{female_surname(surname)} {rng.choice(FEMALE_NAMES)} {stem}на"
+            household.append((full_name, male, age))
+
+        rows = []
+        for position, (full_name, male, age) in enumerate(household):
+            birth_date = end_date - timedelta(days=age * 365 + rng.randint(0, 364))
+            registered_from = max(date(year_built, 1, 1), birth_date)
+            span = max((end_date - registered_from).days, 1)
+            registration_date = registered_from + timedelta(days=rng.randrange(span))
+            passport = f"{rng.randint(1000, 9999)} {rng.randint(100000, 999999)}" if age >= 14 else None
+            phone = f"+7-9{rng.randint(0, 99):02d}-{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}" if age >= 14 else None
+            is_owner = 1 if position < owners else 0
+            rows.append((apartment_id, full_name, birth_date.isoformat(), passport, is_owner,
+                         phone, registration_date.isoformat()))
+        return rows
+
+    def _payment_batches(self, rng: random.Random, charges: List[tuple], payments: int, first_id: int):
+        """Начисления по месяцам от start_period порциями до INSERT_BATCH_SIZE строк"""
+        months = max(self.years * 12, 1)
+        batch = []
+        written = 0
+        period_index = 0
+
+        while written < payments:
+            period = add_months(self.start_period, period_index)
+            recent = period_index >= months - 2
+            paid_from = add_months(period, 1)
+
+            for apartment_id, apartment_charges, debt_start in charges:
+                in_debt = debt_start is not None and period_index >= debt_start
+                for service_id, amount in apartment_charges:
+                    if in_debt:
+                        is_paid = 0
+                    else:
+                        is_paid = 0 if rng.random() < (self.recent_unpaid_ratio if recent else self.unpaid_ratio) else 1
+                    payment_date = (paid_from + timedelta(days=rng.randint(0, 24))).isoformat() if is_paid else None
+
+                    batch.append((first_id + written, apartment_id, service_id, period.isoformat(),
+                                  amount, is_paid, payment_date))
+                    written += 1
+                    if len(batch) >= INSERT_BATCH_SIZE:
+                        yield batch
+                        batch = []
+                    if written >= payments:
+                        break
+                if written >= payments:
+                    break
+            period_index += 1
+
+        if batch:
+            yield batch
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Генерация жилого фонда для нагрузочных проверок")
+    parser.add_argument('db_path', help="файл базы данных (создается при отсутствии)")
+    parser.add_argument('--payments', type=int, default=100000, help="число начислений")
+    parser.add_argument('--seed', type=int, default=0, help="начальное значение генератора случайных чисел")
+    parser.add_argument('--years', type=int, default=3, help="число лет начислений")
+    parser.add_argument('--start', default="2021-01", help="первый период начислений (ГГГГ-ММ)")
+    args = parser.parse_args()
+
+    db = GHUDatabase(args.db_path, profile="bulk")
+    try:
+        stats = HousingStockGenerator(args.seed, args.start, args.years).populate(db, args.payments)
+    finally:
+        db.close()
+
+    print(f"Домов: {stats['buildings']}, квартир: {stats['apartments']}, жильцов: {stats['residents']}, "
+          f"начислений: {stats['payments']} за {stats['periods']} мес. ({stats['seconds']:.1f} с)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import functools
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Границы корзин гистограммы длительности запросов, мс (последняя корзина - все, что дольше)
+HISTOGRAM_BOUNDS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+# Порог медленного запроса по умолчанию, с
+SLOW_QUERY_THRESHOLD = 0.5
+
+# Сколько последних медленных запросов хранится в памяти
+SLOW_QUERY_HISTORY = 100
+
+# Операторы, для которых в журнал медленных запросов пишется план выполнения
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Файлы, кадры которых пропускаются при определении вызывающего кода
+_SKIPPED_FILES = (os.path.normcase(os.path.abspath(__file__)),)
+_SKIPPED_PACKAGES = (os.sep + 'pandas' + os.sep, os.sep + 'sqlite3' + os.sep)
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """
+    Нормализованный текст запроса: литералы заменены на ?, списки параметров
+    свернуты, пробелы схлопнуты. Запросы, различающиеся только значениями, совпадают.
+    """
+    text = _STRING_LITERAL.sub("?", sql)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _PARAMETER_LIST.sub("(?+)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _module_name(filename: str) -> Optional[str]:
+    """Имя файла для вызывающего кода или None для пропускаемых файлов"""
+    if (os.path.normcase(os.path.abspath(filename)) in _SKIPPED_FILES
+            or any(package in filename for package in _SKIPPED_PACKAGES)):
+        return None
+    return os.path.basename(filename)
+
+
+def caller() -> str:
+    """Место в коде приложения, из которого выполняется запрос (файл:функция:строка)"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = _module_name(frame.f_code.co_filename)
+        if name is not None:
+            return f"{name}:{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+class StatementStats:
+    """Накопленная статистика одного запроса (по отпечатку)"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.callers: Dict[str, int] = {}
+
+    def add(self, seconds: float, rows: int, where: str, failed: bool):
+        self.calls += 1
+        self.errors += 1 if failed else 0
+        self.rows += rows
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.callers[where] = self.callers.get(where, 0) + 1
+
+        milliseconds = seconds * 1000
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if milliseconds <= bound:
+                self.histogram[index] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def as_dict(self) -> Dict:
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            'fingerprint': self.fingerprint,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.calls if self.calls else 0.0,
+            'min_seconds': self.min or 0.0,
+            'max_seconds': self.max,
+            'histogram': dict(zip(labels, self.histogram)),
+            'callers': dict(sorted(self.callers.items(), key=lambda item: -item[1]))
+        }
+
+
+class QueryStats:
+    """
+    Статистика запросов всех соединений базы: гистограммы по отпечаткам и журнал
+    медленных запросов. Медленный (дольше threshold секунд) или завершившийся ошибкой
+    запрос попадает в список slow и, если задан slow_log, дописывается в файл вместе
+    с планом выполнения.
+    """
+
+    def __init__(self, threshold: float = SLOW_QUERY_THRESHOLD, slow_log: Optional[str] = None):
+        self.threshold = threshold
+        self.slow_log = slow_log
+        self.slow = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._statements: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, seconds: float, rows: int, where: str, error: Optional[Exception] = None,
+               plan: Optional[List[str]] = None):
+        """Учет выполненного запроса"""
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key)
+            stats.add(seconds, rows, where, error is not None)
+
+            if plan is None:
+                return
+            entry = {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'seconds': seconds,
+                'rows': rows,
+                'caller': where,
+                'sql': _WHITESPACE.sub(" ", sql).strip(),
+                'plan': plan,
+                'error': str(error) if error is not None else None
+            }
+            self.slow.append(entry)
+            if self.slow_log:
+                with open(self.slow_log, 'a', encoding='utf-8') as log:
+                    log.write(format_slow_entry(entry))
+
+    def is_slow(self, seconds: float) -> bool:
+        return self.threshold is not None and seconds >= self.threshold
+
+    def snapshot(self) -> List[Dict]:
+        """Статистика по отпечаткам, по убыванию суммарного времени"""
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._statements.values()]
+        return sorted(rows, key=lambda row: -row['total_seconds'])
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.slow.clear()
+
+    def dump(self, path: str):
+        """Запись статистики и последних медленных запросов в JSON"""
+        with self._lock:
+            slow = list(self.slow)
+        data = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'threshold_seconds': self.threshold,
+            'statements': self.snapshot(),
+            'slow_queries': slow
+        }
+        with open(path, 'w', encoding='utf-8') as target:
+            json.dump(data, target, ensure_ascii=False, indent=2)
+
+    def format(self, limit: int = 20) -> str:
+        """Текстовая сводка: самые затратные запросы"""
+        lines = [f"{'Вызовов':>8} {'Всего, с':>10} {'Среднее, мс':>12} {'Макс, мс':>10} {'Строк':>10}  Запрос"]
+        for row in self.snapshot()[:limit]:
+            text = row['fingerprint']
+            if len(text) > 120:
+                text = text[:117] + "..."
+            lines.append(
+                f"{row['calls']:>8} {row['total_seconds']:>10.3f} {row['mean_seconds'] * 1000:>12.2f} "
+                f"{row['max_seconds'] * 1000:>10.2f} {row['rows']:>10}  {text}"
+            )
+        return "\n".join(lines)
+
+
+def format_slow_entry(entry: Dict) -> str:
+    """Запись журнала медленных запросов"""
+    lines = [f"# {entry['time']} {entry['seconds'] * 1000:.1f} мс, строк: {entry['rows']}, {entry['caller']}"]
+    if entry['error']:
+        lines.append(f"# Ошибка: {entry['error']}")
+    lines.append(entry['sql'])
+    lines.extend(f"    {detail}" for detail in entry['plan'])
+    return "\n".join(lines) + "\n\n"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Курсор с замером запросов. Время запроса - выполнение и чтение всех строк;
+    запрос учитывается, когда результат прочитан до конца, курсор закрыт или
+    выполняет следующий запрос.
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        where = caller()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception as e:
+            self._record(sql, parameters, time.perf_counter() - started, 0, where, e)
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - started, 0, where]
+        if self.description is None:
+            # Изменение данных: строк не возвращает, учитываются затронутые строки
+            self._pending[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        where = caller()
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except Exception as e:
+            self._record(sql, (), time.perf_counter() - started, 0, where, e)
+            raise
+        self._record(sql, (), time.perf_counter() - started, max(self.rowcount, 0), where)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._fetch(super().fetchone, started)
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._fetch(super().fetchmany, started, self.arraysize if size is None else size)
+        self._fetched(started, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._fetch(super().fetchall, started)
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = self._fetch(super().__next__, started)
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def _fetch(self, fetch, started: float, *args):
+        """Чтение строк; ошибка при чтении (например, прерывание запроса) учитывается вместе с запросом"""
+        try:
+            return fetch(*args)
+        except StopIteration:
+            raise
+        except Exception as e:
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                pending[2] += time.perf_counter() - started
+                self._record(*pending, error=e)
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _fetched(self, started: float, rows: int, exhausted: bool):
+        pending = self._pending
+        if pending is None:
+            return
+        pending[2] += time.perf_counter() - started
+        pending[3] += rows
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._record(*pending)
+
+    def _record(self, sql, parameters, seconds, rows, where, error=None):
+        stats = getattr(self.connection, 'stats', None)
+        if stats is None:
+            return
+        plan = None
+        if error is not None or stats.is_slow(seconds):
+            plan = explain(self.connection, sql, parameters)
+        stats.record(sql, seconds, rows, where, error, plan)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Соединение, все запросы которого выполняются через InstrumentedCursor"""
+
+    stats: Optional[QueryStats] = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def explain(conn: sqlite3.Connection, sql: str, parameters=()) -> List[str]:
+    """
+    План выполнения запроса; выполняется обычным курсором, поэтому сам не учитывается.
+    Без параметров (executemany) вместо них подставляются NULL.
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+        return []
+    if not parameters:
+        parameters = [None] * _STRING_LITERAL.sub("", sql).count("?")
+    try:
+        cursor = sqlite3.Cursor(conn)
+        return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()]
+    except sqlite3.Error as e:
+        return [f"План недоступен: {e}"]
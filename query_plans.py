@@ -0,0 +1,117 @@
+import sys
+from typing import Callable, List, Set, Tuple
+from database import GHUDatabase
+from instrumentation import explain
+from reports import GHUReports
+
+# Горячие запросы приложения: (название, вызов, таблицы, которым разрешен SCAN).
+# SCAN разрешается только ведущей таблице отчетов, которые по смыслу читают
+# ее целиком; все остальные обращения должны идти через индексы.
+HOT_QUERIES: List[Tuple[str, Callable, Set[str]]] = [
+    ("get_by_id", lambda db, reports: db.get_by_id('payments', 1), set()),
+    ("get_apartments_by_building", lambda db, reports: db.get_apartments_by_building(1), set()),
+    ("get_residents_by_apartment", lambda db, reports: db.get_residents_by_apartment(1), set()),
+    ("get_payments_by_apartment", lambda db, reports: db.get_payments_by_apartment(1), set()),
+    ("calculate_payment", lambda db, reports: db.calculate_payment(1, 1, '2024-01-01'), set()),
+    ("generate_payments_report", lambda db, reports: reports.generate_payments_report(), {'p'}),
+    ("generate_payments_report (адрес)",
+     lambda db, reports: reports.generate_payments_report({'address': 'Ленина'}), set()),
+    ("generate_payments_report (неоплаченные)",
+     lambda db, reports: reports.generate_payments_report({'status': 'unpaid'}), set()),
+    ("generate_debts_report", lambda db, reports: reports.generate_debts_report(), {'d'}),
+    ("generate_debts_report (адрес)",
+     lambda db, reports: reports.generate_debts_report({'address': 'Ленина', 'min_debt': '100'}), {'d'}),
+    ("generate_electoral_register", lambda db, reports: reports.generate_electoral_register(), set()),
+    ("generate_electoral_register (возраст)",
+     lambda db, reports: reports.generate_electoral_register({'min_age': '30', 'max_age': '45'}, 'age'), set()),
+    ("generate_payments_report (итоги)",
+     lambda db, reports: reports.generate_payments_report({'address': 'Ленина'}, details=False), set()),
+    ("generate_debts_report (итоги)", lambda db, reports: reports.generate_debts_report(details=False), {'d'}),
+    ("generate_electoral_register (итоги)",
+     lambda db, reports: reports.generate_electoral_register(details=False), set()),
+    ("search (FTS)", lambda db, reports: db.search('residents', 'full_name', 'иванов'), set()),
+    ("filter_records (FTS)",
+     lambda db, reports: db.filter_records('buildings', {'address': 'ленина'}), set()),
+    ("run_billing", lambda db, reports: db.run_billing('2024-03'), {'a', 's'}),
+]
+
+# Служебные реестры (строка на период), которые читаются целиком в любом запросе:
+# реестр архивных периодов нужен отчетам по платежам, чтобы подключить архивы
+REGISTRY_SCANS = {'payment_archive'}
+
+# Операторы, план которых проверяется
+CHECKED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def find_scans(plan: List[str]) -> Set[str]:
+    """
+    Таблицы, которые читаются полным перебором. Автоматический индекс тоже
+    считается перебором: SQLite строит его сканированием таблицы при каждом запросе.
+    Обращения к виртуальным таблицам FTS5 - это поиск по индексу, а не перебор.
+    Чтение промежуточных результатов (материализованных CTE и подзапросов) не учитывается.
+    """
+    intermediate = {detail.split()[1] for detail in plan
+                    if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE ')) and len(detail.split()) > 1}
+    scans = set()
+    for detail in plan:
+        parts = detail.split()
+        if len(parts) < 2 or parts[1] in intermediate:
+            continue
+        if parts[0] == 'SCAN' and parts[1] != 'CONSTANT' and 'VIRTUAL' not in parts:
+            scans.add(parts[1])
+        elif parts[0] == 'SEARCH' and 'AUTOMATIC' in parts:
+            scans.add(parts[1])
+    return scans
+
+
+def check_query_plans(db: GHUDatabase) -> List[Tuple[str, str, List[str]]]:
+    """
+    Выполнение всех горячих запросов с перехватом SQL и проверкой их планов.
+    Возвращает список нарушений: (название, SQL, план).
+    """
+    reports = GHUReports(db)
+    # Результат из кэша не обращается к базе, и его план остался бы непроверенным
+    reports.cache = None
+    conn = db.connect()
+    violations = []
+
+    for name, call, allowed_scans in HOT_QUERIES:
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            call(db, reports)
+        finally:
+            conn.set_trace_callback(None)
+
+        for sql in statements:
+            if not sql.lstrip().upper().startswith(CHECKED_STATEMENTS):
+                continue
+            plan = explain(conn, sql)
+            if find_scans(plan) - allowed_scans - REGISTRY_SCANS:
+                violations.append((name, sql, plan))
+
+    return violations
+
+
+def main() -> int:
+    # Часть горячих запросов изменяет данные, поэтому проверка идет на временной базе
+    db = GHUDatabase(":memory:", seed=True)
+    violations = check_query_plans(db)
+    db.close()
+
+    for name, sql, plan in violations:
+        print(f"\n[SCAN] {name}")
+        print(sql.strip())
+        for detail in plan:
+            print(f"    {detail}")
+
+    if violations:
+        print(f"\nЗапросов с полным перебором: {len(violations)}")
+        return 1
+
+    print(f"Все горячие запросы ({len(HOT_QUERIES)}) используют индексы")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,310 +1,1092 @@
-import pandas as pd
-from datetime import datetime, date
-from typing import Dict, List, Any
-from database import GHUDatabase
-
-class GHUReports:
-    """Класс для генерации отчетов"""
-    
-    def __init__(self, db: GHUDatabase):
-        self.db = db
-    
-    def generate_payments_report(self, filters: Dict = None, sort_by: str = "period", ascending: bool = True):
-        """
-        Отчет 1: Платежи по услугам
-        """
-        conn = self.db.connect()
-        
-        # Базовый запрос
-        query = """
-        SELECT 
-            p.period as Период,
-            b.address as Адрес_дома,
-            a.number as Квартира,
-            r.full_name as Жилец,
-            s.name as Услуга,
-            a.area as Площадь,
-            s.price as Тариф,
-            p.amount as Сумма,
-            CASE WHEN p.is_paid THEN 'Оплачено' ELSE 'Не оплачено' END as Статус,
-            p.payment_date as Дата_оплаты
-        FROM payments p
-        JOIN apartments a ON p.apartment_id = a.id
-        JOIN buildings b ON a.building_id = b.id
-        JOIN residents r ON a.id = r.apartment_id AND r.is_owner = 1
-        JOIN services s ON p.service_id = s.id
-        WHERE 1=1
-        """
-        
-        params = []
-        
-        if filters:
-            if 'period' in filters and filters['period']:
-                query += " AND p.period LIKE ?"
-                params.append(f'%{filters["period"]}%')
-            
-            if 'address' in filters and filters['address']:
-                query += " AND b.address LIKE ?"
-                params.append(f'%{filters["address"]}%')
-            
-            if 'status' in filters and filters['status']:
-                if filters['status'] == 'paid':
-                    query += " AND p.is_paid = 1"
-                elif filters['status'] == 'unpaid':
-                    query += " AND p.is_paid = 0"
-            
-            if 'min_amount' in filters and filters['min_amount']:
-                try:
-                    query += " AND p.amount >= ?"
-                    params.append(float(filters['min_amount']))
-                except:
-                    pass
-        
-        # Сортировка
-        sort_mapping = {
-            'period': 'p.period',
-            'address': 'b.address',
-            'amount': 'p.amount',
-            'status': 'p.is_paid'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'p.period')
-        order = "ASC" if ascending else "DESC"
-        query += f" ORDER BY {sort_field} {order}"
-        
-        # Выполняем запрос
-        try:
-            df = pd.read_sql_query(query, conn, params=params)
-        except Exception as e:
-            print(f"Ошибка SQL: {e}")
-            return pd.DataFrame(), pd.DataFrame(), {}
-        
-        if not df.empty:
-            # Вычисляем дополнительные поля
-            df['Сумма_с_НДС'] = df['Сумма'] * 1.2
-            df['Площадь_на_человека'] = df.apply(
-                lambda row: f"{row['Площадь']:.1f} м²", axis=1
-            )
-            
-            # Группировка по адресу
-            grouped = df.groupby('Адрес_дома').agg({
-                'Сумма': 'sum',
-                'Квартира': 'count',
-                'Площадь': 'sum'
-            }).round(2)
-            
-            grouped = grouped.rename(columns={
-                'Сумма': 'Итого_по_дому',
-                'Квартира': 'Кол-во_квартир',
-                'Площадь': 'Общая_площадь'
-            })
-            
-            # Итоги
-            totals = {
-                'Всего_сумма': df['Сумма'].sum(),
-                'Средний_чек': df['Сумма'].mean(),
-                'Кол-во_платежей': len(df),
-                'Процент_оплаты': (df['Статус'] == 'Оплачено').mean() * 100
-            }
-            
-            return df, grouped, totals
-        
-        return pd.DataFrame(), pd.DataFrame(), {}
-    
-    def generate_debts_report(self, filters: Dict = None, sort_by: str = "amount", ascending: bool = False):
-        """
-        Отчет 2: Задолженности по квартирам
-        """
-        conn = self.db.connect()
-        
-        query = """
-        SELECT 
-            b.address as Адрес,
-            a.number as Квартира,
-            r.full_name as Должник,
-            COUNT(p.id) as Месяцев_задолженности,
-            SUM(p.amount) as Общая_задолженность,
-            MAX(p.period) as Последний_период,
-            a.area as Площадь,
-            r.phone as Телефон
-        FROM payments p
-        JOIN apartments a ON p.apartment_id = a.id
-        JOIN buildings b ON a.building_id = b.id
-        JOIN residents r ON a.id = r.apartment_id AND r.is_owner = 1
-        WHERE p.is_paid = 0
-        GROUP BY a.id, r.full_name
-        HAVING SUM(p.amount) > 0
-        """
-        
-        params = []
-        
-        if filters:
-            if 'address' in filters and filters['address']:
-                query += " AND b.address LIKE ?"
-                params.append(f'%{filters["address"]}%')
-            
-            if 'min_debt' in filters and filters['min_debt']:
-                try:
-                    query += " HAVING SUM(p.amount) >= ?"
-                    params.append(float(filters['min_debt']))
-                except:
-                    pass
-        
-        # Сортировка
-        sort_mapping = {
-            'amount': 'SUM(p.amount)',
-            'period': 'MAX(p.period)',
-            'address': 'b.address',
-            'months': 'COUNT(p.id)'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'SUM(p.amount)')
-        order = "DESC" if not ascending else "ASC"
-        query += f" ORDER BY {sort_field} {order}"
-        
-        try:
-            df = pd.read_sql_query(query, conn, params=params)
-        except Exception as e:
-            print(f"Ошибка SQL: {e}")
-            return pd.DataFrame(), pd.DataFrame(), {}
-        
-        if not df.empty:
-            # Вычисляемые поля
-            df['Долг_за_м2'] = df['Общая_задолженность'] / df['Площадь']
-            df['Стаж_задолженности'] = df['Месяцев_задолженности'].apply(
-                lambda x: f"{x} мес." if x < 12 else f"{x//12} г. {x%12} мес."
-            )
-            
-            # Группировка по адресу
-            grouped = df.groupby('Адрес').agg({
-                'Общая_задолженность': 'sum',
-                'Квартира': 'count',
-                'Месяцев_задолженности': 'mean'
-            }).round(2)
-            
-            grouped = grouped.rename(columns={
-                'Общая_задолженность': 'Сумма_долга_по_дому',
-                'Квартира': 'Кол-во_должников',
-                'Месяцев_задолженности': 'Средний_стаж_долга'
-            })
-            
-            # Итоги
-            totals = {
-                'Общий_долг': df['Общая_задолженность'].sum(),
-                'Средний_долг': df['Общая_задолженность'].mean(),
-                'Всего_должников': len(df),
-                'Самый_большой_долг': df['Общая_задолженность'].max()
-            }
-            
-            return df, grouped, totals
-        
-        return pd.DataFrame(), pd.DataFrame(), {}
-    
-    def generate_electoral_register(self, filters: Dict = None, sort_by: str = "birth_date", ascending: bool = True):
-        """
-        Отчет 3: Избирательные списки
-        """
-        conn = self.db.connect()
-        
-        query = """
-        SELECT 
-            b.address as Адрес,
-            a.number as Квартира,
-            r.full_name as ФИО,
-            r.birth_date as Дата_рождения,
-            (strftime('%Y', 'now') - strftime('%Y', r.birth_date)) as Возраст,
-            r.passport as Паспорт,
-            r.registration_date as Дата_регистрации
-        FROM residents r
-        JOIN apartments a ON r.apartment_id = a.id
-        JOIN buildings b ON a.building_id = b.id
-        WHERE (strftime('%Y', 'now') - strftime('%Y', r.birth_date)) >= 18
-        """
-        
-        params = []
-        
-        if filters:
-            if 'address' in filters and filters['address']:
-                query += " AND b.address LIKE ?"
-                params.append(f'%{filters["address"]}%')
-            
-            if 'min_age' in filters and filters['min_age']:
-                try:
-                    min_age = int(filters['min_age'])
-                    query += " AND (strftime('%Y', 'now') - strftime('%Y', r.birth_date)) >= ?"
-                    params.append(min_age)
-                except:
-                    pass
-            
-            if 'max_age' in filters and filters['max_age']:
-                try:
-                    max_age = int(filters['max_age'])
-                    query += " AND (strftime('%Y', 'now') - strftime('%Y', r.birth_date)) <= ?"
-                    params.append(max_age)
-                except:
-                    pass
-        
-        # Сортировка
-        sort_mapping = {
-            'birth_date': 'r.birth_date',
-            'age': 'strftime("%Y", "now") - strftime("%Y", r.birth_date)',
-            'address': 'b.address'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'r.birth_date')
-        order = "ASC" if ascending else "DESC"
-        query += f" ORDER BY {sort_field} {order}"
-        
-        try:
-            df = pd.read_sql_query(query, conn, params=params)
-        except Exception as e:
-            print(f"Ошибка SQL: {e}")
-            return pd.DataFrame(), pd.DataFrame(), {}
-        
-        if not df.empty:
-            # Вычисляем точный возраст
-            def calculate_age(birth_date_str):
-                try:
-                    birth_date = datetime.strptime(birth_date_str, '%Y-%m-%d').date()
-                    today = date.today()
-                    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-                except:
-                    return 0
-            
-            df['Возраст_лет'] = df['Дата_рождения'].apply(calculate_age)
-            
-            # Возрастные группы
-            def get_age_group(age):
-                if age < 30:
-                    return "18-29 лет"
-                elif age < 45:
-                    return "30-44 года"
-                elif age < 60:
-                    return "45-59 лет"
-                else:
-                    return "60+ лет"
-            
-            df['Возрастная_группа'] = df['Возраст_лет'].apply(get_age_group)
-            
-            # Группировка
-            grouped = df.groupby(['Адрес', 'Возрастная_группа']).agg({
-                'ФИО': 'count',
-                'Возраст_лет': 'mean'
-            }).round(1)
-            
-            grouped = grouped.rename(columns={
-                'ФИО': 'Количество',
-                'Возраст_лет': 'Средний_возраст'
-            })
-            
-            # Итоги
-            totals = {
-                'Всего_избирателей': len(df),
-                'Средний_возраст': df['Возраст_лет'].mean(),
-                'Самый_старший': df['Возраст_лет'].max(),
-                'Самый_молодой': df['Возраст_лет'].min()
-            }
-            
-            return df, grouped, totals
-        
-        return pd.DataFrame(), pd.DataFrame(), {}
+import contextlib
+import functools
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from datetime import datetime, date
+from typing import Dict, List, Callable, Optional
+from columnar import (ParquetSink, REPORT_COLUMN_KINDS, REPORT_PERIOD_COLUMNS, arrow_schema,
+                      frame_column_kinds, frame_to_table)
+from database import GHUDatabase, MemoryReplica, EXPORT_BATCH_SIZE, open_export
+
+# Типы отчетов GHUReports.generate
+REPORT_TYPES = ['payments', 'debts', 'electoral']
+
+# Сортировка детальных строк отчетов по умолчанию: (поле, по возрастанию).
+# Общая для generate (через cached_report) и потоковых выгрузок
+REPORT_SORT_DEFAULTS = {
+    'payments': ('period', True),
+    'debts': ('amount', False),
+    'electoral': ('birth_date', True)
+}
+
+# Возрастные группы избирательных списков: (верхняя граница возраста, не включая ее; название)
+AGE_GROUPS = [
+    (30, "18-29 лет"),
+    (45, "30-44 года"),
+    (60, "45-59 лет")
+]
+OLDEST_AGE_GROUP = "60+ лет"
+
+# Возраст, с которого жилец включается в избирательные списки
+ADULT_AGE = 18
+
+
+def report_sort(report_type: str, sort_by: Optional[str], ascending: Optional[bool]) -> tuple:
+    """Поле и направление сортировки отчета; None заменяется значением по умолчанию отчета"""
+    default_sort, default_ascending = REPORT_SORT_DEFAULTS[report_type]
+    return (default_sort if sort_by is None else sort_by,
+            default_ascending if ascending is None else ascending)
+
+
+def years_before(day: date, years: int) -> date:
+    """Та же календарная дата years лет назад; 29 февраля в невисокосном году - 28 февраля"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def format_distinct(values: pd.Series, formatter: Callable) -> np.ndarray:
+    """
+    Форматирование столбца с повторяющимися значениями (площадь квартиры, стаж долга):
+    formatter вызывается один раз на различное значение, строки раскладываются по кодам.
+    Пропуски дают None.
+    """
+    codes, uniques = pd.factorize(values)
+    labels = np.array([formatter(value) for value in uniques] + [None], dtype=object)
+    return labels[codes]
+
+
+class ReportCache:
+    """
+    LRU-кэш результатов отчетов (df, grouped, totals).
+    Каждая запись хранит версию данных базы, на которой она получена; при
+    несовпадении с текущей версией запись считается устаревшей и удаляется.
+    Результаты из кэша возвращаются без копирования и не должны изменяться.
+    """
+    
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(report_type: str, filters: Dict, sort_by: str, ascending: bool, details: bool = True) -> tuple:
+        """Ключ кэша: тип отчета, нормализованные фильтры, сортировка и режим детальных строк"""
+        normalized = tuple(sorted(
+            (key, str(value).strip()) for key, value in (filters or {}).items()
+            if value not in ['', None]
+        ))
+        return report_type, normalized, sort_by, bool(ascending), bool(details)
+    
+    def get(self, key: tuple, version: tuple):
+        """Результат из кэша или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            entry_version, value = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: tuple, version: tuple, value):
+        """Сохранение результата с вытеснением давно не использованных записей"""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Статистика попаданий и промахов"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / requests if requests else 0.0
+            }
+
+
+class ChunkedSummary:
+    """
+    Группировка и итоги, накапливаемые по порциям детальных строк отчета.
+    Агрегаты задаются как {имя: (столбец, функция)}; функции: sum, count (непустые
+    значения), size (строки), mean, min, max. По группам хранятся частичные суммы,
+    количества и экстремумы; среднее вычисляется в конце как сумма / количество,
+    поэтому результат не зависит от разбиения на порции.
+    """
+    
+    # Как объединяются частичные агрегаты разных порций
+    MERGE = {'sum': 'sum', 'count': 'sum', 'size': 'sum', 'min': 'min', 'max': 'max'}
+    
+    def __init__(self, keys: List[str], grouped: Dict[str, tuple], totals: Dict[str, tuple]):
+        self.keys = keys
+        self.grouped = grouped
+        self.totals = totals
+        self._groups = None
+        self._totals = None
+    
+    def add(self, chunk: pd.DataFrame):
+        """Учет порции строк"""
+        by = [chunk[key] for key in self.keys]
+        self._groups = self._merge(self._groups, self._partial(chunk, by, self.grouped))
+        self._totals = self._merge(self._totals, self._partial(chunk, np.zeros(len(chunk), dtype=int), self.totals))
+    
+    def result(self) -> tuple:
+        """(DataFrame групп с индексом keys, словарь итогов); без строк - пустые"""
+        if self._groups is None:
+            return pd.DataFrame(), {}
+        grouped = self._finish(self._groups, self.grouped).sort_index()
+        totals = self._finish(self._totals, self.totals)
+        return grouped, {name: totals[name].iloc[0] for name in totals.columns}
+    
+    @staticmethod
+    def _partial(chunk: pd.DataFrame, by, spec: Dict[str, tuple]) -> pd.DataFrame:
+        """Частичные агрегаты порции; столбец может быть функцией от порции"""
+        parts = {}
+        for name, (column, function) in spec.items():
+            if function == 'size':
+                parts[f"{name}:size"] = chunk.groupby(by).size()
+                continue
+            values = (column(chunk) if callable(column) else chunk[column]).groupby(by)
+            for part in (('sum', 'count') if function == 'mean' else (function,)):
+                parts[f"{name}:{part}"] = values.agg(part)
+        return pd.DataFrame(parts)
+    
+    @classmethod
+    def _merge(cls, state: pd.DataFrame, partial: pd.DataFrame) -> pd.DataFrame:
+        if state is None:
+            return partial
+        combined = pd.concat([state, partial])
+        levels = list(range(combined.index.nlevels))
+        return combined.groupby(level=levels).agg({
+            column: cls.MERGE[column.rsplit(':', 1)[1]] for column in combined.columns
+        })
+    
+    @staticmethod
+    def _finish(state: pd.DataFrame, spec: Dict[str, tuple]) -> pd.DataFrame:
+        result = pd.DataFrame(index=state.index)
+        for name, (_, function) in spec.items():
+            if function == 'mean':
+                result[name] = state[f"{name}:sum"] / state[f"{name}:count"]
+            else:
+                result[name] = state[f"{name}:{function}"]
+        return result
+
+
+# Группировка и итоги детальных строк в потоковом режиме (generate_chunked), как в
+# generate: (ключи группировки, агрегаты групп, агрегаты итогов, знаков округления групп)
+CHUNKED_SUMMARIES = {
+    'payments': (
+        ['Адрес_дома'],
+        {
+            'Итого_по_дому': ('Сумма', 'sum'),
+            'Кол-во_квартир': ('Квартира', 'count'),
+            'Общая_площадь': ('Площадь', 'sum')
+        },
+        {
+            'Всего_сумма': ('Сумма', 'sum'),
+            'Средний_чек': ('Сумма', 'mean'),
+            'Кол-во_платежей': (None, 'size'),
+            # Доля оплаченных в процентах - среднее по строкам от 100 (оплачено) и 0
+            'Процент_оплаты': (lambda chunk: (chunk['Статус'] == 'Оплачено') * 100, 'mean')
+        },
+        2
+    ),
+    'debts': (
+        ['Адрес'],
+        {
+            'Сумма_долга_по_дому': ('Общая_задолженность', 'sum'),
+            'Кол-во_должников': ('Квартира', 'count'),
+            'Средний_стаж_долга': ('Месяцев_задолженности', 'mean')
+        },
+        {
+            'Общий_долг': ('Общая_задолженность', 'sum'),
+            'Средний_долг': ('Общая_задолженность', 'mean'),
+            'Всего_должников': (None, 'size'),
+            'Самый_большой_долг': ('Общая_задолженность', 'max')
+        },
+        2
+    ),
+    'electoral': (
+        ['Адрес', 'Возрастная_группа'],
+        {
+            'Количество': ('ФИО', 'count'),
+            'Средний_возраст': ('Возраст_лет', 'mean')
+        },
+        {
+            'Всего_избирателей': (None, 'size'),
+            'Средний_возраст': ('Возраст_лет', 'mean'),
+            'Самый_старший': ('Возраст_лет', 'max'),
+            'Самый_молодой': ('Возраст_лет', 'min')
+        },
+        1
+    )
+}
+
+
+# Отчеты, результат которых зависит от текущей даты (возраст на дату отчета, по умолчанию сегодня)
+DATE_RELATIVE_REPORTS = {'electoral'}
+
+
+def cached_report(report_type: str):
+    """Кэширование результата метода отчета в ReportCache экземпляра GHUReports"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, filters: Dict = None, sort_by: str = None, ascending: bool = None, details: bool = True):
+            sort_by, ascending = report_sort(report_type, sort_by, ascending)
+            if report_type in DATE_RELATIVE_REPORTS:
+                # Дата отчета фиксируется и входит в ключ кэша: после полуночи результат
+                # «на сегодня» пересчитывается, а отчет формируется на ту же дату, что в ключе
+                filters = dict(filters or {}, report_date=self._report_date(filters).isoformat())
+            
+            # Версия берется до выполнения запроса: изменения во время формирования
+            # отчета сделают запись устаревшей при следующем обращении
+            version = self.data_version()
+            if self.cache is None:
+                return method(self, filters, sort_by, ascending, details)
+            
+            key = ReportCache.make_key(report_type, filters, sort_by, ascending, details)
+            result = self.cache.get(key, version)
+            if result is None:
+                result = method(self, filters, sort_by, ascending, details)
+                # Пустой результат не кэшируется; при ошибке или отмене запрос завершается исключением
+                if not result[0].empty or result[2]:
+                    self.cache.put(key, version, result)
+            return result
+        return wrapper
+    return decorator
+
+
+class GHUReports:
+    """Класс для генерации отчетов"""
+    
+    def __init__(self, db: GHUDatabase, conn=None, cache: ReportCache = None, replica: MemoryReplica = None):
+        self.db = db
+        # Собственное соединение отчетов (например, в фоновом потоке); по умолчанию общее соединение базы
+        self.conn = conn
+        self.cache = cache if cache is not None else ReportCache()
+        # Копия базы в памяти: запросы отчетов не обращаются к рабочему файлу
+        self.replica = replica
+    
+    def connect(self):
+        """Соединение, на котором выполняются запросы отчетов"""
+        if self.conn is not None:
+            return self.conn
+        if self.replica is not None:
+            return self.replica.connect()
+        return self.db.connect()
+    
+    def data_version(self) -> tuple:
+        """
+        Версия данных, по которым формируются отчеты. При работе по копии в памяти
+        копия сначала обновляется, если база изменилась, и соединение потока
+        переходит на нее; версия - та, с которой снята копия.
+        """
+        if self.replica is None:
+            return self.db.change_version()
+        if self.conn is None:
+            self.replica.refresh()
+            return self.replica.connect(latest=True).replica_version
+        return getattr(self.conn, 'replica_version', None) or self.db.change_version()
+    
+    def generate(self, report_type: str, filters: Dict = None, sort_by: str = None, ascending: bool = None,
+                 details: bool = True):
+        """
+        Формирование отчета по его типу: payments, debts или electoral.
+        При details=False детальные строки не читаются: группировка и итоги
+        вычисляются в SQLite, вместо таблицы данных возвращается пустой DataFrame.
+        """
+        kwargs = {}
+        if sort_by is not None:
+            kwargs['sort_by'] = sort_by
+        if ascending is not None:
+            kwargs['ascending'] = ascending
+        return self._generator(report_type)(filters, details=details, **kwargs)
+    
+    def _generator(self, report_type: str) -> Callable:
+        generators = {
+            'payments': self.generate_payments_report,
+            'debts': self.generate_debts_report,
+            'electoral': self.generate_electoral_register
+        }
+        if report_type not in generators:
+            raise ValueError(f"Неизвестный тип отчета: {report_type}")
+        return generators[report_type]
+    
+    def cache_stats(self) -> Dict:
+        """Статистика кэша результатов отчетов"""
+        return self.cache.stats() if self.cache is not None else {}
+    
+    @staticmethod
+    def _summary_result(summary: Callable, filters: Dict) -> tuple:
+        """
+        Результат отчета без детальных строк в обычном формате (df, grouped, totals).
+        Ошибка запроса не превращается в пустой отчет: ее обрабатывает вызывающий
+        (код завершения cli.py, ответ 500 в api.py, сообщение ReportJob в интерфейсе).
+        """
+        grouped, totals = summary(filters)
+        return pd.DataFrame(), grouped, totals
+    
+    def _summarize(self, source: str, params: List, keys: List[str], aggregates: Dict[str, tuple]) -> tuple:
+        """
+        Группировка строк выборки source по ключам keys и итоговая строка одним запросом.
+        aggregates: {имя: (агрегат по группе, агрегат итога по группам)}; итог
+        собирается из уже вычисленных групп, как GROUP BY ... WITH ROLLUP.
+        Возвращает (DataFrame групп с индексом keys, Series итогов) или None, если строк нет.
+        """
+        key_list = ', '.join(keys)
+        group_columns = ', '.join(f'{group} AS {name}' for name, (group, _) in aggregates.items())
+        total_columns = ', '.join(f'{total} AS {name}' for name, (_, total) in aggregates.items())
+        query = f"""
+        WITH groups AS MATERIALIZED (
+            SELECT {key_list}, {group_columns}
+            FROM ({source})
+            GROUP BY {key_list}
+        )
+        SELECT 0 AS is_total, * FROM groups
+        UNION ALL
+        SELECT 1, {', '.join('NULL' for _ in keys)}, {total_columns} FROM groups
+        """
+        
+        frame = pd.read_sql_query(query, self.connect(), params=params)
+        groups = frame[frame['is_total'] == 0]
+        if groups.empty:
+            return None
+        
+        totals = frame[frame['is_total'] == 1].iloc[0].drop(['is_total'] + keys)
+        return groups.drop(columns='is_total').set_index(keys).sort_index(), totals
+    
+    @cached_report('payments')
+    def generate_payments_report(self, filters: Dict = None, sort_by: str = None, ascending: bool = None,
+                                 details: bool = True):
+        """
+        Отчет 1: Платежи по услугам
+        """
+        if not details:
+            return self._summary_result(self._payments_summary, filters)
+        
+        conn = self.connect()
+        query, params = self._payments_query(filters, sort_by, ascending)
+        
+        # Выполняем запрос; ошибка SQL передается вызывающему, как и в _summary_result
+        df = pd.read_sql_query(query, conn, params=params)
+        
+        if not df.empty:
+            # Вычисляем дополнительные поля
+            df = self._add_payments_columns(df)
+            
+            # Группировка по адресу
+            grouped = df.groupby('Адрес_дома').agg({
+                'Сумма': 'sum',
+                'Квартира': 'count',
+                'Площадь': 'sum'
+            }).round(2)
+            
+            grouped = grouped.rename(columns={
+                'Сумма': 'Итого_по_дому',
+                'Квартира': 'Кол-во_квартир',
+                'Площадь': 'Общая_площадь'
+            })
+            
+            # Итоги
+            totals = {
+                'Всего_сумма': df['Сумма'].sum(),
+                'Средний_чек': df['Сумма'].mean(),
+                'Кол-во_платежей': len(df),
+                'Процент_оплаты': (df['Статус'] == 'Оплачено').mean() * 100
+            }
+            
+            return df, grouped, totals
+        
+        return pd.DataFrame(), pd.DataFrame(), {}
+    
+    def _payments_query(self, filters: Dict, sort_by: str, ascending: bool) -> tuple:
+        """SQL-запрос детальных строк отчета по платежам"""
+        query, params = self._payments_source(filters)
+        return query + self._payments_order(sort_by, ascending), params
+    
+    def _payments_source(self, filters: Dict) -> tuple:
+        """
+        Строки отчета по платежам с условиями фильтров, без сортировки.
+        Архивы платежей подключаются, если фильтр периода их затрагивает или не задан.
+        """
+        payments = self.db.payments_source(self.connect(), (filters or {}).get('period'))
+        
+        # Базовый запрос
+        query = f"""
+        SELECT 
+            p.period as Период,
+            b.address as Адрес_дома,
+            a.number as Квартира,
+            r.full_name as Жилец,
+            s.name as Услуга,
+            a.area as Площадь,
+            s.price as Тариф,
+            p.amount as Сумма,
+            CASE WHEN p.is_paid THEN 'Оплачено' ELSE 'Не оплачено' END as Статус,
+            p.payment_date as Дата_оплаты
+        FROM {payments} p
+        JOIN apartments a ON p.apartment_id = a.id
+        JOIN buildings b ON a.building_id = b.id
+        JOIN residents r ON a.id = r.apartment_id AND r.is_owner = 1
+        JOIN services s ON p.service_id = s.id
+        WHERE 1=1
+        """
+        
+        params = []
+        
+        if filters:
+            if 'period' in filters and filters['period']:
+                query += " AND p.period LIKE ?"
+                params.append(f'%{filters["period"]}%')
+            
+            if 'address' in filters and filters['address']:
+                condition, condition_params = self.db.text_condition('buildings', 'address', filters['address'], 'b')
+                query += f" AND {condition}"
+                params.extend(condition_params)
+            
+            if 'status' in filters and filters['status']:
+                if filters['status'] == 'paid':
+                    query += " AND p.is_paid = 1"
+                elif filters['status'] == 'unpaid':
+                    query += " AND p.is_paid = 0"
+            
+            if 'min_amount' in filters and filters['min_amount']:
+                try:
+                    min_amount = float(filters['min_amount'])
+                    query += " AND p.amount >= ?"
+                    params.append(min_amount)
+                except (TypeError, ValueError):
+                    pass
+        
+        return query, params
+    
+    def _payments_order(self, sort_by: str, ascending: bool) -> str:
+        """Раздел ORDER BY детальных строк"""
+        sort_mapping = {
+            'period': 'p.period',
+            'address': 'b.address',
+            'amount': 'p.amount',
+            'status': 'p.is_paid'
+        }
+        
+        sort_field = sort_mapping.get(sort_by, 'p.period')
+        order = "ASC" if ascending else "DESC"
+        return f" ORDER BY {sort_field} {order}"
+    
+    @staticmethod
+    def _add_payments_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Вычисляемые поля отчета по платежам"""
+        df['Сумма_с_НДС'] = df['Сумма'] * 1.2
+        df['Площадь_на_человека'] = format_distinct(df['Площадь'], lambda x: f"{x:.1f} м²")
+        return df
+    
+    def _payments_summary(self, filters: Dict) -> tuple:
+        """Группировка по домам и итоги отчета по платежам, вычисленные в SQL"""
+        source, params = self._payments_source(filters)
+        summary = self._summarize(source, params, ['Адрес_дома'], {
+            'Итого_по_дому': ('SUM(Сумма)', 'SUM(Итого_по_дому)'),
+            '"Кол-во_квартир"': ('COUNT(Квартира)', 'SUM("Кол-во_квартир")'),
+            'Общая_площадь': ('SUM(Площадь)', 'NULL'),
+            'Оплачено': ("SUM(Статус = 'Оплачено')", 'SUM(Оплачено)')
+        })
+        if summary is None:
+            return pd.DataFrame(), {}
+        
+        groups, total = summary
+        grouped = groups[['Итого_по_дому', 'Кол-во_квартир', 'Общая_площадь']].round(2)
+        count = int(total['Кол-во_квартир'])
+        totals = {
+            'Всего_сумма': float(total['Итого_по_дому']),
+            'Средний_чек': float(total['Итого_по_дому']) / count,
+            'Кол-во_платежей': count,
+            'Процент_оплаты': float(total['Оплачено']) / count * 100
+        }
+        return grouped, totals
+    
+    @cached_report('debts')
+    def generate_debts_report(self, filters: Dict = None, sort_by: str = None, ascending: bool = None,
+                              details: bool = True):
+        """
+        Отчет 2: Задолженности по квартирам
+        """
+        if not details:
+            return self._summary_result(self._debts_summary, filters)
+        
+        conn = self.connect()
+        query, params = self._debts_query(filters, sort_by, ascending)
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        
+        if not df.empty:
+            # Вычисляемые поля
+            df = self._add_debts_columns(df)
+            
+            # Группировка по адресу
+            grouped = df.groupby('Адрес').agg({
+                'Общая_задолженность': 'sum',
+                'Квартира': 'count',
+                'Месяцев_задолженности': 'mean'
+            }).round(2)
+            
+            grouped = grouped.rename(columns={
+                'Общая_задолженность': 'Сумма_долга_по_дому',
+                'Квартира': 'Кол-во_должников',
+                'Месяцев_задолженности': 'Средний_стаж_долга'
+            })
+            
+            # Итоги
+            totals = {
+                'Общий_долг': df['Общая_задолженность'].sum(),
+                'Средний_долг': df['Общая_задолженность'].mean(),
+                'Всего_должников': len(df),
+                'Самый_большой_долг': df['Общая_задолженность'].max()
+            }
+            
+            return df, grouped, totals
+        
+        return pd.DataFrame(), pd.DataFrame(), {}
+    
+    def _debts_query(self, filters: Dict, sort_by: str, ascending: bool) -> tuple:
+        """SQL-запрос детальных строк отчета по задолженностям (по сводке apartment_debt)"""
+        query, params = self._debts_source(filters)
+        return query + self._debts_order(sort_by, ascending), params
+    
+    def _debts_source(self, filters: Dict) -> tuple:
+        """Строки отчета по задолженностям с условиями фильтров, без сортировки"""
+        # CROSS JOIN фиксирует порядок соединений: сводка (не больше строки на квартиру)
+        # читается первой, остальные таблицы - по первичным ключам и индексу жильцов
+        query = """
+        SELECT 
+            b.address as Адрес,
+            a.number as Квартира,
+            r.full_name as Должник,
+            d.unpaid_count as Месяцев_задолженности,
+            ROUND(d.unpaid_sum, 2) as Общая_задолженность,
+            d.last_period as Последний_период,
+            a.area as Площадь,
+            r.phone as Телефон
+        FROM apartment_debt d
+        CROSS JOIN apartments a ON d.apartment_id = a.id
+        CROSS JOIN buildings b ON a.building_id = b.id
+        CROSS JOIN residents r ON a.id = r.apartment_id AND r.is_owner = 1
+        WHERE ROUND(d.unpaid_sum, 2) > 0
+        """
+        
+        params = []
+        
+        if filters:
+            if 'address' in filters and filters['address']:
+                condition, condition_params = self.db.text_condition('buildings', 'address', filters['address'], 'b')
+                query += f" AND {condition}"
+                params.extend(condition_params)
+            
+            if 'min_debt' in filters and filters['min_debt']:
+                try:
+                    min_debt = float(filters['min_debt'])
+                    query += " AND ROUND(d.unpaid_sum, 2) >= ?"
+                    params.append(min_debt)
+                except (TypeError, ValueError):
+                    pass
+        
+        return query, params
+    
+    def _debts_order(self, sort_by: str, ascending: bool) -> str:
+        # Сортировка
+        sort_mapping = {
+            'amount': 'd.unpaid_sum',
+            'period': 'd.last_period',
+            'address': 'b.address',
+            'months': 'd.unpaid_count'
+        }
+        
+        sort_field = sort_mapping.get(sort_by, 'd.unpaid_sum')
+        order = "DESC" if not ascending else "ASC"
+        return f" ORDER BY {sort_field} {order}"
+    
+    @staticmethod
+    def _add_debts_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Вычисляемые поля отчета по задолженностям"""
+        df['Долг_за_м2'] = df['Общая_задолженность'] / df['Площадь']
+        df['Стаж_задолженности'] = format_distinct(
+            df['Месяцев_задолженности'],
+            lambda x: f"{x} мес." if x < 12 else f"{x//12} г. {x%12} мес."
+        )
+        return df
+    
+    def _debts_summary(self, filters: Dict) -> tuple:
+        """Группировка по домам и итоги отчета по задолженностям, вычисленные в SQL"""
+        source, params = self._debts_source(filters)
+        summary = self._summarize(source, params, ['Адрес'], {
+            'Сумма_долга_по_дому': ('SUM(Общая_задолженность)', 'SUM(Сумма_долга_по_дому)'),
+            '"Кол-во_должников"': ('COUNT(Квартира)', 'SUM("Кол-во_должников")'),
+            'Средний_стаж_долга': ('AVG(Месяцев_задолженности)', 'NULL'),
+            'Самый_большой_долг': ('MAX(Общая_задолженность)', 'MAX(Самый_большой_долг)')
+        })
+        if summary is None:
+            return pd.DataFrame(), {}
+        
+        groups, total = summary
+        grouped = groups[['Сумма_долга_по_дому', 'Кол-во_должников', 'Средний_стаж_долга']].round(2)
+        count = int(total['Кол-во_должников'])
+        totals = {
+            'Общий_долг': float(total['Сумма_долга_по_дому']),
+            'Средний_долг': float(total['Сумма_долга_по_дому']) / count,
+            'Всего_должников': count,
+            'Самый_большой_долг': float(total['Самый_большой_долг'])
+        }
+        return grouped, totals
+    
+    @cached_report('electoral')
+    def generate_electoral_register(self, filters: Dict = None, sort_by: str = None, ascending: bool = None,
+                                    details: bool = True):
+        """
+        Отчет 3: Избирательные списки
+        """
+        if not details:
+            return self._summary_result(self._electoral_summary, filters)
+        
+        conn = self.connect()
+        query, params = self._electoral_query(filters, sort_by, ascending)
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        
+        if not df.empty:
+            # Точный возраст и возрастные группы
+            df = self._add_electoral_columns(df, self._report_date(filters))
+            
+            # Группировка
+            grouped = df.groupby(['Адрес', 'Возрастная_группа']).agg({
+                'ФИО': 'count',
+                'Возраст_лет': 'mean'
+            }).round(1)
+            
+            grouped = grouped.rename(columns={
+                'ФИО': 'Количество',
+                'Возраст_лет': 'Средний_возраст'
+            })
+            
+            # Итоги
+            totals = {
+                'Всего_избирателей': len(df),
+                'Средний_возраст': df['Возраст_лет'].mean(),
+                'Самый_старший': df['Возраст_лет'].max(),
+                'Самый_молодой': df['Возраст_лет'].min()
+            }
+            
+            return df, grouped, totals
+        
+        return pd.DataFrame(), pd.DataFrame(), {}
+    
+    def _electoral_query(self, filters: Dict, sort_by: str, ascending: bool) -> tuple:
+        """SQL-запрос детальных строк избирательных списков"""
+        query, params = self._electoral_source(filters)
+        return query + self._electoral_order(sort_by, ascending), params
+    
+    def _electoral_source(self, filters: Dict) -> tuple:
+        """
+        Строки избирательных списков с условиями фильтров, без сортировки.
+        Границы возраста на дату отчета переводятся в диапазон дат рождения,
+        поэтому отбор идет по индексу idx_residents_birth_date.
+        """
+        report_date = self._report_date(filters)
+        min_age = ADULT_AGE
+        
+        if filters and 'min_age' in filters and filters['min_age']:
+            try:
+                min_age = max(min_age, int(filters['min_age']))
+            except (TypeError, ValueError):
+                pass
+        
+        # Возраст не меньше min_age: родился не позже той же даты min_age лет назад
+        query = """
+        SELECT 
+            b.address as Адрес,
+            a.number as Квартира,
+            r.full_name as ФИО,
+            r.birth_date as Дата_рождения,
+            r.passport as Паспорт,
+            r.registration_date as Дата_регистрации
+        FROM residents r
+        JOIN apartments a ON r.apartment_id = a.id
+        JOIN buildings b ON a.building_id = b.id
+        WHERE r.birth_date <= ?
+        """
+        
+        params = [years_before(report_date, min_age).isoformat()]
+        
+        if filters:
+            if 'address' in filters and filters['address']:
+                condition, condition_params = self.db.text_condition('buildings', 'address', filters['address'], 'b')
+                query += f" AND {condition}"
+                params.extend(condition_params)
+            
+            # Возраст не больше max_age: родился позже той же даты max_age + 1 лет назад
+            if 'max_age' in filters and filters['max_age']:
+                try:
+                    born_after = years_before(report_date, int(filters['max_age']) + 1).isoformat()
+                    query += " AND r.birth_date > ?"
+                    params.append(born_after)
+                except (TypeError, ValueError):
+                    pass
+        
+        return query, params
+    
+    @staticmethod
+    def _report_date(filters: Dict) -> date:
+        """Дата, на которую считается возраст (filters['report_date'], по умолчанию сегодня)"""
+        value = (filters or {}).get('report_date')
+        if not value:
+            return date.today()
+        try:
+            return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Некорректная дата отчета: {value}")
+    
+    def _electoral_order(self, sort_by: str, ascending: bool) -> str:
+        # Сортировка
+        sort_mapping = {
+            'birth_date': 'r.birth_date',
+            'age': 'r.birth_date',
+            'address': 'b.address'
+        }
+        
+        # Чем позже дата рождения, тем меньше возраст
+        if sort_by == 'age':
+            ascending = not ascending
+        
+        sort_field = sort_mapping.get(sort_by, 'r.birth_date')
+        order = "ASC" if ascending else "DESC"
+        return f" ORDER BY {sort_field} {order}"
+    
+    @staticmethod
+    def _add_electoral_columns(df: pd.DataFrame, report_date: date = None) -> pd.DataFrame:
+        """Вычисляемые поля избирательных списков"""
+        # Точный возраст на дату отчета: разница лет минус единица, если день рождения
+        # в этом году еще не наступил. Нераспознанные даты дают возраст 0
+        report_date = report_date or date.today()
+        birth = pd.to_datetime(df['Дата_рождения'], format='%Y-%m-%d', errors='coerce')
+        before_birthday = (birth.dt.month > report_date.month) | (
+            (birth.dt.month == report_date.month) & (birth.dt.day > report_date.day)
+        )
+        age = report_date.year - birth.dt.year - before_birthday.astype(int)
+        df['Возраст_лет'] = age.fillna(0).astype(int)
+        
+        # Возрастные группы
+        df['Возрастная_группа'] = np.select(
+            [df['Возраст_лет'] < bound for bound, _ in AGE_GROUPS],
+            [name for _, name in AGE_GROUPS],
+            default=OLDEST_AGE_GROUP
+        )
+        return df
+    
+    def _electoral_summary(self, filters: Dict) -> tuple:
+        """Группировка по домам и возрастным группам и итоги избирательных списков, вычисленные в SQL"""
+        source, params = self._electoral_source(filters)
+        # Точный возраст на дату отчета: разница лет минус единица, если день рождения еще не наступил
+        report_date = self._report_date(filters).isoformat()
+        aged = f"""
+        SELECT Адрес, ФИО,
+            CAST(strftime('%Y', ?) AS INTEGER) - CAST(strftime('%Y', Дата_рождения) AS INTEGER)
+                - (strftime('%m-%d', ?) < strftime('%m-%d', Дата_рождения)) as Возраст_лет
+        FROM ({source})
+        """
+        age_cases = ' '.join(f"WHEN Возраст_лет < {bound} THEN '{name}'" for bound, name in AGE_GROUPS)
+        grouped_source = f"""
+        SELECT Адрес, ФИО, Возраст_лет,
+            CASE {age_cases} ELSE '{OLDEST_AGE_GROUP}' END as Возрастная_группа
+        FROM ({aged})
+        """
+        summary = self._summarize(grouped_source, [report_date, report_date] + params, ['Адрес', 'Возрастная_группа'], {
+            'Количество': ('COUNT(ФИО)', 'SUM(Количество)'),
+            'Средний_возраст': ('AVG(Возраст_лет)', 'NULL'),
+            'Сумма_возрастов': ('SUM(Возраст_лет)', 'SUM(Сумма_возрастов)'),
+            'Самый_старший': ('MAX(Возраст_лет)', 'MAX(Самый_старший)'),
+            'Самый_молодой': ('MIN(Возраст_лет)', 'MIN(Самый_молодой)')
+        })
+        if summary is None:
+            return pd.DataFrame(), {}
+        
+        groups, total = summary
+        grouped = groups[['Количество', 'Средний_возраст']].round(1)
+        count = int(total['Количество'])
+        totals = {
+            'Всего_избирателей': count,
+            'Средний_возраст': float(total['Сумма_возрастов']) / count,
+            'Самый_старший': int(total['Самый_старший']),
+            'Самый_молодой': int(total['Самый_молодой'])
+        }
+        return grouped, totals
+    
+    def export_report_csv(self, report_type: str, path, filters: Dict = None,
+                          sort_by: str = None, ascending: bool = None,
+                          progress: Callable[[int], None] = None) -> int:
+        """
+        Потоковый экспорт детальных строк отчета в CSV.
+        Строки читаются из курсора порциями, вычисляемые поля добавляются к каждой
+        порции, поэтому объем памяти не зависит от размера отчета.
+        path - имя файла или открытый текстовый поток. Возвращает количество выгруженных строк.
+        """
+        self.data_version()  # обновление копии в памяти, если отчеты работают по ней
+        build_query, add_columns = self._report_parts(report_type, filters)
+        sort_by, ascending = report_sort(report_type, sort_by, ascending)
+        query, params = build_query(filters, sort_by, ascending)
+        
+        cursor = self.connect().execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        written = 0
+        
+        with open_export(path) as target:
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                
+                chunk = add_columns(pd.DataFrame([tuple(row) for row in rows], columns=columns))
+                chunk.to_csv(target, header=(written == 0), index=False)
+                written += len(chunk)
+                if progress:
+                    progress(written)
+            
+            if written == 0:
+                pd.DataFrame(columns=columns).to_csv(target, index=False)
+        
+        return written
+    
+    def generate_chunked(self, report_type: str, filters: Dict = None, sort_by: str = None,
+                         ascending: bool = None, spill_path=None, chunk_size: int = EXPORT_BATCH_SIZE,
+                         progress: Callable[[int], None] = None) -> tuple:
+        """
+        Формирование отчета с ограниченным объемом памяти: запрос читается порциями
+        по chunk_size строк, группировка и итоги накапливаются по порциям (ChunkedSummary).
+        Детальные строки с вычисляемыми полями собираются в DataFrame, а если задан
+        spill_path (файл или открытый поток) - дописываются в CSV и в памяти не хранятся;
+        тогда вместо таблицы данных возвращается пустой DataFrame.
+        Возвращает (df, grouped, totals), как generate.
+        """
+        self.data_version()  # обновление копии в памяти, если отчеты работают по ней
+        build_query, add_columns = self._report_parts(report_type, filters)
+        sort_by, ascending = report_sort(report_type, sort_by, ascending)
+        keys, grouped_spec, totals_spec, decimals = CHUNKED_SUMMARIES[report_type]
+        query, params = build_query(filters, sort_by, ascending)
+        
+        summary = ChunkedSummary(keys, grouped_spec, totals_spec)
+        chunks = []
+        columns = []
+        rows = 0
+        
+        with contextlib.ExitStack() as stack:
+            target = stack.enter_context(open_export(spill_path)) if spill_path is not None else None
+            for chunk in pd.read_sql_query(query, self.connect(), params=params, chunksize=chunk_size):
+                if chunk.empty:
+                    columns = chunk.columns
+                    continue
+                
+                chunk = add_columns(chunk)
+                summary.add(chunk)
+                if target is None:
+                    chunks.append(chunk)
+                else:
+                    chunk.to_csv(target, header=(rows == 0), index=False)
+                rows += len(chunk)
+                if progress:
+                    progress(rows)
+            
+            if target is not None and rows == 0:
+                pd.DataFrame(columns=columns).to_csv(target, index=False)
+        
+        grouped, totals = summary.result()
+        if grouped.empty:
+            return pd.DataFrame(), pd.DataFrame(), {}
+        
+        # Столбец без значений в отдельной порции читается как object: типы выравниваются после склейки
+        df = pd.concat(chunks, ignore_index=True).infer_objects() if chunks else pd.DataFrame()
+        return df, grouped.round(decimals), totals
+    
+    def export_report_parquet(self, report_type: str, path: str, filters: Dict = None,
+                              sort_by: str = None, ascending: bool = None, partition: bool = False,
+                              progress: Callable[[int], None] = None) -> Dict:
+        """
+        Экспорт результата отчета в Parquet (нужен pyarrow) с сохранением типов.
+        path - каталог: details.parquet - детальные строки потоком из курсора группами
+        строк (при partition=True - каталог details с разбиением по месяцам периода),
+        grouped.parquet и totals.parquet - группировка и итоги, вычисленные в SQL.
+        Возвращает {'rows': ..., 'files': [...]}.
+        """
+        partition_by = None
+        if partition:
+            partition_by = REPORT_PERIOD_COLUMNS.get(report_type)
+            if partition_by is None:
+                raise ValueError(f"Отчет {report_type} не разбивается по периодам")
+            # Без явной сортировки - по периоду: в памяти держится только текущий месяц
+            if sort_by is None:
+                sort_by, ascending = 'period', True if ascending is None else ascending
+        
+        self.data_version()  # обновление копии в памяти, если отчеты работают по ней
+        build_query, add_columns = self._report_parts(report_type, filters)
+        sort_by, ascending = report_sort(report_type, sort_by, ascending)
+        query, params = build_query(filters, sort_by, ascending)
+        os.makedirs(path, exist_ok=True)
+        details_path = os.path.join(path, "details" if partition_by else "details.parquet")
+        
+        cursor = self.connect().execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        sink = None
+        kinds = None
+        
+        try:
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                
+                chunk = add_columns(pd.DataFrame([tuple(row) for row in rows], columns=columns))
+                if sink is None:
+                    # Схема файла определяется по первой порции
+                    kinds = frame_column_kinds(chunk)
+                    sink = ParquetSink(details_path, arrow_schema(kinds), partition_by)
+                sink.write(frame_to_table(chunk, kinds))
+                if progress:
+                    progress(sink.rows)
+            
+            if sink is None:
+                kinds = {name: REPORT_COLUMN_KINDS.get(name, 'text') for name in columns}
+                sink = ParquetSink(details_path, arrow_schema(kinds), partition_by)
+        except Exception:
+            if sink is not None:
+                sink.abort()
+            raise
+        files = sink.close()
+        
+        _, grouped, totals = self.generate(report_type, filters, details=False)
+        for name, frame in (("grouped", grouped.reset_index()), ("totals", pd.DataFrame([totals]))):
+            frame_path = os.path.join(path, f"{name}.parquet")
+            frame_kinds = frame_column_kinds(frame)
+            with ParquetSink(frame_path, arrow_schema(frame_kinds)) as frame_sink:
+                frame_sink.write(frame_to_table(frame, frame_kinds))
+            files.append(frame_path)
+        
+        return {'rows': sink.rows, 'files': files}
+    
+    def _report_parts(self, report_type: str, filters: Dict = None) -> tuple:
+        """Построитель запроса и функция вычисляемых полей для типа отчета"""
+        parts = {
+            'payments': (self._payments_query, self._add_payments_columns),
+            'debts': (self._debts_query, self._add_debts_columns),
+            'electoral': (
+                self._electoral_query,
+                functools.partial(self._add_electoral_columns, report_date=self._report_date(filters))
+            )
+        }
+        if report_type not in parts:
+            raise ValueError(f"Неизвестный тип отчета: {report_type}")
+        return parts[report_type]
+
+
+# Число инструкций виртуальной машины SQLite между вызовами обработчика прогресса
+PROGRESS_INTERVAL = 10000
+
+
+class ReportJob:
+    """
+    Формирование отчета в фоновом потоке на собственном соединении.
+    Интерфейс опрашивает состояние задачи (done, ticks, result, error) из главного
+    потока; cancel() прерывает выполняющийся SQL-запрос через обработчик прогресса SQLite.
+    """
+    
+    def __init__(self, db: GHUDatabase, report_type: str, filters: Dict = None,
+                 sort_by: str = None, ascending: bool = None, cache: ReportCache = None,
+                 details: bool = True, replica: MemoryReplica = None):
+        self.db = db
+        self.cache = cache
+        self.replica = replica
+        self.details = details
+        self.report_type = report_type
+        self.filters = filters
+        self.sort_by = sort_by
+        self.ascending = ascending
+        
+        self.ticks = 0
+        self.started = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = None
+    
+    def start(self) -> 'ReportJob':
+        """Запуск задачи в фоновом потоке"""
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"report-{self.report_type}", daemon=True)
+        self._thread.start()
+        return self
+    
+    def cancel(self):
+        """Отмена задачи: текущий запрос будет прерван при следующем вызове обработчика прогресса"""
+        self._cancel.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+    
+    @property
+    def done(self) -> bool:
+        return self._thread is not None and not self._thread.is_alive()
+    
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started else 0.0
+    
+    def _on_progress(self) -> int:
+        # Ненулевой результат заставляет SQLite прервать запрос
+        self.ticks += 1
+        return 1 if self._cancel.is_set() else 0
+    
+    def _run(self):
+        # Соединение рабочего потока берется из пула и возвращается в него по завершении;
+        # при работе по копии в памяти - соединение потока с обновленной копией
+        if self.replica is not None:
+            self.replica.refresh()
+            conn = self.replica.connect(latest=True)
+        else:
+            conn = self.db.connect()
+        conn.set_progress_handler(self._on_progress, PROGRESS_INTERVAL)
+        try:
+            reports = GHUReports(self.db, conn, self.cache, self.replica)
+            result = reports.generate(self.report_type, self.filters, self.sort_by, self.ascending, self.details)
+            if not self.cancelled:
+                self.result = result
+        except Exception as e:
+            if not self.cancelled:
+                self.error = e
+        finally:
+            conn.set_progress_handler(None, 0)
+            if self.replica is None:
+                self.db.release_connection()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from columnar import ParquetSink, arrow_schema, rows_to_table
+
+KINDS = {'id': 'int', 'period': 'date', 'amount': 'money'}
+
+
+def payments(months: int, per_month: int) -> list:
+    """Строки начислений, упорядоченные по периоду"""
+    rows = []
+    for month in range(months):
+        period = (date(2021, 1, 1) + timedelta(days=31 * month)).replace(day=1).isoformat()
+        rows += [(len(rows) + 1, period, 100.0) for _ in range(per_month)]
+    return rows
+
+
+@unittest.skipIf(pa is None, "нужен pyarrow")
+class ParquetSinkPartitionTest(unittest.TestCase):
+
+    def export(self, rows: list, batch_size: int, row_group_size: int) -> tuple:
+        path = tempfile.mkdtemp(prefix="ghu_parquet_")
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        with ParquetSink(path, arrow_schema(KINDS), 'period', row_group_size) as sink:
+            for start in range(0, len(rows), batch_size):
+                sink.write(rows_to_table(rows[start:start + batch_size], KINDS))
+        return path, sink
+
+    def test_sorted_months_are_flushed_on_change(self):
+        # 24 месяца по 3000 строк: меньше группы строк, весь поток - 72000 строк
+        rows = payments(24, 3000)
+        path, sink = self.export(rows, batch_size=5000, row_group_size=100000)
+
+        self.assertEqual(sink.rows, len(rows))
+        self.assertEqual(len(sink.files), 24)
+        # В памяти - не больше текущего месяца и одной порции курсора
+        self.assertLessEqual(sink.peak_buffered, 3000 + 5000)
+
+        written = sum(pq.ParquetFile(file).metadata.num_rows for file in sink.files)
+        self.assertEqual(written, len(rows))
+        self.assertTrue(os.path.exists(os.path.join(path, "month=2021-01", "part-0.parquet")))
+
+    def test_full_row_groups_are_written_within_month(self):
+        rows = payments(2, 25000)
+        _, sink = self.export(rows, batch_size=5000, row_group_size=10000)
+
+        self.assertLessEqual(sink.peak_buffered, 10000)
+        groups = [pq.ParquetFile(file).metadata.num_row_groups for file in sink.files]
+        self.assertEqual(groups, [3, 3])
+
+    def test_unsorted_stream_keeps_one_file_per_month(self):
+        rows = payments(6, 1000)
+        rows = rows[::2] + rows[1::2]
+        _, sink = self.export(rows, batch_size=500, row_group_size=100000)
+
+        self.assertEqual(len(sink.files), 6)
+        self.assertLessEqual(sink.peak_buffered, 1000)
+        written = sum(pq.ParquetFile(file).metadata.num_rows for file in sink.files)
+        self.assertEqual(written, len(rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
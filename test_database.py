@@ -0,0 +1,224 @@
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from database import GHUDatabase, STATEMENT_AMBIGUOUS, STATEMENT_INVALID, STATEMENT_UNMATCHED
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Файловая база с тестовыми данными во временном каталоге"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="ghu_test_")
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        with redirect_stdout(StringIO()):
+            self.db = GHUDatabase(os.path.join(self.workdir, "test.db"), seed=True)
+        self.addCleanup(self.db.close)
+        conn = self.db.connect()
+        self.apartments = [row[0] for row in conn.execute("SELECT id FROM apartments ORDER BY id")]
+        self.services = [row[0] for row in conn.execute("SELECT id FROM services ORDER BY id")]
+
+    def payment(self, apartment_id: int, period: str, amount: float = 100.0, is_paid: int = 0, **fields) -> dict:
+        return dict({'apartment_id': apartment_id, 'service_id': self.services[0], 'period': period,
+                     'amount': amount, 'is_paid': is_paid}, **fields)
+
+    def count(self, table: str) -> int:
+        return self.db.count_records(table)
+
+
+class DebtSummaryTest(DatabaseTestCase):
+
+    def assertSummaryConsistent(self):
+        self.assertEqual(self.db.check_debt_summary(), [])
+
+    def test_triggers_follow_inserts_updates_and_deletes(self):
+        first, second = self.apartments[:2]
+        self.assertSummaryConsistent()
+
+        # Начисления за два периода
+        self.db.run_billing('2030-01')
+        self.db.run_billing('2030-02')
+        self.assertSummaryConsistent()
+
+        ids = [self.db.insert('payments', self.payment(first, period))
+               for period in ('2029-11-01', '2029-12-01', '2030-03-01')]
+        self.db.insert('payments', self.payment(first, '2029-10-01', is_paid=1, payment_date='2029-10-20'))
+        self.assertSummaryConsistent()
+
+        # Сумма, граничный период, квартира, оплата и отмена оплаты
+        self.db.update('payments', ids[0], {'amount': 250.5})
+        self.db.update('payments', ids[0], {'period': '2029-01-01'})
+        self.db.update('payments', ids[2], {'apartment_id': second})
+        self.db.update('payments', ids[1], {'is_paid': 1, 'payment_date': '2030-01-10'})
+        self.assertSummaryConsistent()
+        self.db.update('payments', ids[1], {'is_paid': 0, 'payment_date': None})
+        self.assertSummaryConsistent()
+
+        # Удаление граничных и единственных неоплаченных строк квартиры
+        self.db.delete('payments', ids[0])
+        self.db.delete('payments', ids[2])
+        self.assertSummaryConsistent()
+
+        # Пакетная запись и оплата всех начислений квартиры
+        conn = self.db.connect()
+        self.db.insert_many('payments', [self.payment(second, f"2031-{month:02d}-01") for month in range(1, 13)])
+        unpaid = [row[0] for row in conn.execute(
+            "SELECT id FROM payments WHERE apartment_id = ? AND is_paid = 0", (first,)
+        )]
+        self.db.update_many('payments', [{'id': payment_id, 'is_paid': 1} for payment_id in unpaid])
+        self.assertSummaryConsistent()
+        debtors = {row[0] for row in conn.execute("SELECT apartment_id FROM apartment_debt")}
+        self.assertNotIn(first, debtors)
+
+        loaded = [row[0] for row in conn.execute("SELECT id FROM payments WHERE period LIKE '2031-%'")]
+        self.db.delete_many('payments', loaded)
+        self.assertSummaryConsistent()
+
+    def test_check_detects_drift_and_rebuild_repairs_it(self):
+        self.db.run_billing('2030-01')
+        conn = self.db.connect()
+        conn.execute("UPDATE apartment_debt SET unpaid_sum = unpaid_sum + 1 WHERE apartment_id = ?",
+                     (self.apartments[0],))
+        conn.execute("DELETE FROM apartment_debt WHERE apartment_id = ?", (self.apartments[1],))
+        conn.commit()
+
+        drift = {row['apartment_id'] for row in self.db.check_debt_summary()}
+        self.assertEqual(drift, set(self.apartments[:2]))
+
+        self.db.rebuild_debt_summary()
+        self.assertSummaryConsistent()
+
+
+
+class TransactionTest(DatabaseTestCase):
+
+    def committed(self, table: str) -> int:
+        """Число строк, зафиксированных в файле базы (видимых другому соединению)"""
+        conn = sqlite3.connect(self.db.db_path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_inner_failure_rolls_back_only_its_savepoint(self):
+        first, second = self.apartments[:2]
+        before = self.count('payments')
+
+        with self.db.transaction():
+            kept = self.db.insert('payments', self.payment(first, '2030-01-01'))
+            # Запись внутри блока фиксируется только в его конце
+            self.assertEqual(self.committed('payments'), before)
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.db.insert('payments', self.payment(second, '2030-01-01'))
+                    self.db.insert_many('payments', [self.payment(second, '2030-02-01')])
+                    raise RuntimeError("inner")
+            self.db.insert('payments', self.payment(first, '2030-02-01'))
+
+        self.assertEqual(self.committed('payments'), before + 2)
+        self.assertIsNotNone(self.db.get_by_id('payments', kept))
+        rolled_back = self.db.connect().execute(
+            "SELECT COUNT(*) FROM payments WHERE apartment_id = ? AND period >= '2030-01-01'", (second,)
+        ).fetchone()[0]
+        self.assertEqual(rolled_back, 0)
+        self.assertEqual(self.db.check_debt_summary(), [])
+
+    def test_outer_failure_rolls_back_everything(self):
+        before = self.count('payments')
+        version = self.db.change_version()
+
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.insert_many('payments', [self.payment(apartment_id, '2030-01-01')
+                                                 for apartment_id in self.apartments])
+                with self.db.transaction():
+                    self.db.insert('payments', self.payment(self.apartments[0], '2030-02-01'))
+                raise RuntimeError("outer")
+
+        self.assertEqual(self.count('payments'), before)
+        self.assertEqual(self.committed('payments'), before)
+        self.assertEqual(self.db.change_version(), version)
+        self.assertFalse(self.db.connect().in_transaction)
+
+    def test_block_joins_pending_implicit_transaction(self):
+        first, second = self.apartments[:2]
+        before = self.count('payments')
+        conn = self.db.connect()
+        # Запись без commit открывает неявную транзакцию на соединении
+        conn.execute("INSERT INTO payments (apartment_id, service_id, period, amount, is_paid) "
+                     "VALUES (?, ?, '2030-01-01', 100, 0)", (first, self.services[0]))
+        self.assertTrue(conn.in_transaction)
+
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.insert('payments', self.payment(second, '2030-01-01'))
+                raise RuntimeError("block")
+        # Откачены только изменения блока, ранее сделанная запись ожидает фиксации
+        self.assertEqual(self.count('payments'), before + 1)
+        self.assertEqual(self.committed('payments'), before)
+
+        with self.db.transaction():
+            self.db.insert('payments', self.payment(second, '2030-02-01'))
+        self.assertEqual(self.committed('payments'), before + 2)
+        self.assertFalse(conn.in_transaction)
+
+
+
+class ReconcileStatementTest(DatabaseTestCase):
+
+    def write_statement(self, rows: list) -> str:
+        path = os.path.join(self.workdir, "statement.csv")
+        with open(path, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.writer(target)
+            writer.writerow(['apartment_id', 'period', 'amount', 'payment_date', 'service_id'])
+            writer.writerows(rows)
+        return path
+
+    def test_lines_are_classified_and_matched_payments_paid(self):
+        first, second, third = self.apartments[:3]
+        water, heating = self.services[:2]
+        ids = {
+            'first_water': self.db.insert('payments', self.payment(first, '2030-01-01', 100.0, service_id=water)),
+            'first_heating': self.db.insert('payments', self.payment(first, '2030-01-01', 200.0, service_id=heating)),
+            'second': self.db.insert('payments', self.payment(second, '2030-01-01', 150.0)),
+            'third_water': self.db.insert('payments', self.payment(third, '2030-01-01', 50.0, service_id=water)),
+            'third_heating': self.db.insert('payments', self.payment(third, '2030-01-01', 50.0, service_id=heating)),
+        }
+        path = self.write_statement([
+            [first, '2030-01', '100.00', '2030-02-05', water],   # 2: по услуге
+            [first, '2030-01', '200,00', '', ''],                # 3: пустая услуга - по сумме
+            [second, '2030-01-01', '150', '2030-02-07', ''],     # 4: пустая услуга - по сумме
+            [second, '2030-01', '999', '', ''],                  # 5: нет начисления
+            [first, '2030-01', '100', '', ''],                   # 6: начисление уже оплачено строкой 2
+            [third, '2030-01', '50', '', ''],                    # 7: два начисления на одну строку
+            [first, '2030-13', '10', '', ''],                    # 8: неверный период
+            ['x', '2030-01', '10', '', ''],                      # 9: неверная квартира
+        ])
+        review_path = os.path.join(self.workdir, "review.csv")
+
+        result = self.db.reconcile_statement(path, review_path)
+
+        self.assertEqual((result['lines'], result['matched'], result['unmatched'],
+                          result['ambiguous'], result['invalid']), (8, 3, 2, 1, 2))
+        self.assertAlmostEqual(result['matched_amount'], 450.0)
+
+        with open(review_path, newline='', encoding='utf-8-sig') as source:
+            review = {int(row['line']): row['status'] for row in csv.DictReader(source)}
+        self.assertEqual(review, {5: STATEMENT_UNMATCHED, 6: STATEMENT_UNMATCHED, 7: STATEMENT_AMBIGUOUS,
+                                  8: STATEMENT_INVALID, 9: STATEMENT_INVALID})
+
+        paid = {name: self.db.get_by_id('payments', payment_id) for name, payment_id in ids.items()}
+        self.assertEqual({name for name, row in paid.items() if row['is_paid']},
+                         {'first_water', 'first_heating', 'second'})
+        self.assertEqual(paid['first_water']['payment_date'], '2030-02-05')
+        self.assertEqual(paid['second']['payment_date'], '2030-02-07')
+        self.assertEqual(self.db.check_debt_summary(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
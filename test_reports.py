@@ -0,0 +1,66 @@
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import reports
+from reports import GHUReports, ReportCache
+from test_database import DatabaseTestCase
+
+
+class ReportCacheTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reports = GHUReports(self.db, cache=ReportCache())
+
+    def test_repeated_report_is_served_from_cache(self):
+        first = self.reports.generate('payments')
+        self.assertIs(self.reports.generate('payments'), first)
+        self.assertEqual(self.reports.cache.stats()['hits'], 1)
+
+    def test_electoral_report_is_recomputed_on_a_new_day(self):
+        first = self.reports.generate('electoral')
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        with mock.patch.object(reports, 'date', Tomorrow):
+            later = self.reports.generate('electoral')
+
+        self.assertIsNot(later, first)
+        self.assertEqual(self.reports.cache.stats()['hits'], 0)
+        # Явная дата отчета - тот же ключ, что и «сегодня» на эту дату
+        explicit = self.reports.generate('electoral', {'report_date': date.today().isoformat()})
+        self.assertIs(explicit, first)
+
+
+
+class PaymentsArchiveTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reports = GHUReports(self.db)
+        self.db.insert_many('payments', [
+            self.payment(apartment_id, f"2020-{month:02d}-01", is_paid=1, payment_date=f"2020-{month:02d}-15")
+            for apartment_id in self.apartments[:3] for month in range(1, 13)
+        ])
+
+    def test_unfiltered_report_includes_archived_payments(self):
+        before = self.reports.generate('payments')
+        summary = self.reports.generate('payments', details=False)
+
+        archived = self.db.archive_payments('2021-01')
+        self.assertEqual(archived['years'].get(2020), 36)
+
+        after = self.reports.generate('payments')
+        self.assertEqual(len(after[0]), len(before[0]))
+        self.assertEqual(after[2], before[2])
+        self.assertEqual(self.reports.generate('payments', details=False)[2], summary[2])
+        # Фильтр по архивному периоду читает строки из архива
+        self.assertEqual(len(self.reports.generate('payments', {'period': '2020-'})[0]), 36)
+
+
+if __name__ == "__main__":
+    unittest.main()